@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Supervised multi-process runner for the interview agents.
+Each agent replica runs in its own process with its fixed port and seed, so a
+crash or a CPU-heavy handler only affects that replica and the agents use
+every core. Crashed agents are restarted with exponential backoff; agents
+whose heartbeat stops (a blocked event loop) are killed and restarted.
+Liveness and message throughput per agent are logged and, optionally,
+written to a JSON status file.
+
+Usage:
+    python3 agent_supervisor.py
+    python3 agent_supervisor.py --replicas 2 --status-file agent_status.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from interview_agents import AGENT_REPLICAS, MODE_CONFIGS, agent_port, load_agent_seed, run_agent_process
+
+RESTART_BACKOFF_BASE = float(os.getenv('AGENT_RESTART_BACKOFF', '1'))  # seconds before the first restart
+RESTART_BACKOFF_MAX = float(os.getenv('AGENT_RESTART_BACKOFF_MAX', '60'))
+STABLE_AFTER = float(os.getenv('AGENT_STABLE_AFTER', '60'))  # uptime after which the backoff resets
+HEARTBEAT_TIMEOUT = float(os.getenv('AGENT_HEARTBEAT_TIMEOUT', '15'))  # seconds without a heartbeat = hung
+STARTUP_GRACE = float(os.getenv('AGENT_STARTUP_GRACE', '30'))  # seconds to send the first heartbeat
+REPORT_INTERVAL = float(os.getenv('AGENT_REPORT_INTERVAL', '30'))
+
+
+class SupervisedAgent:
+    """One agent replica's process, restart schedule and counters"""
+
+    def __init__(self, context, mode, replica):
+        self.context = context
+        self.mode = mode
+        self.replica = replica
+        self.name = MODE_CONFIGS[mode]['name'] + (f"-{replica}" if replica else '')
+        self.port = agent_port(mode, replica)
+        self.process = None
+        self.shared = None
+        self.started_at = None
+        self.restarts = 0
+        self.consecutive_failures = 0
+        self.restart_at = None
+        self.last_exit = None
+        self.messages_before = 0  # messages handled by earlier processes of this agent
+        self._last_report = (time.time(), 0)
+
+    def start(self):
+        self.shared = self.context.Array('d', [0.0, 0.0])  # heartbeat time, messages handled
+        self.process = self.context.Process(target=run_agent_process, args=(self.mode, self.replica, self.shared),
+                                            name=self.name, daemon=True)
+        self.process.start()
+        self.started_at = time.time()
+        self.restart_at = None
+        print(f"Started {self.name} (pid {self.process.pid}) on port {self.port}")
+
+    def messages(self):
+        return self.messages_before + int(self.shared[1]) if self.shared else self.messages_before
+
+    def heartbeat_age(self, now):
+        heartbeat = self.shared[0] if self.shared else 0.0
+        return now - heartbeat if heartbeat else None
+
+    def stop(self, timeout=5):
+        if self.process and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+
+    def _schedule_restart(self, now, reason):
+        self.messages_before = self.messages()
+        self.shared = None
+        if self.started_at and now - self.started_at >= STABLE_AFTER:
+            self.consecutive_failures = 0
+        self.consecutive_failures += 1
+        delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** (self.consecutive_failures - 1))
+        self.restart_at = now + delay
+        self.last_exit = reason
+        self.process = None
+        print(f"{self.name} {reason}; restarting in {delay:.0f}s")
+
+    def check(self, now):
+        """Restart the agent when it died or its heartbeat stopped and its backoff has passed"""
+        if self.process is None:
+            if self.restart_at is not None and now >= self.restart_at:
+                self.restarts += 1
+                self.start()
+            return
+        if not self.process.is_alive():
+            self._schedule_restart(now, f"exited with code {self.process.exitcode}")
+            return
+        age = self.heartbeat_age(now)
+        uptime = now - self.started_at
+        if (age is None and uptime > STARTUP_GRACE) or (age is not None and age > HEARTBEAT_TIMEOUT):
+            silent = f"{age:.0f}s" if age is not None else f"{uptime:.0f}s since start"
+            self.stop()
+            self._schedule_restart(now, f"missed heartbeats for {silent}")
+
+    def status(self, now):
+        messages = self.messages()
+        last_time, last_messages = self._last_report
+        rate = (messages - last_messages) / (now - last_time) if now > last_time else 0.0
+        self._last_report = (now, messages)
+        alive = self.process is not None and self.process.is_alive()
+        age = self.heartbeat_age(now) if alive else None
+        return {
+            'name': self.name,
+            'mode': self.mode,
+            'replica': self.replica,
+            'port': self.port,
+            'pid': self.process.pid if alive else None,
+            'alive': alive,
+            'live': alive and age is not None and age <= HEARTBEAT_TIMEOUT,
+            'uptimeSeconds': round(now - self.started_at, 1) if alive else 0.0,
+            'heartbeatAgeSeconds': round(age, 1) if age is not None else None,
+            'restarts': self.restarts,
+            'lastExit': self.last_exit,
+            'messages': messages,
+            'messagesPerSecond': round(rate, 2),
+        }
+
+
+class AgentSupervisor:
+    """Runs every agent replica in its own process and keeps them alive"""
+
+    def __init__(self, replicas=AGENT_REPLICAS, status_file=None, report_interval=REPORT_INTERVAL):
+        context = multiprocessing.get_context('spawn')
+        self.agents = [SupervisedAgent(context, mode, replica)
+                       for replica in range(replicas) for mode in MODE_CONFIGS]
+        self.status_file = status_file
+        self.report_interval = report_interval
+        self._running = False
+
+    def report(self):
+        now = time.time()
+        agents = [agent.status(now) for agent in self.agents]
+        report = {'checkedAt': now, 'live': sum(a['live'] for a in agents), 'total': len(agents), 'agents': agents}
+        print(f"Agents live {report['live']}/{report['total']}: " + ', '.join(
+            f"{a['name']}={'up' if a['live'] else 'down'} {a['messagesPerSecond']}/s r{a['restarts']}"
+            for a in agents))
+        if self.status_file:
+            temp_path = f"{self.status_file}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(report, f, indent=2)
+            os.replace(temp_path, self.status_file)
+        return report
+
+    def stop(self, *_):
+        self._running = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self._running = True
+        for agent in self.agents:
+            agent.start()
+        next_report = time.time() + self.report_interval
+        try:
+            while self._running:
+                now = time.time()
+                for agent in self.agents:
+                    agent.check(now)
+                if now >= next_report:
+                    self.report()
+                    next_report = now + self.report_interval
+                time.sleep(0.5)
+        finally:
+            print("Stopping agents...")
+            for agent in self.agents:
+                agent.stop()
+            self.report()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replicas', type=int, default=AGENT_REPLICAS, help='replicas per mode (AGENT_REPLICAS)')
+    parser.add_argument('--status-file', default=os.getenv('AGENT_STATUS_FILE'), help='write the status report here')
+    parser.add_argument('--report-interval', type=float, default=REPORT_INTERVAL, help='seconds between reports')
+    args = parser.parse_args(argv)
+
+    load_agent_seed()  # once here, so the replica processes never race to generate it
+    AgentSupervisor(max(1, args.replicas), args.status_file, args.report_interval).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,284 @@
 import asyncio
-import sys
+import hashlib
+import itertools
 import os
+import socket
+import sys
+import threading
+import time
+from urllib.parse import urlparse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from uagents import Agent
-from interview_agents import InterviewAnswer, FollowUpQuestion
+from interview_agents import (
+    InterviewAnswer, FollowUpQuestion, FollowUpTierStats, MODE_CONFIGS, AGENT_REPLICAS, agent_endpoint,
+)
+from followup_cache import CACHEABLE_TIERS, FOLLOWUP_CACHE_ENABLED, followup_cache, followup_cache_key
+from resilience import UPSTREAM_HEDGE_AFTER, guarded_call
+
+def _load_agent_addresses():
+    """
+    Build the replica endpoints for every mode.
+    AGENT_ENDPOINTS_<MODE> (comma separated) overrides the default local layout.
+    """
+    addresses = {}
+    for mode in MODE_CONFIGS:
+        override = os.getenv(f"AGENT_ENDPOINTS_{mode.upper()}")
+        if override:
+            addresses[mode] = [url.strip() for url in override.split(',') if url.strip()]
+        else:
+            addresses[mode] = [agent_endpoint(mode, replica) for replica in range(AGENT_REPLICAS)]
+    return addresses
+
+AGENT_ADDRESSES = _load_agent_addresses()
+
+LB_STRATEGY = os.getenv('AGENT_LB_STRATEGY', 'least_outstanding')  # or 'round_robin'
+HEALTH_CHECK_INTERVAL = float(os.getenv('AGENT_HEALTH_INTERVAL', '10'))
+HEALTH_CHECK_TIMEOUT = float(os.getenv('AGENT_HEALTH_TIMEOUT', '1'))
+MAX_CONSECUTIVE_FAILURES = int(os.getenv('AGENT_MAX_FAILURES', '3'))
+EJECTION_SECONDS = float(os.getenv('AGENT_EJECTION_SECONDS', '30'))
+
+class AgentBalancer:
+    """Client-side load balancer over the replicas of each mode's agent"""
+
+    def __init__(self, addresses, strategy=LB_STRATEGY):
+        if strategy not in ('round_robin', 'least_outstanding'):
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+        self.strategy = strategy
+        self._lock = threading.Lock()
+        self._replicas = {
+            mode: [self._new_replica(url) for url in urls]
+            for mode, urls in addresses.items()
+        }
+        self._cursors = {mode: itertools.count() for mode in addresses}
+        self._health_thread = None
+
+    @staticmethod
+    def _new_replica(url):
+        return {
+            'url': url,
+            'outstanding': 0,
+            'requests': 0,
+            'failures': 0,
+            'consecutive_failures': 0,
+            'ejected_until': 0.0,
+            'last_check': None,
+            'healthy': True,
+        }
+
+    def acquire(self, mode, exclude=(), affinity_key=None):
+        """
+        Pick a replica for mode and mark a request as outstanding on it.
+        With an affinity_key (the user id), the same available replica is picked for every request
+        of that key, so its per-user state (the questions it has asked) stays on one replica.
+        """
+        with self._lock:
+            replicas = self._replicas.get(mode)
+            if not replicas:
+                raise KeyError(f"No agent replicas configured for mode: {mode}")
+
+            now = time.time()
+            candidates = [r for r in replicas if r['ejected_until'] <= now and r['url'] not in exclude]
+            if not candidates:
+                # Every replica is ejected; try the one that is due back soonest rather than failing outright
+                candidates = sorted(
+                    (r for r in replicas if r['url'] not in exclude),
+                    key=lambda r: r['ejected_until'],
+                )[:1]
+            if not candidates:
+                return None
+
+            if affinity_key:
+                # Rendezvous hashing: only the key's users move when a replica is ejected or returns
+                replica = max(candidates, key=lambda r: _affinity_weight(r['url'], affinity_key))
+            elif self.strategy == 'round_robin':
+                replica = candidates[next(self._cursors[mode]) % len(candidates)]
+            else:
+                replica = min(candidates, key=lambda r: (r['outstanding'], r['requests']))
+
+            replica['outstanding'] += 1
+            replica['requests'] += 1
+            return replica
+
+    def release(self, replica, success):
+        """Record the outcome of a request and eject the replica after repeated failures"""
+        with self._lock:
+            replica['outstanding'] -= 1
+            if success:
+                replica['consecutive_failures'] = 0
+                return
+            replica['failures'] += 1
+            replica['consecutive_failures'] += 1
+            if replica['consecutive_failures'] >= MAX_CONSECUTIVE_FAILURES:
+                replica['ejected_until'] = time.time() + EJECTION_SECONDS
+                replica['healthy'] = False
+                print(f"Ejecting agent replica {replica['url']} after {replica['consecutive_failures']} failures")
+
+    def check_health(self):
+        """Probe every replica's port and eject or readmit it based on the result"""
+        with self._lock:
+            replicas = [r for mode_replicas in self._replicas.values() for r in mode_replicas]
+
+        for replica in replicas:
+            healthy = _probe(replica['url'], HEALTH_CHECK_TIMEOUT)
+            with self._lock:
+                replica['last_check'] = time.time()
+                if healthy:
+                    if not replica['healthy']:
+                        print(f"Agent replica {replica['url']} is healthy again")
+                    replica['healthy'] = True
+                    replica['consecutive_failures'] = 0
+                    replica['ejected_until'] = 0.0
+                else:
+                    replica['healthy'] = False
+                    replica['ejected_until'] = time.time() + max(EJECTION_SECONDS, HEALTH_CHECK_INTERVAL)
+
+    def start_health_checks(self, interval=HEALTH_CHECK_INTERVAL):
+        """Run check_health periodically in a daemon thread"""
+        if self._health_thread is not None or interval <= 0:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.check_health()
+                except Exception as e:
+                    print(f"Agent health check failed: {e}")
+                time.sleep(interval)
 
-AGENT_ADDRESSES = {
-    'easy': 'http://127.0.0.1:8000/submit',
-    'medium': 'http://127.0.0.1:8001/submit',
-    'hard': 'http://127.0.0.1:8002/submit',
-}
+        self._health_thread = threading.Thread(target=loop, name="agent-health-check", daemon=True)
+        self._health_thread.start()
 
-async def ask_agent(mode: str, answer: str, question_context=None, user_id=None, timeout=10):
+    def status(self):
+        """Snapshot of every replica's state for monitoring"""
+        now = time.time()
+        with self._lock:
+            return {
+                'strategy': self.strategy,
+                'modes': {
+                    mode: [{
+                        'url': r['url'],
+                        'healthy': r['healthy'],
+                        'ejected': r['ejected_until'] > now,
+                        'outstanding': r['outstanding'],
+                        'requests': r['requests'],
+                        'failures': r['failures'],
+                    } for r in replicas]
+                    for mode, replicas in self._replicas.items()
+                },
+            }
+
+def _affinity_weight(url, key):
+    return hashlib.sha256(f"{url}|{key}".encode('utf-8')).digest()
+
+def _probe(url, timeout):
+    """Return True if the replica's host:port accepts a TCP connection"""
+    parsed = urlparse(url)
+    if not parsed.hostname or not parsed.port:
+        return True  # Not a direct endpoint (e.g. an agent address); nothing to probe
+    try:
+        with socket.create_connection((parsed.hostname, parsed.port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+balancer = AgentBalancer(AGENT_ADDRESSES)
+balancer.start_health_checks()
+
+# Generation tier reported by the agents for every follow-up this backend received
+followup_tiers = FollowUpTierStats()
+
+async def ask_agent(mode: str, answer: str, question_context=None, user_id=None, timeout=10, job_topics=None):
     """
     Send an interview answer to the appropriate agent and get a follow-up question.
+    A failed replica is retried once on another replica of the same mode.
+    Requests with a user_id always go to that user's replica while it is available.
     """
     client = Agent(name="flask-client", seed="flask_seed")
-    
-    msg = InterviewAnswer(answer=answer, question_context=question_context, user_id=user_id)
-    
-    # Send the message and wait for a response
-    response = await client.send(AGENT_ADDRESSES[mode], msg, timeout=timeout)
-    if isinstance(response, FollowUpQuestion):
-        return response
-    else:
-        raise Exception(f"Unexpected response from agent: {response}")
 
-def get_followup_from_agent(mode, answer, question_context=None, user_id=None, timeout=10):
+    msg = InterviewAnswer(answer=answer, question_context=question_context, user_id=user_id, job_topics=job_topics)
+
+    tried = []
+    last_error = None
+    for _ in range(2):
+        replica = balancer.acquire(mode, exclude=tried, affinity_key=user_id)
+        if replica is None:
+            break
+        tried.append(replica['url'])
+        try:
+            # Send the message and wait for a response
+            response = await client.send(replica['url'], msg, timeout=timeout)
+            if isinstance(response, FollowUpQuestion):
+                balancer.release(replica, success=True)
+                return response
+            raise Exception(f"Unexpected response from agent: {response}")
+        except Exception as e:
+            balancer.release(replica, success=False)
+            print(f"Agent replica {replica['url']} failed: {e}")
+            last_error = e
+    raise last_error or Exception(f"No agent replica available for mode: {mode}")
+
+def _guarded_ask(mode, answer, question_context, user_id, timeout, job_topics=None):
+    """Run ask_agent under the per-mode agent circuit breaker and deadline"""
+    return guarded_call(
+        f"agent:{mode}",
+        lambda: asyncio.run(ask_agent(mode, answer, question_context, user_id, timeout, job_topics)),
+        hedge_after=UPSTREAM_HEDGE_AFTER['agent'],
+    )
+
+def get_followup_from_agent(mode, answer, question_context=None, user_id=None, timeout=10, bypass_cache=False,
+                            job_topics=None):
     """
     Synchronous wrapper for Flask to call the async ask_agent function.
+    Identical (mode, question_context, answer, user_id, job_topics) requests are served from the follow-up cache
+    unless bypass_cache is set; a bypassed call still refreshes the cached entry. Only LLM follow-ups are cached.
+    """
+    if not FOLLOWUP_CACHE_ENABLED:
+        followup = _guarded_ask(mode, answer, question_context, user_id, timeout, job_topics)
+        _record_tier(followup)
+        return followup
+
+    key = followup_cache_key(mode, answer, question_context, user_id, job_topics)
+    if bypass_cache:
+        followup_cache.record_bypass()
+    else:
+        cached = followup_cache.get(key)
+        if cached is not None:
+            return cached
+
+    followup = _guarded_ask(mode, answer, question_context, user_id, timeout, job_topics)
+    _record_tier(followup)
+    # Bank and keyword fallbacks are not kept, so the late LLM result the agent caches is served next time
+    if getattr(followup, 'tier', None) in CACHEABLE_TIERS:
+        followup_cache.put(key, followup)
+    return followup
+
+def get_followup_cache_stats():
+    """Return hit/miss metrics for the follow-up cache"""
+    return followup_cache.stats()
+
+def _record_tier(followup):
+    if getattr(followup, 'tier', None):
+        followup_tiers.record(followup.tier, followup.latency_ms or 0.0, fallback_reason=followup.fallback_reason)
+
+def get_agent_status():
+    """Return the load balancer's view of every agent replica and the follow-up generation tiers"""
+    return {**balancer.status(), 'followupTiers': followup_tiers.snapshot()}
+
+def probe_agents(timeout=HEALTH_CHECK_TIMEOUT):
+    """
+    Ping every replica in AGENT_ADDRESSES and time the connection.
+    Raises ConnectionError when some mode has no reachable replica.
     """
-    return asyncio.run(ask_agent(mode, answer, question_context, user_id, timeout)) 
\ No newline at end of file
+    report = {}
+    for mode, urls in AGENT_ADDRESSES.items():
+        replicas = []
+        for url in urls:
+            start = time.perf_counter()
+            reachable = _probe(url, timeout)
+            replicas.append({'url': url, 'reachable': reachable,
+                             'latencyMs': round((time.perf_counter() - start) * 1000, 1)})
+        report[mode] = {'reachable': sum(r['reachable'] for r in replicas), 'replicas': replicas}
+    unreachable = [mode for mode, entry in report.items() if not entry['reachable']]
+    if unreachable:
+        raise ConnectionError(f"No reachable agent replica for: {', '.join(unreachable)}")
+    return report
@@ -1,3 +1,6 @@
+import atexit
+import contextvars
+import hmac
 import os
 import sys
 from io import BytesIO
@@ -6,7 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import base64
 from PIL import Image
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, make_response, request, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 from vapi import Vapi
@@ -17,9 +20,10 @@ import json
 import re
 import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    from agent_client import get_followup_from_agent
+    from agent_client import get_followup_from_agent, get_agent_status, get_followup_cache_stats, probe_agents
     AGENT_AVAILABLE = True
 except ImportError:
     print("Warning: agent_client not available. Agent features will be disabled.")
@@ -33,7 +37,60 @@ except ImportError:
     MODE_CONFIGS_AVAILABLE = False
     MODE_CONFIGS = {}
 
+try:
+    from frame_quality import (
+        FRAME_QUALITY_GATE_ENABLED,
+        REJECTION_OBSERVATIONS,
+        assess_frame,
+        get_frame_quality_stats,
+    )
+    FRAME_QUALITY_AVAILABLE = True
+except ImportError:
+    print("Warning: frame_quality not available. Every frame will be sent to Gemini.")
+    FRAME_QUALITY_AVAILABLE = False
+    FRAME_QUALITY_GATE_ENABLED = False
+
+from body_language import summarize_body_language
+from capture_pacing import CAPTURE_PACING_ENABLED, CapturePacer
+from resilience import (
+    UPSTREAM_HEDGE_AFTER,
+    UPSTREAM_TIMEOUTS,
+    CircuitOpenError,
+    DeadlineExceeded,
+    add_call_observer,
+    breaker_status,
+    get_breaker,
+    guarded_call,
+    request_timeout,
+)
+from review_jobs import ACTIVE_STATUSES as ACTIVE_REVIEW_STATUSES, CallbackNotAllowed, ReviewJobQueue
+from history_store import HistoryStore
+from session_state import create_session_backend
+from prompt_budget import (
+    accounting as prompt_accounting, count_tokens, drop_oldest, fit_prompt, get_prompt_budget_stats,
+    PROMPT_BUDGETS, trim_middle_turns, truncate_text,
+)
+from review_sections import (
+    REVIEW_PIPELINE, REVIEW_SECTION_WORKERS, REVIEW_SECTIONS, SCORING_CRITERIA, merge_review_sections, parse_section,
+)
+from vapi_events import (
+    SECRET_HEADER as VAPI_SECRET_HEADER, VAPI_WEBHOOK_SECRET, InvalidEvent, VapiEventIngestor, event_session_id,
+    format_timing_for_prompt, parse_event, turns_key, verify_secret,
+)
+from session_recorder import RECORDING_ENABLED, SessionRecorder, install_recording
+from idempotency import IdempotencyStore
+from readiness import PREWARM_ENABLED, DependencyDisabled, ReadinessRegistry
+from job_analyzer import (
+    JOB_CHUNK_CHARS, JOB_MAX_CHUNKS, MIN_LOCAL_CONFIDENCE, analyze_job_posting, merge_job_analyses, split_job_sections,
+)
+
 NGROK_URL = os.getenv("NGROK_URL", "YOUR_NGROK_HTTPS_URL_HERE")
+# VAPI posts call events here once NGROK_URL points at this backend and VAPI_WEBHOOK_SECRET is set
+VAPI_WEBHOOK_URL = f"{NGROK_URL.rstrip('/')}/api/vapi/events" if NGROK_URL.startswith('https://') else None
+if VAPI_WEBHOOK_URL and not VAPI_WEBHOOK_SECRET:
+    print("Warning: VAPI_WEBHOOK_SECRET not set. The VAPI call-event webhook will not be registered.")
+    VAPI_WEBHOOK_URL = None
+VAPI_SERVER_MESSAGES = ["transcript", "speech-update", "end-of-call-report"]
 
 
 load_dotenv()
@@ -43,7 +100,6 @@ app = Flask(__name__)
 CORS(app)
 
 
-current_job_analysis = None
 #call the api keys
 VAPI_API_KEY = os.environ.get('VAPI_API_KEY')
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
@@ -61,43 +117,74 @@ else:
     print("Warning: GOOGLE_API_KEY not found. AI analysis features will be disabled.")
     model = None
 
-frame_analyses = []
+# Pooled keep-alive connections to LinkedIn, opened early by the prewarm probe
+linkedin_http = requests.Session()
+
+# Interview state lives in the session backend so several workers can share it
+session_state = create_session_backend()
+vapi_ingestor = VapiEventIngestor(session_state)
+capture_pacer = CapturePacer(session_state, breaker=get_breaker('gemini'))
+# Idempotency-Key markers and responses are shared through the session backend like the rest of the session state
+idempotency_store = IdempotencyStore(session_state)
+idempotent = idempotency_store.idempotent
+add_call_observer(capture_pacer.observe_upstream)
+DEFAULT_SESSION_ID = 'default'
 
 question_count = 0
 current_assistant_id = None
-rate_limit_hit = False
+history = HistoryStore()
+# Token for reading every user's history; without it the history endpoints only return the caller's own sessions
+HISTORY_ADMIN_TOKEN = os.getenv('HISTORY_ADMIN_TOKEN')
+HISTORY_ADMIN_HEADER = 'X-Admin-Token'
+
+def active_session_id(explicit=None, user_id=None):
+    """Session a request belongs to: the explicit id, else the user's most recently created session"""
+    if explicit:
+        return explicit
+    return (session_state.get(current_session_key(user_id)) if user_id else None) or DEFAULT_SESSION_ID
+
+def current_session_key(user_id):
+    return f"user:{user_id}:current_session"
+
+def job_analysis_key(user_id):
+    return f"user:{user_id}:job_analysis"
+
+def frames_key(session_id):
+    return f"session:{session_id}:frames"
+
+def review_sections_key(session_id):
+    return f"session:{session_id}:review_sections"
+
+def rejected_frames_key(session_id):
+    return f"session:{session_id}:rejected_frames"
+
+def count_rejected_frame(session_id, reason):
+    """Count a frame the quality gate rejected; rejected frames are not stored as observations"""
+    session_state.update(rejected_frames_key(session_id),
+                         lambda counts: {**(counts or {}), reason: (counts or {}).get(reason, 0) + 1})
+
+def session_config_key(session_id):
+    return f"session:{session_id}:config"
+
+def rate_limit_key(session_id):
+    return f"session:{session_id}:rate_limit_hit"
+
+def get_job_analysis(user_id):
+    """The job analysis a user last ran, or None (also for requests without a userId)"""
+    return session_state.get(job_analysis_key(user_id)) if user_id else None
+
+def set_job_analysis(user_id, analysis):
+    if user_id:
+        session_state.set(job_analysis_key(user_id), analysis)
+
 #testing backend
 @app.route('/api/data')
 def get_data():
     return {'message': 'Hello from your Flask backend!'}
 
-@app.route('/api/vapi-assistant')
-#vapi calls
-def get_vapi_assistant():
- 
-    mode = request.args.get('mode', 'easy')
-    
-    # Get custom configuration parameters
-    question_type = request.args.get('questionType', 'Common Questions')
-    time_limit = request.args.get('timeLimit', 'No Time Limit')
-    curveballs = request.args.get('curveballs', 'None')
-    session_name = request.args.get('sessionName', 'Custom Interview')
-
-    frame_analyses.clear()
-    global rate_limit_hit
-    rate_limit_hit = False
-    
-    print(f"=== CREATING NEW ASSISTANT WITH MODE: {mode} ===")
-    if mode == 'custom':
-        print(f"Custom settings - Question Type: {question_type}, Time Limit: {time_limit}, Curveballs: {curveballs}")
-    
-    try:
- 
-        timestamp = int(time.time())
-        assistant_name = f"Direct-Interviewer-{mode}-{timestamp}"
-        
-        if mode == 'custom':
-            system_prompt_content = f"""You are Acey The Interviewer, an AI-powered interview coach conducting a custom interview session.
+def build_custom_system_prompt(question_type, time_limit, curveballs, session_name):
+    """Build the VAPI system prompt for a custom-mode interview"""
+    return f"""You are Acey The Interviewer, an AI-powered interview coach conducting a custom interview session.
 
 SESSION CONFIGURATION:
 - Question Type: {question_type}
@@ -144,29 +231,94 @@ CONDUCT GUIDELINES:
 - Adapt your approach based on the candidate's comfort level and performance
 
 Remember: This is a learning experience. Your goal is to help the candidate improve their interview skills while providing a realistic interview experience."""
-        else:
-            config = MODE_CONFIGS[mode]
-            system_prompt_content = config['system_prompt']
-        
-        # Add job-specific context if available
-        global current_job_analysis
-        if current_job_analysis and not current_job_analysis.get('error'):
-            job_context = f"""
+
+JOB_CONTEXT_TEXT_FIELDS = ('keyResponsibilities', 'requiredSkills', 'interviewFocus')
+
+def build_job_context(job_analysis):
+    """Role-specific block appended to the interviewer's system prompt"""
+    return f"""
 
 ROLE-SPECIFIC CONTEXT:
-- Target Role: {current_job_analysis.get('role', 'Not specified')}
-- Company: {current_job_analysis.get('company', 'Not specified')}
-- Key Responsibilities: {current_job_analysis.get('keyResponsibilities', 'Not specified')}
-- Required Skills: {current_job_analysis.get('requiredSkills', 'Not specified')}
-- Experience Level: {current_job_analysis.get('experienceLevel', 'Not specified')}
-- Industry: {current_job_analysis.get('industry', 'Not specified')}
+- Target Role: {job_analysis.get('role', 'Not specified')}
+- Company: {job_analysis.get('company', 'Not specified')}
+- Key Responsibilities: {job_analysis.get('keyResponsibilities', 'Not specified')}
+- Required Skills: {job_analysis.get('requiredSkills', 'Not specified')}
+- Experience Level: {job_analysis.get('experienceLevel', 'Not specified')}
+- Industry: {job_analysis.get('industry', 'Not specified')}
 
 ROLE-SPECIFIC INTERVIEW FOCUS:
-{current_job_analysis.get('interviewFocus', 'Focus on general interview skills and experience')}
+{job_analysis.get('interviewFocus', 'Focus on general interview skills and experience')}
 
 When asking questions, tailor them to assess the candidate's fit for this specific role. Ask about relevant experience, skills, and scenarios that would be applicable to this position. Use the STAR method (Situation, Task, Action, Result) to structure behavioral questions."""
-            
-            system_prompt_content += job_context
+
+def job_followup_topics(job_analysis, limit=12):
+    """Skills and responsibilities of the current job, tagged for the agents' question bank"""
+    if not job_analysis or job_analysis.get('error'):
+        return None
+    def as_list(value):
+        if isinstance(value, list):
+            return [str(item) for item in value]
+        return [part for part in re.split(r'[;,.]\s+|\n', str(value or '')) if part.strip()]
+    skills = job_analysis.get('skills') or as_list(job_analysis.get('requiredSkills'))
+    responsibilities = job_analysis.get('responsibilities') or as_list(job_analysis.get('keyResponsibilities'))
+    skills = [skill.strip() for skill in skills
+              if skill.strip() and skill != 'Not specified' and not re.search(r'\byears?\b', skill)]
+    topics = [f"skill:{skill}" for skill in skills[:limit // 2]]
+    topics += [f"responsibility:{item.strip()}" for item in responsibilities if item.strip() and item != 'Not specified']
+    return topics[:limit] or None
+
+def shorten_job_analysis(job_analysis, excess_tokens):
+    """Prompt-budget trimmer: cut the longest free-text field of a job analysis that can still shrink"""
+    if not job_analysis:
+        return None
+    for field in sorted(JOB_CONTEXT_TEXT_FIELDS, key=lambda name: -len(str(job_analysis.get(name, '')))):
+        value = str(job_analysis.get(field, ''))
+        shortened = truncate_text(value, max(count_tokens(value) - excess_tokens, 40))
+        if len(shortened) < len(value):
+            return {**job_analysis, field: shortened}
+    return None
+
+@app.route('/api/vapi-assistant')
+@idempotent
+#vapi calls
+def get_vapi_assistant():
+ 
+    mode = request.args.get('mode', 'easy')
+    
+    # Get custom configuration parameters
+    question_type = request.args.get('questionType', 'Common Questions')
+    time_limit = request.args.get('timeLimit', 'No Time Limit')
+    curveballs = request.args.get('curveballs', 'None')
+    session_name = request.args.get('sessionName', 'Custom Interview')
+    session_id = request.args.get('sessionId')
+    user_id = request.args.get('userId')
+    
+    print(f"=== CREATING NEW ASSISTANT WITH MODE: {mode} ===")
+    if mode == 'custom':
+        print(f"Custom settings - Question Type: {question_type}, Time Limit: {time_limit}, Curveballs: {curveballs}")
+    
+    try:
+ 
+        timestamp = int(time.time())
+        assistant_name = f"Direct-Interviewer-{mode}-{timestamp}"
+        
+        if mode == 'custom':
+            system_prompt_content = build_custom_system_prompt(question_type, time_limit, curveballs, session_name)
+        else:
+            config = MODE_CONFIGS[mode]
+            system_prompt_content = config['system_prompt']
+        
+        # Add job-specific context if available, shortening it first when the prompt is over budget
+        current_job_analysis = get_job_analysis(user_id)
+        if not current_job_analysis or current_job_analysis.get('error'):
+            current_job_analysis = None
+        base_prompt = system_prompt_content
+        system_prompt_content, _ = fit_prompt(
+            'system_prompt',
+            lambda job_analysis: base_prompt + (build_job_context(job_analysis) if job_analysis else ''),
+            {'job_analysis': current_job_analysis},
+            [('job_analysis', shorten_job_analysis)],
+        )
         
         system_prompt = {
             "role": "system",
@@ -193,7 +345,15 @@ When asking questions, tailor them to assess the candidate's fit for this specif
             role = current_job_analysis.get('role', 'this role')
             first_message = f"Welcome to your interview for the {role} position. Let's start by discussing your relevant experience and how it aligns with this role."
         
-        assistant = vapi.assistants.create(
+        webhook = {}
+        if VAPI_WEBHOOK_URL:
+            server_url = f"{VAPI_WEBHOOK_URL}?sessionId={session_id}" if session_id else VAPI_WEBHOOK_URL
+            server = {"url": server_url, "headers": {VAPI_SECRET_HEADER: VAPI_WEBHOOK_SECRET}}
+            webhook = {"server": server, "server_messages": VAPI_SERVER_MESSAGES}
+
+        assistant = guarded_call(
+            'vapi',
+            vapi.assistants.create,
             name=assistant_name,
             transcriber={
                 "provider": "deepgram",
@@ -212,25 +372,67 @@ When asking questions, tailor them to assess the candidate's fit for this specif
                 "voiceId": "21m00Tcm4TlvDq8ikWAM"
             },
             first_message=first_message,
+            request_options={"timeout_in_seconds": int(request_timeout('vapi'))},
+            **webhook,
         )
         
         current_assistant_id = assistant.id
         print(f"Assistant created successfully with ID: {assistant.id}, Name: {assistant_name}, Mode: {mode}")
-        return jsonify({"assistantId": assistant.id, "mode": mode})
+
+        current_session_id = session_id or assistant.id
+        session_state.delete(frames_key(current_session_id))
+        session_state.delete(rejected_frames_key(current_session_id))
+        session_state.delete(rate_limit_key(current_session_id))
+        if user_id:
+            session_state.set(current_session_key(user_id), current_session_id)
+        session_config = {"questionType": question_type, "timeLimit": time_limit,
+                          "curveballs": curveballs, "sessionName": session_name} if mode == 'custom' else None
+        if session_config:
+            session_state.set(session_config_key(current_session_id), session_config)
+        try:
+            history.record_session(current_session_id, user_id=user_id, mode=mode, config=session_config)
+        except Exception as e:
+            print(f"Failed to record session history: {e}")
+
+        return jsonify({"assistantId": assistant.id, "mode": mode, "sessionId": current_session_id})
     except Exception as e:
         print(f"ERROR creating assistant: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def store_frame_analysis(session_id, observation):
+    """Keep a frame observation for the review and in the session history; returns the frame count"""
+    count = session_state.append(frames_key(session_id), observation)
+    if session_id != DEFAULT_SESSION_ID:
+        try:
+            history.add_frame_observation(session_id, observation)
+        except Exception as e:
+            print(f"Failed to record frame observation: {e}")
+    return count
+
+def paced(payload, session_id):
+    """Add the server-chosen delay before the session's next frame to a frame analysis response"""
+    if CAPTURE_PACING_ENABLED:
+        payload['nextCaptureMs'] = capture_pacer.next_capture_ms(session_id,
+                                                                  session_state.get_list(frames_key(session_id)))
+    return payload
+
+def decode_frame(frame_data_url):
+    """Decode a base64 data URL from the webcam into a PIL image"""
+    header, encoded = frame_data_url.split(',', 1)
+    frame_bytes = base64.b64decode(encoded)
+    return Image.open(BytesIO(frame_bytes))
+
 @app.route('/api/analyze-frame', methods=['POST'])
+@idempotent
 def analyze_frame():
-    global rate_limit_hit
-    if rate_limit_hit:
+    data = request.get_json()
+    session_id = active_session_id((data or {}).get('sessionId'), (data or {}).get('userId'))
+    if session_state.get(rate_limit_key(session_id)):
         return jsonify({"status": "error", "message": "Rate limit previously hit. No more frames will be analyzed."}), 429
 
     print("=== FRAME ANALYSIS REQUEST RECEIVED ===")
-    data = request.get_json()
     if not data or 'frame' not in data:
         print("ERROR: No frame data provided")
         return jsonify({"error": "No frame data provided"}), 400
@@ -239,176 +441,457 @@ def analyze_frame():
     
     try:
        
-        frame_data_url = data['frame']
-        header, encoded = frame_data_url.split(',', 1)
-        print(f"Frame header: {header}")
-        print(f"Encoded data length: {len(encoded)}")
-        
-        frame_bytes = base64.b64decode(encoded)
-        print(f"Decoded frame size: {len(frame_bytes)} bytes")
-        
-        image = Image.open(BytesIO(frame_bytes))
+        image = decode_frame(data['frame'])
         print(f"Image opened successfully: {image.size} {image.mode}")
+
+        if FRAME_QUALITY_GATE_ENABLED:
+            accepted, reason, metrics = assess_frame(image)
+            if not accepted:
+                count_rejected_frame(session_id, reason)
+                print(f"Frame rejected locally ({reason}): {metrics}")
+                return jsonify(paced({"status": "success", "analysis": REJECTION_OBSERVATIONS[reason][:100], "filtered": True,
+                                      "reason": reason}, session_id))
         
         prompt = "You are a body language expert. Analyze this single frame from a mock interview. Focus on eye contact (are they looking at the computer screen area?), facial expression (do they look engaged and friendly?), and posture (are they sitting up straight?). For eye contact, it's acceptable if they're looking at the computer screen - only note it as an issue if they're looking completely away from the screen. Provide one specific, encouraging tip for improvement. Address the user as 'you'. Example: 'You look engaged! Try to maintain focus on the screen area as if you're making eye contact with the interviewer.'"
+        prompt_accounting.record('frame_analysis', count_tokens(prompt), PROMPT_BUDGETS['frame_analysis'])
         print("Sending to Gemini for analysis...")
-        response = model.generate_content([prompt, image])
+        response = guarded_call('gemini', model.generate_content, [prompt, image],
+                                deadline=UPSTREAM_TIMEOUTS['gemini_vision'],
+                                request_options={'timeout': UPSTREAM_TIMEOUTS['gemini_vision']})
         
         if response.text:
             analysis = response.text
-            frame_analyses.append(analysis)
+            stored = store_frame_analysis(session_id, analysis)
             print(f"Analysis added: {analysis[:100]}...")
-            print(f"Total analyses stored: {len(frame_analyses)}")
-            return jsonify({"status": "success", "analysis": analysis[:100]})
+            print(f"Total analyses stored: {stored}")
+            return jsonify(paced({"status": "success", "analysis": analysis[:100]}, session_id))
         else:
             print("ERROR: No response text from Gemini")
-            return jsonify({"error": "No analysis generated"}), 500
+            return jsonify(paced({"error": "No analysis generated"}, session_id)), 500
             
     except exceptions.ResourceExhausted as e:
         print("!!! Gemini API rate limit exceeded. Halting frame analysis for this call. !!!")
-        rate_limit_hit = True
+        session_state.set(rate_limit_key(session_id), True)
+        capture_pacer.quota_exhausted()
         
-        frame_analyses.append("Note: Further body language analysis was halted due to API rate limits.")
+        store_frame_analysis(session_id, "Note: Further body language analysis was halted due to API rate limits.")
         return jsonify({"error": f"Rate limit exceeded: {str(e)}"}), 429
+
+    except CircuitOpenError as e:
+        print(f"Skipping frame analysis: {e}")
+        return jsonify(paced({"error": str(e)}, session_id)), 503
             
     except Exception as e:
         print(f"ERROR analyzing frame: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({"error": f"Failed to analyze frame: {str(e)}"}), 500
+        return jsonify(paced({"error": f"Failed to analyze frame: {str(e)}"}, session_id)), 500
+@app.route('/api/frame-quality', methods=['GET'])
+def frame_quality_stats():
+    """Expose the local frame quality gate counters and thresholds"""
+    if not FRAME_QUALITY_AVAILABLE:
+        return jsonify({'error': 'Frame quality gate is not available. Please install required dependencies.'}), 503
+    return jsonify(get_frame_quality_stats())
+
 #analyzation of the frames through different video frames
 @app.route('/api/get-review', methods=['POST'])
+@idempotent
 def get_review():
     data = request.get_json()
     transcript = data.get('transcript')
     mode = data.get('mode', 'easy')
+    session_id = data.get('sessionId')
+
+    existing = None
+    if session_id:
+        existing = review_jobs.get(session_id)
+        if existing and existing['status'] in ACTIVE_REVIEW_STATUSES:
+            return jsonify(existing), 200 if existing['status'] == 'done' else 202
 
-    if not transcript and not frame_analyses:
+    # Only this session's frames; legacy clients that send no sessionId use the active session
+    history_session_id = active_session_id(session_id, data.get('userId'))
+    frame_notes = session_state.pop_list(frames_key(history_session_id))
+    rejected_frames = session_state.get(rejected_frames_key(history_session_id)) or None
+
+    # Timing measured from VAPI call events; their transcript stands in when the client sends none
+    timing = session_state.get_list(turns_key(history_session_id)) or None
+    # Custom sessions are timed against their own configured limit
+    time_limit = (session_state.get(session_config_key(history_session_id)) or {}).get('timeLimit') \
+        if mode == 'custom' else None
+    if not transcript:
+        transcript = vapi_ingestor.server_transcript(history_session_id)
+
+    # A failed job is retried with the transcript and frames it was first submitted with
+    if not transcript and not frame_notes and not rejected_frames and not existing:
         return jsonify({"review": {"error": "No data available for review. The call may have been too short."}})
 
-    body_language_summary = "No frames were analyzed."
-    if frame_analyses:
-        body_language_summary = "\\n- ".join(frame_analyses)
+    if session_id:
+        try:
+            job = review_jobs.submit(session_id, transcript, mode, frame_notes, data.get('callbackUrl'),
+                                     user_id=data.get('userId'), timing=timing, time_limit=time_limit,
+                                     rejected_frames=rejected_frames)
+        except CallbackNotAllowed as e:
+            return jsonify({"error": str(e)}), 400
+        print(f"Review job for session {session_id} is {job['status']}")
+        return jsonify(job), 202
 
-    synthesis_prompt = f"""
-    You are an expert interview coach. Analyze the following mock interview and return a JSON object.
+    sections = session_state.get(review_sections_key(history_session_id)) or {}
+    review, status_code = generate_review(transcript, mode, frame_notes, timing, time_limit, sections,
+                                          rejected_frames=rejected_frames)
+    if status_code != 200 or review.get('partial'):
+        # Put the frames back and keep the finished sections, so a retry only generates what is missing
+        for note in frame_notes:
+            session_state.append(frames_key(history_session_id), note)
+        if sections:
+            session_state.set(review_sections_key(history_session_id), sections)
+        response = make_response(jsonify(review), status_code)
+        response.headers['Cache-Control'] = 'no-store'  # not replayed for the Idempotency-Key either
+        return response
+    session_state.delete(review_sections_key(history_session_id))
+    session_state.delete(rejected_frames_key(history_session_id))
+    if history_session_id != DEFAULT_SESSION_ID:
+        record_review_history(history_session_id, {'transcript': transcript, 'mode': mode,
+                                                   'userId': data.get('userId')}, review)
+    return jsonify(review), status_code
 
-    Analyze the following transcript and body language observations.
-    
-    Transcript:
-    ---
-    {transcript}
-    ---
+def record_review_history(session_id, payload, review):
+    """Persist a finished review and its transcript to the session history"""
+    try:
+        history.save_review(session_id, payload.get('transcript'), review,
+                            user_id=payload.get('userId'), mode=payload.get('mode'))
+    except Exception as e:
+        print(f"Failed to record review history: {e}")
+
+@app.route('/api/review-jobs/<session_id>', methods=['GET'])
+def get_review_job(session_id):
+    """Poll the status and result of a background review job"""
+    job = review_jobs.get(session_id)
+    if not job:
+        return jsonify({"error": f"No review job found for session {session_id}"}), 404
+    return jsonify(job)
+
+# Static scoring rubric shared by every review, sent inline first as a stable prompt prefix (not cached).
+# Only the mode, transcript, body language and timing (the suffix) change per call.
+SYNTHESIS_RUBRIC = """
+    You are an expert interview coach. Analyze a mock interview and return a JSON object.
 
-    Body Language Observations:
-    ---
-    - {body_language_summary}
-    ---
-    
     Based on all available data, provide a comprehensive review in the following JSON format.
     The response MUST be a valid JSON object.
     
-    {{
+    {
       "whatYouDidWell": ["Point 1 about what went well.", "Point 2 about what went well."],
       "areasForImprovement": ["Point 1 about what to improve.", "Point 2 about what to improve."],
       "overallScore": <an integer score from 1 to 100>,
       "scoreExplanation": "A brief, one-sentence explanation of the score, noting how verbal and non-verbal factors were weighted. Example: 'Your body language was strong, but the score was impacted by a lack of structured answers.'",
-      "scoringBreakdown": {{
+      "scoringBreakdown": {
         "baseScore": 100,
         "bonuses": ["+5 points for effective STAR method usage", "+3 points for strong eye contact"],
         "deductions": ["-2 points for repeated 'um' usage", "-5 points for exceeding time limits"],
         "finalScore": <calculated final score>
-      }},
+      },
       "summary": "A brief, one-paragraph summary of the feedback."
-    }}
-    
-    MODE-SPECIFIC SCORING CRITERIA:
-    
-    EASY MODE (Beginner Level):
-    - Base score starts at 100 points
-    - Focus on basic communication skills and comfort level
-    - Deduct 1 point per repeated filler word between sentences
-    - STAR method usage is a bonus (+5 points if demonstrated)
-    - Body language: Basic engagement and screen focus (+3 points if good)
-    - Clear communication: +2 points if responses are easy to understand
-    - Expected score range: 70-100 (beginners should score well)
-    
-    MEDIUM MODE (Intermediate Level):
-    - Base score starts at 100 points
-    - Higher expectations for structured responses and STAR method
-    - Deduct 1 point per repeated filler word between sentences
-    - STAR method usage is expected (-10 points if not demonstrated)
-    - Time management: -5 points if consistently exceeding 15 seconds
-    - Body language: Professional engagement and confidence (+3 points if good)
-    - Structured responses: +5 points if consistently using STAR method
-    - Problem-solving: +3 points if showing analytical thinking
-    - Expected score range: 60-95 (moderate challenge)
-    
-    HARD MODE (Advanced Level):
-    - Base score starts at 100 points
-    - Strict expectations for quick thinking and structured responses
-    - Deduct 1 point per repeated filler word between sentences
-    - STAR method usage is mandatory (-15 points if not demonstrated)
-    - Time pressure: -10 points if not starting within 5 seconds consistently
-    - Complex scenario handling: -10 points if answers lack depth
-    - Body language: High confidence and composure under pressure (+5 points if excellent)
-    - Quick thinking: +5 points if responding rapidly and thoughtfully
-    - Leadership demonstration: +3 points if showing leadership qualities
-    - Expected score range: 40-90 (significant challenge)
-    
-    CUSTOM MODE (User-Configured):
-    - Base score starts at 100 points
-    - Scoring should adapt based on the custom configuration
-    - Question Type Focus: Score based on how well the candidate addressed the specific question type
-    - Time Management: Apply deductions based on the configured time limit
-    - Curveball Handling: Assess how well the candidate handled the configured curveball strategy
-    - Body language: Professional engagement and confidence (+3 points if good)
-    - STAR method usage: +5 points if demonstrated (regardless of question type)
-    - Adapt scoring expectations based on the difficulty level implied by the configuration
-    - Expected score range: 50-100 (varies based on configuration)
-    
-    SCORING BREAKDOWN REQUIREMENTS:
-    - List ALL bonuses earned with specific point values
-    - List ALL deductions with specific point values
-    - Be specific about what earned or lost points (e.g., "+5 points for STAR method", "-2 points for 3 'um' usages")
-    - Include body language observations in the breakdown
-    - Show the calculation: baseScore + bonuses - deductions = finalScore
+    }
     
+""" + SCORING_CRITERIA + """
     STAR METHOD RECOGNITION:
     - Look for evidence of STAR method usage (Situation, Task, Action, Result) in the candidate's responses
     - If the candidate demonstrates STAR structure, include it in "whatYouDidWell" with specific praise
     - Examples of STAR recognition: "You effectively used the STAR method by clearly describing the situation, your specific tasks, the actions you took, and the results achieved."
     - This is a significant positive indicator and should be highlighted when present
     
-    IMPORTANT: This interview was conducted in {mode.upper()} MODE. Apply the appropriate scoring criteria above.
-    
     Analyze for clarity, conciseness, STAR method usage, engagement, and eye contact.
+"""
+
+SYNTHESIS_RUBRIC_TOKENS = count_tokens(SYNTHESIS_RUBRIC)
+
+def build_synthesis_suffix(transcript, mode, frame_notes, timing=None, time_limit=None, rejected_frames=None):
+    """Per-review part of the synthesis prompt: mode, transcript, frame notes and measured timing"""
+    body_language_summary = summarize_body_language(frame_notes, rejected=rejected_frames)
+    timing_summary = format_timing_for_prompt(timing, mode, time_limit=time_limit) if timing else None
+    timing_section = f"""
+    Measured Answer Timing (from call events; use these numbers for time-based bonuses and deductions):
+    ---
+    {timing_summary}
+    ---
+""" if timing_summary else ""
+
+    return f"""
+    IMPORTANT: This interview was conducted in {mode.upper()} MODE. Apply the appropriate scoring criteria above.
+
+    Analyze the following transcript and body language observations.
+
+    Transcript:
+    ---
+    {transcript}
+    ---
+
+    Body Language Observations (aggregated across frames):
+    ---
+    {body_language_summary}
+    ---
+    {timing_section}
+    Return the review for this interview as the JSON object described above.
+    """
+
+def build_synthesis_prompt(transcript, mode, frame_notes, timing=None, time_limit=None, rejected_frames=None):
+    """Full synthesis prompt: the static rubric followed by the per-review suffix"""
+    return SYNTHESIS_RUBRIC + build_synthesis_suffix(transcript, mode, frame_notes, timing, time_limit,
+                                                     rejected_frames)
+
+def budget_synthesis_suffix(transcript, mode, frame_notes, timing=None, time_limit=None, rejected_frames=None):
+    """
+    Synthesis suffix trimmed to what the budget leaves after the rubric:
+    oldest frame notes go first, then middle transcript turns.
     """
+    suffix, _ = fit_prompt(
+        'synthesis',
+        lambda transcript, frame_notes: build_synthesis_suffix(transcript, mode, frame_notes, timing, time_limit,
+                                                               rejected_frames),
+        {'transcript': transcript, 'frame_notes': list(frame_notes)},
+        [('frame_notes', drop_oldest), ('transcript', trim_middle_turns)],
+        budget=PROMPT_BUDGETS['synthesis'] - SYNTHESIS_RUBRIC_TOKENS,
+    )
+    return suffix
+
+def error_review():
+    return {
+        "summary": "There was an error generating your review. The AI response may not have been in the correct format. Please try again.",
+        "whatYouDidWell": [],
+        "areasForImprovement": [],
+        "overallScore": 0,
+        "scoreExplanation": "Could not generate a score explanation."
+    }
+
+def generate_single_review(transcript, mode, frame_notes, timing=None, time_limit=None, sections=None,
+                           rejected_frames=None):
+    """Generate the whole review JSON in one Gemini call; returns (review, status_code)"""
+    synthesis_suffix = budget_synthesis_suffix(transcript, mode, frame_notes, timing, time_limit, rejected_frames)
 
     try:
         print("Generating comprehensive review with Gemini...")
-        response = model.generate_content(synthesis_prompt)
+        response = guarded_call('gemini', model.generate_content, SYNTHESIS_RUBRIC + synthesis_suffix,
+                                hedge_after=UPSTREAM_HEDGE_AFTER['gemini'],
+                                request_options={'timeout': request_timeout('gemini')})
         
         cleaned_response_text = response.text.strip().replace("```json", "").replace("```", "")
         review_json = json.loads(cleaned_response_text)
         
         print("Generated Review JSON:", review_json)
-        frame_analyses.clear()
         
-        return jsonify(review_json)
+        return review_json, 200
     except Exception as e:
         print(f"Error in get_review: {e}")
         import traceback
         traceback.print_exc()
-        fallback_review = {
-            "summary": "There was an error generating your review. The AI response may not have been in the correct format. Please try again.",
-            "whatYouDidWell": [],
-            "areasForImprovement": [],
-            "overallScore": 0,
-            "scoreExplanation": "Could not generate a score explanation."
-        }
-        frame_analyses.clear()
-        return jsonify(fallback_review), 500
+        return error_review(), 500
+
+# Sectioned reviews: each section has its own static rubric and runs concurrently
+review_section_rubric_tokens = {name: count_tokens(rubric) for name, (rubric, _, _) in REVIEW_SECTIONS.items()}
+review_section_executor = ThreadPoolExecutor(max_workers=REVIEW_SECTION_WORKERS, thread_name_prefix='review-section')
+
+def generate_review_section(name, transcript, mode, frame_notes, timing=None, time_limit=None, rejected_frames=None):
+    """Generate and parse one review section; raises when Gemini fails or the JSON is unusable"""
+    rubric, build_suffix, _ = REVIEW_SECTIONS[name]
+    timing_summary = format_timing_for_prompt(timing, mode, time_limit=time_limit) if timing else None
+    suffix, _ = fit_prompt(
+        f"review_{name}",
+        lambda transcript, frame_notes: build_suffix(transcript, mode,
+                                                     summarize_body_language(frame_notes, rejected=rejected_frames),
+                                                     timing_summary),
+        {'transcript': transcript, 'frame_notes': list(frame_notes)},
+        [('frame_notes', drop_oldest), ('transcript', trim_middle_turns)],
+        budget=PROMPT_BUDGETS['synthesis'] - review_section_rubric_tokens[name],
+    )
+    response = guarded_call(f"gemini:review_{name}", model.generate_content, rubric + suffix,
+                            hedge_after=UPSTREAM_HEDGE_AFTER['gemini'],
+                            request_options={'timeout': request_timeout('gemini')})
+    return parse_section(name, response.text)
+
+def generate_sectioned_review(transcript, mode, frame_notes, timing=None, time_limit=None, sections=None,
+                              rejected_frames=None):
+    """
+    Generate the review sections concurrently and merge them; returns (review, status_code).
+    sections holds the sections an earlier attempt already generated: only the others are
+    generated, and new ones are added to it. A review with failed sections is returned with
+    partial: true and missingSections; only a review with no sections fails.
+    """
+    completed = sections if sections is not None else {}
+    names = [name for name in REVIEW_SECTIONS if name != 'body_language' or frame_notes or rejected_frames]
+    pending = [name for name in names if not completed.get(name)]
+    print(f"Generating review sections with Gemini: {', '.join(pending)}")
+    start = time.time()
+    futures = {
+        # copy_context keeps the session recording context in the worker threads
+        name: review_section_executor.submit(contextvars.copy_context().run, generate_review_section,
+                                             name, transcript, mode, frame_notes, timing, time_limit,
+                                             rejected_frames)
+        for name in pending
+    }
+    results = {name: completed.get(name) for name in names}
+    for name, future in futures.items():
+        try:
+            results[name] = completed[name] = future.result()
+        except Exception as e:
+            print(f"Review section '{name}' failed: {e}")
+
+    if all(section is None for section in results.values()):
+        return error_review(), 500
+    review = merge_review_sections(results)
+    if review.get('missingSections'):
+        review['partial'] = True
+    print(f"Generated Review JSON in {time.time() - start:.2f}s:", review)
+    return review, 200
+
+def generate_review(transcript, mode, frame_notes, timing=None, time_limit=None, sections=None, rejected_frames=None):
+    """
+    Generate the review JSON with Gemini; returns (review, status_code).
+    A review with partial: true is shown but never saved; retrying it with the same sections
+    dict regenerates only the missing sections. rejected_frames counts frames the quality gate
+    rejected, by reason.
+    """
+    if REVIEW_PIPELINE == 'single':
+        return generate_single_review(transcript, mode, frame_notes, timing, time_limit,
+                                      rejected_frames=rejected_frames)
+    return generate_sectioned_review(transcript, mode, frame_notes, timing, time_limit, sections, rejected_frames)
+
+def recording_session_id(req, body, response_json):
+    """Session a recorded request belongs to"""
+    if req.path == '/api/vapi/events' and isinstance(body, dict) and isinstance(body.get('message'), dict):
+        return event_session_id(body['message'], req.args.get('sessionId')) or DEFAULT_SESSION_ID
+    return ((response_json or {}).get('sessionId') or (body or {}).get('sessionId')
+            or req.args.get('sessionId') or (req.view_args or {}).get('session_id')
+            or active_session_id(None, (body or {}).get('userId') or req.args.get('userId')))
+
+# Optional capture of whole sessions for replay_session.py
+recorder = None
+if RECORDING_ENABLED:
+    recorder = SessionRecorder()
+    add_call_observer(recorder.observe_upstream)
+    install_recording(app, recorder, recording_session_id)
+    atexit.register(recorder.close)
+    print(f"Recording sessions to {recorder.root}")
+
+review_jobs = ReviewJobQueue(generate_review, on_done=record_review_history,
+                             run_context=recorder.bind if recorder else None)
+# The werkzeug reloader's parent process (python app.py) only watches files; the serving process runs jobs
+if not (__name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'):
+    review_jobs.resume_pending()
+
+def _probe_gemini():
+    if not model:
+        raise DependencyDisabled("GOOGLE_API_KEY not set")
+    # count_tokens goes through the same client as generate_content, so this opens its channel
+    model.count_tokens("ping", request_options={'timeout': request_timeout('gemini')})
+
+def _probe_vapi():
+    if not vapi:
+        raise DependencyDisabled("VAPI_API_KEY not set")
+    vapi.assistants.list(limit=1, request_options={"timeout_in_seconds": int(request_timeout('vapi'))})
+
+def _probe_agents():
+    if not AGENT_AVAILABLE:
+        raise DependencyDisabled("agent_client not available")
+    return probe_agents()
+
+def _probe_linkedin():
+    linkedin_http.head('https://www.linkedin.com/', timeout=5)
+
+def _probe_stores():
+    session_state.get('readiness_probe')
+    history.query_sessions(limit=1)
+
+readiness = ReadinessRegistry()
+readiness.register('gemini', _probe_gemini)
+readiness.register('vapi', _probe_vapi)
+readiness.register('agents', _probe_agents)
+readiness.register('linkedin', _probe_linkedin)
+readiness.register('stores', _probe_stores)
+if PREWARM_ENABLED:
+    readiness.prewarm()
+
+def _float_arg(name):
+    value = request.args.get(name)
+    return float(value) if value is not None else None
+
+def is_history_admin():
+    """True when the request carries the HISTORY_ADMIN_TOKEN"""
+    token = request.headers.get(HISTORY_ADMIN_HEADER, '')
+    return bool(HISTORY_ADMIN_TOKEN) and hmac.compare_digest(token.encode(), HISTORY_ADMIN_TOKEN.encode())
+
+def history_scope():
+    """
+    (userId, error response) for a history request: admins may filter by any userId or none,
+    everyone else only sees the sessions of the userId they send.
+    """
+    user_id = request.args.get('userId')
+    if is_history_admin():
+        return user_id, None
+    if not user_id:
+        return None, (jsonify({"error": "userId is required"}), 401)
+    return user_id, None
+
+@app.route('/api/history/sessions', methods=['GET'])
+def list_history_sessions():
+    """Paginated session history of the caller (or of any user for admins), filterable by mode and time"""
+    user_id, error = history_scope()
+    if error:
+        return error
+    try:
+        page = history.query_sessions(
+            user_id=user_id,
+            mode=request.args.get('mode'),
+            since=_float_arg('since'),
+            until=_float_arg('until'),
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor'),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page)
+
+@app.route('/api/history/sessions/<session_id>', methods=['GET'])
+def get_history_session(session_id):
+    user_id, error = history_scope()
+    if error:
+        return error
+    session = history.get_session(session_id)
+    # Another user's session is reported as missing rather than forbidden
+    if not session or (user_id is not None and session.get('userId') != user_id):
+        return jsonify({"error": f"No session found with id {session_id}"}), 404
+    return jsonify(session)
+
+@app.route('/api/history/users/<user_id>/trends', methods=['GET'])
+def get_user_trends(user_id):
+    """Per-mode and per-period score trends for one user"""
+    if not is_history_admin() and request.args.get('userId') != user_id:
+        return jsonify({"error": "Trends are only available for your own userId"}), 403
+    try:
+        trends = history.user_trends(
+            user_id,
+            mode=request.args.get('mode'),
+            since=_float_arg('since'),
+            bucket_days=request.args.get('bucketDays', 7, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(trends)
+
+@app.route('/api/history/export', methods=['GET'])
+def export_history():
+    """Stream the caller's (or, for admins, all matching) sessions with transcripts and reviews as NDJSON"""
+    user_id, error = history_scope()
+    if error:
+        return error
+    try:
+        lines = history.iter_export(
+            user_id=user_id,
+            mode=request.args.get('mode'),
+            since=_float_arg('since'),
+            until=_float_arg('until'),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
 
 @app.route('/api/agent-followup', methods=['POST'])
 def agent_followup():
@@ -421,27 +904,109 @@ def agent_followup():
     answer = data.get('answer')
     question_context = data.get('question_context')
     user_id = data.get('user_id')
+    bypass_cache = bool(data.get('bypass_cache')) or request.headers.get('Cache-Control') == 'no-cache'
 
     if not answer:
         return jsonify({'error': 'No answer provided'}), 400
 
     try:
-        followup = get_followup_from_agent(mode, answer, question_context, user_id)
+        followup = get_followup_from_agent(mode, answer, question_context, user_id, bypass_cache=bypass_cache,
+                                           job_topics=job_followup_topics(get_job_analysis(user_id)))
         
         return jsonify({
             'question': followup.question,
             'difficulty': followup.difficulty,
             'reasoning': followup.reasoning,
-            'expected_focus': followup.expected_focus
+            'expected_focus': followup.expected_focus,
+            'tier': followup.tier
         })
+    except CircuitOpenError as e:
+        print(f"Agent circuit breaker open: {e}")
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         print(f"Error getting follow-up from agent: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/agent-status', methods=['GET'])
+def agent_status():
+    """Report health and load of every agent replica"""
+    if not AGENT_AVAILABLE:
+        return jsonify({'error': 'Agent features are not available. Please install required dependencies.'}), 503
+    return jsonify(get_agent_status())
+
+@app.route('/api/followup-cache', methods=['GET'])
+def followup_cache_stats():
+    """Report hit/miss metrics for the follow-up cache"""
+    if not AGENT_AVAILABLE:
+        return jsonify({'error': 'Agent features are not available. Please install required dependencies.'}), 503
+    return jsonify(get_followup_cache_stats())
+
+@app.route('/api/prompt-budget', methods=['GET'])
+def prompt_budget_status():
+    """Per-call prompt token budgets and recorded token counts"""
+    return jsonify(get_prompt_budget_stats())
+
+@app.route('/api/capture-pacing', methods=['GET'])
+def capture_pacing_stats():
+    """Gemini quota usage and active capturing sessions behind nextCaptureMs"""
+    return jsonify(capture_pacer.stats())
+
+@app.route('/api/idempotency', methods=['GET'])
+def idempotency_stats():
+    """Requests deduplicated by Idempotency-Key (attached to an in-flight original or replayed)"""
+    return jsonify(idempotency_store.stats())
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Per-dependency readiness with probe latency; 503 until every required dependency is warm"""
+    report = readiness.status(refresh=request.args.get('refresh') in ('1', 'true'))
+    return jsonify(report), 200 if report['ready'] else 503
+
+@app.route('/api/vapi/events', methods=['POST'])
+def vapi_events():
+    """Webhook for VAPI server messages (transcript, speech-update, end-of-call-report)"""
+    if not VAPI_WEBHOOK_SECRET:
+        vapi_ingestor.reject()
+        return jsonify({"error": "VAPI webhook is disabled. Set VAPI_WEBHOOK_SECRET to enable it."}), 503
+    if not verify_secret(request.headers.get(VAPI_SECRET_HEADER)):
+        vapi_ingestor.reject()
+        return jsonify({"error": "Invalid webhook secret"}), 401
+    try:
+        message = parse_event(request.get_json(silent=True))
+    except InvalidEvent as e:
+        vapi_ingestor.reject()
+        return jsonify({"error": str(e)}), 400
+
+    session_id = event_session_id(message, request.args.get('sessionId'))
+    if not session_id:
+        vapi_ingestor.reject()
+        return jsonify({"error": "Event has no sessionId or call"}), 400
+    vapi_ingestor.ingest(message, session_id)
+    return jsonify({"status": "ok"})
+
+@app.route('/api/vapi/events', methods=['GET'])
+def vapi_events_stats():
+    """Counts of received, ingested, ignored and rejected VAPI events"""
+    return jsonify(vapi_ingestor.stats())
+
+@app.route('/api/vapi/sessions/<session_id>/timing', methods=['GET'])
+def vapi_session_timing(session_id):
+    """Per-turn response latency and answer duration measured from a session's call events"""
+    mode = request.args.get('mode')
+    time_limit = request.args.get('timeLimit') or (session_state.get(session_config_key(session_id)) or {}).get('timeLimit')
+    return jsonify(vapi_ingestor.session_timing(session_id, mode, time_limit))
+
+@app.route('/api/upstream-status', methods=['GET'])
+def upstream_status():
+    """Report circuit breaker state for every upstream (Gemini, VAPI, LinkedIn, agents)"""
+    return jsonify(breaker_status())
+
 @app.route('/api/analyze-job-description', methods=['POST'])
 def analyze_job_description():
     data = request.get_json()
     job_description = data.get('jobDescription')
+    # The analysis is kept for this user's next interview; without a userId it is only returned
+    user_id = data.get('userId')
 
     if not job_description:
         return jsonify({"error": "No job description provided"}), 400
@@ -471,6 +1036,7 @@ def analyze_job_description():
                     print("Providing fallback analysis based on URL")
                     analysis = analyze_job_content(fallback_content)
                     if not analysis.get('error'):
+                        set_job_analysis(user_id, analysis)
                         analysis['warning'] = "Limited analysis due to LinkedIn extraction issues. For better results, copy the job description text directly."
                         return jsonify(analysis)
                 except Exception as fallback_error:
@@ -490,6 +1056,7 @@ def analyze_job_description():
             return jsonify({"error": analysis['error']}), 500
         
         print("Job analysis completed successfully")
+        set_job_analysis(user_id, analysis)
         return jsonify(analysis)
     except Exception as e:
         print(f"Error analyzing job description: {e}")
@@ -513,83 +1080,15 @@ def extract_linkedin_content(url):
         }
         
         print(f"Attempting to fetch LinkedIn URL: {url}")
-        response = requests.get(url, headers=headers, timeout=15)
+        response = guarded_call('linkedin', linkedin_http.get, url, headers=headers,
+                                timeout=request_timeout('linkedin'),
+                                hedge_after=UPSTREAM_HEDGE_AFTER['linkedin'])
         response.raise_for_status()
         
         print(f"Successfully fetched LinkedIn page, status: {response.status_code}")
-        soup = BeautifulSoup(response.content, 'html.parser')
+        return parse_linkedin_html(response.content)
         
-        selectors = [
-            '.description__text',
-            '.job-description',
-            '.description',
-            '[data-job-description]',
-            '.job-details',
-            '.job-description__content',
-            '.show-more-less-html__markup',
-            '.job-description__text',
-            '.job-description__content--rich-text',
-            'div[class*="job-description"]',
-            'div[class*="description"]',
-            'div[class*="content"]',
-            'section[class*="job-description"]',
-            'section[class*="description"]',
-            'section[class*="content"]',
-        ]
-        
-        print(f"Trying {len(selectors)} different selectors to find job description content...")
-        
-        for i, selector in enumerate(selectors):
-            try:
-                element = soup.select_one(selector)
-                if element:
-                    text = element.get_text(strip=True)
-                    if len(text) > 50:
-                        print(f"Found content using selector {i+1}: {selector}")
-                        print(f"Content length: {len(text)} characters")
-                        return text
-            except Exception as e:
-                print(f"Error with selector {selector}: {e}")
-                continue
-        
-        print("No specific job description found, trying to extract general page content...")
-        title = soup.find('title')
-        if title:
-            title_text = title.get_text(strip=True)
-            print(f"Found page title: {title_text}")
-        
-            paragraphs = soup.find_all('p')
-            paragraph_text = ' '.join([p.get_text(strip=True) for p in paragraphs[:10]])
-            
-            if paragraph_text:
-                combined_text = f"{title_text}\n\n{paragraph_text}"
-                print(f"Combined content length: {len(combined_text)} characters")
-                return combined_text
-            else:
-                print("No paragraph content found, returning title only")
-                return title_text
-        
-        print("Trying to find any job-related content...")
-        all_text = soup.get_text()
-        if len(all_text) > 100:
-            job_keywords = ['responsibilities', 'requirements', 'qualifications', 'experience', 'skills', 'duties', 'role', 'position']
-            lines = all_text.split('\n')
-            relevant_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if any(keyword in line.lower() for keyword in job_keywords) and len(line) > 20:
-                    relevant_lines.append(line)
-            
-            if relevant_lines:
-                content = '\n'.join(relevant_lines[:20])
-                print(f"Found {len(relevant_lines)} relevant lines")
-                return content
-        
-        print("Could not extract meaningful content from LinkedIn page")
-        return "LinkedIn job posting content could not be extracted. This might be due to LinkedIn's anti-scraping measures. Please try copying the job description text directly instead of using the LinkedIn URL."
-        
-    except requests.exceptions.Timeout:
+    except (requests.exceptions.Timeout, DeadlineExceeded):
         print("Request timeout when accessing LinkedIn URL")
         return "Request timeout when accessing LinkedIn URL. The page might be taking too long to load. Please try copying the job description text directly."
     except requests.exceptions.ConnectionError:
@@ -603,6 +1102,9 @@ def extract_linkedin_content(url):
             return "LinkedIn job posting not found. The URL might be invalid or the job posting might have been removed. Please check the URL or copy the job description text directly."
         else:
             return f"HTTP error ({e.response.status_code}) when accessing LinkedIn URL. Please try copying the job description text directly."
+    except CircuitOpenError:
+        print("LinkedIn circuit breaker is open, skipping fetch")
+        return "Error accessing LinkedIn URL: too many recent failures. Please try copying the job description text directly instead of using the LinkedIn URL."
     except requests.exceptions.RequestException as e:
         print(f"Request error extracting LinkedIn content: {e}")
         return "Error accessing LinkedIn URL. Please try copying the job description text directly instead of using the LinkedIn URL."
@@ -612,17 +1114,143 @@ def extract_linkedin_content(url):
         traceback.print_exc()
         return "Error extracting content from LinkedIn URL. Please try copying the job description text directly."
 
+def parse_linkedin_html(html):
+    """Extract job description text from a fetched LinkedIn job page"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    selectors = [
+        '.description__text',
+        '.job-description',
+        '.description',
+        '[data-job-description]',
+        '.job-details',
+        '.job-description__content',
+        '.show-more-less-html__markup',
+        '.job-description__text',
+        '.job-description__content--rich-text',
+        'div[class*="job-description"]',
+        'div[class*="description"]',
+        'div[class*="content"]',
+        'section[class*="job-description"]',
+        'section[class*="description"]',
+        'section[class*="content"]',
+    ]
+
+    print(f"Trying {len(selectors)} different selectors to find job description content...")
+
+    for i, selector in enumerate(selectors):
+        try:
+            element = soup.select_one(selector)
+            if element:
+                text = element.get_text(strip=True)
+                if len(text) > 50:
+                    print(f"Found content using selector {i+1}: {selector}")
+                    print(f"Content length: {len(text)} characters")
+                    return text
+        except Exception as e:
+            print(f"Error with selector {selector}: {e}")
+            continue
+
+    print("No specific job description found, trying to extract general page content...")
+    title = soup.find('title')
+    if title:
+        title_text = title.get_text(strip=True)
+        print(f"Found page title: {title_text}")
+
+        paragraphs = soup.find_all('p')
+        paragraph_text = ' '.join([p.get_text(strip=True) for p in paragraphs[:10]])
+
+        if paragraph_text:
+            combined_text = f"{title_text}\n\n{paragraph_text}"
+            print(f"Combined content length: {len(combined_text)} characters")
+            return combined_text
+        else:
+            print("No paragraph content found, returning title only")
+            return title_text
+
+    print("Trying to find any job-related content...")
+    all_text = soup.get_text()
+    if len(all_text) > 100:
+        job_keywords = ['responsibilities', 'requirements', 'qualifications', 'experience', 'skills', 'duties', 'role', 'position']
+        lines = all_text.split('\n')
+        relevant_lines = []
+
+        for line in lines:
+            line = line.strip()
+            if any(keyword in line.lower() for keyword in job_keywords) and len(line) > 20:
+                relevant_lines.append(line)
+
+        if relevant_lines:
+            content = '\n'.join(relevant_lines[:20])
+            print(f"Found {len(relevant_lines)} relevant lines")
+            return content
+
+    print("Could not extract meaningful content from LinkedIn page")
+    return "LinkedIn job posting content could not be extracted. This might be due to LinkedIn's anti-scraping measures. Please try copying the job description text directly instead of using the LinkedIn URL."
+
+# Sections of long job postings are analyzed in parallel (see split_job_sections)
+job_chunk_executor = ThreadPoolExecutor(max_workers=int(os.getenv('JOB_CHUNK_WORKERS', '8')),
+                                        thread_name_prefix='job-chunk')
+
 def analyze_job_content(content):
-    """Analyze job content using AI to extract key information"""
+    """Analyze job content locally, using AI only when the local analysis is not confident enough"""
+    local_analysis = analyze_job_posting(content)
+    if local_analysis['confidence'] >= MIN_LOCAL_CONFIDENCE:
+        print(f"Using local job analysis (confidence {local_analysis['confidence']})")
+        return local_analysis
+
     try:
         if not model:
             print("Using fallback job analysis (no AI)")
-            return fallback_job_analysis(content)
+            return local_analysis
+
+        chunks = split_job_sections(content)
+        chunk_chars = max(JOB_CHUNK_CHARS, *(len(chunk) for chunk in chunks))
+        if chunk_chars > JOB_CHUNK_CHARS:
+            print(f"Job posting of {len(content)} characters is split into chunks of up to {chunk_chars} characters "
+                  f"to stay within {JOB_MAX_CHUNKS} chunks")
+        if len(chunks) == 1:
+            analysis = analyze_job_chunk(content, max_chars=chunk_chars)
+        else:
+            # Map: analyze sections concurrently; reduce: merge the partial results
+            title = content.strip().splitlines()[0][:200]
+            futures = [job_chunk_executor.submit(contextvars.copy_context().run, analyze_job_chunk,
+                                                  chunk, index + 1, len(chunks), title, chunk_chars)
+                       for index, chunk in enumerate(chunks)]
+            partials = []
+            for future in futures:
+                try:
+                    partial = future.result()
+                except Exception as e:
+                    print(f"Job analysis chunk failed: {e}")
+                    partial = None
+                if partial:
+                    partials.append(partial)
+            print(f"Analyzed job posting in {len(chunks)} chunks ({len(partials)} succeeded)")
+            analysis = merge_job_analyses(partials) if partials else None
+
+        if not analysis:
+            return local_analysis
 
-        if len(content) > 4000:
-            content = content[:4000] + "..."
+        return analysis
         
-        prompt = f"""
+    except Exception as e:
+        print(f"Error analyzing job content: {e}")
+        import traceback
+        traceback.print_exc()
+        return local_analysis
+
+def analyze_job_chunk(content, part=None, total=None, title=None, max_chars=JOB_CHUNK_CHARS):
+    """
+    Ask Gemini for the job analysis JSON of one posting (or one section of it); None if unparseable.
+    The budget covers a whole chunk of max_chars, so chunks from split_job_sections are never trimmed.
+    """
+    context = ""
+    if total:
+        context = f"This is part {part} of {total} of a longer job posting titled \"{title}\". Analyze only what this part contains.\n"
+
+    def render(content):
+        return f"""
         Analyze the following job description and extract key information. Return a JSON object with the following structure:
         
         {{
@@ -634,107 +1262,47 @@ def analyze_job_content(content):
             "industry": "Industry or sector",
             "interviewFocus": "What the interviewer should focus on when asking questions"
         }}
-        
+        {context}
         Job Description:
         {content}
         
         Provide a concise but comprehensive analysis. If any information is not available, use "Not specified" for that field.
         Return ONLY the JSON object, no additional text.
         """
-        
-        response = model.generate_content(prompt)
-        
-        cleaned_response = response.text.strip()
-        if cleaned_response.startswith('```json'):
-            cleaned_response = cleaned_response[7:]
-        if cleaned_response.endswith('```'):
-            cleaned_response = cleaned_response[:-3]
-        if cleaned_response.startswith('```'):
-            cleaned_response = cleaned_response[3:]
-        if cleaned_response.endswith('```'):
-            cleaned_response = cleaned_response[:-3]
-        
-        try:
-            analysis = json.loads(cleaned_response.strip())
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            print(f"Raw response: {cleaned_response}")
-
-            return fallback_job_analysis(content)
-        
-        global current_job_analysis
-        current_job_analysis = analysis
-        
-        return analysis
-        
-    except Exception as e:
-        print(f"Error analyzing job content: {e}")
-        import traceback
-        traceback.print_exc()
-        return fallback_job_analysis(content)
 
-def fallback_job_analysis(content):
-    """Simple fallback job analysis without AI"""
-    content_lower = content.lower()
-    
-    role = "Job Role"
-    company = "Company"
-    key_responsibilities = "Responsibilities will be assessed during the interview"
-    required_skills = "Skills will be evaluated during the interview"
-    experience_level = "Not specified"
-    industry = "Not specified"
-    interview_focus = "Focus on general interview skills and experience"
-
-    role_keywords = ['engineer', 'developer', 'manager', 'analyst', 'specialist', 'coordinator', 'assistant', 'director', 'lead', 'architect']
-    for keyword in role_keywords:
-        if keyword in content_lower:
-            role = f"{keyword.title()} Position"
-            break
-    
-    if 'at ' in content_lower:
-        parts = content.split(' at ')
-        if len(parts) > 1:
-            company_part = parts[1].split()[0]
-            if len(company_part) > 2:
-                company = company_part.title()
+    budget = max(PROMPT_BUDGETS['job_analysis'], count_tokens(render('')) + count_tokens('x' * max_chars))
+    prompt, tokens = fit_prompt(
+        'job_analysis', render, {'content': content},
+        [('content', lambda text, excess: truncate_text(text, count_tokens(text) - excess) if count_tokens(text) > excess else None)],
+        budget=budget,
+    )
+    if tokens < count_tokens(render(content)):
+        print(f"Job analysis chunk {part or 1} of {total or 1} was trimmed to {tokens} tokens")
     
-    if 'senior' in content_lower:
-        experience_level = "Senior"
-    elif 'junior' in content_lower or 'entry' in content_lower:
-        experience_level = "Junior"
-    elif 'mid' in content_lower or 'intermediate' in content_lower:
-        experience_level = "Mid"
+    response = guarded_call('gemini', model.generate_content, prompt,
+                            hedge_after=UPSTREAM_HEDGE_AFTER['gemini'],
+                            request_options={'timeout': request_timeout('gemini')})
     
-    industry_keywords = {
-        'tech': 'Technology',
-        'software': 'Technology',
-        'healthcare': 'Healthcare',
-        'finance': 'Finance',
-        'marketing': 'Marketing',
-        'sales': 'Sales',
-        'education': 'Education',
-        'consulting': 'Consulting'
-    }
-    
-    for keyword, industry_name in industry_keywords.items():
-        if keyword in content_lower:
-            industry = industry_name
-            break
-    
-    analysis = {
-        "role": role,
-        "company": company,
-        "keyResponsibilities": key_responsibilities,
-        "requiredSkills": required_skills,
-        "experienceLevel": experience_level,
-        "industry": industry,
-        "interviewFocus": interview_focus
-    }
+    cleaned_response = response.text.strip()
+    if cleaned_response.startswith('```json'):
+        cleaned_response = cleaned_response[7:]
+    if cleaned_response.endswith('```'):
+        cleaned_response = cleaned_response[:-3]
+    if cleaned_response.startswith('```'):
+        cleaned_response = cleaned_response[3:]
+    if cleaned_response.endswith('```'):
+        cleaned_response = cleaned_response[:-3]
     
-    global current_job_analysis
-    current_job_analysis = analysis
-    
-    return analysis
+    try:
+        return json.loads(cleaned_response.strip())
+    except json.JSONDecodeError as e:
+        print(f"JSON parsing error: {e}")
+        print(f"Raw response: {cleaned_response}")
+        return None
+
+def fallback_job_analysis(content):
+    """Job analysis without AI, using the local single-pass analyzer"""
+    return analyze_job_posting(content)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001) 
\ No newline at end of file
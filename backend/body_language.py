@@ -0,0 +1,179 @@
+"""
+Body language observation aggregation.
+Normalizes each per-frame Gemini analysis into a few categorical signals and
+builds a compact, bounded summary for the review prompt.
+"""
+
+import re
+from collections import Counter
+
+EYE_CONTACT_AWAY = ['looking away', 'look away', 'away from the screen', 'not looking', 'looking down',
+                    'looking to the side', 'off-screen', 'off screen', 'avoiding', 'glancing', 'distracted']
+EYE_CONTACT_ON_SCREEN = ['eye contact', 'looking at the screen', 'looking at the computer', 'screen area',
+                         'focused on the screen', 'focus on the screen', 'looking directly']
+
+EXPRESSION_TENSE = ['nervous', 'tense', 'anxious', 'stiff', 'frown', 'uncomfortable', 'stressed', 'worried']
+EXPRESSION_ENGAGED = ['engaged', 'friendly', 'smil', 'confident', 'warm', 'attentive', 'positive', 'enthusias']
+EXPRESSION_NEUTRAL = ['neutral', 'calm', 'serious', 'focused', 'composed']
+
+POSTURE_SLOUCHED = ['slouch', 'hunched', 'slumped', 'leaning back', 'leaning too', 'leaning forward too']
+POSTURE_UPRIGHT = ['upright', 'sitting up straight', 'sitting straight', 'good posture', 'sitting up', 'straight posture']
+
+TIP_MARKERS = ['try', 'consider', 'remember', 'make sure', 'keep', 'avoid']
+
+# Observations that stand in for frames that could not be analyzed
+UNUSABLE_PREFIXES = ['Note:']
+
+SIGNALS = [
+    ('eye_contact', 'Eye contact'),
+    ('expression', 'Expression'),
+    ('posture', 'Posture'),
+]
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_NON_WORD = re.compile(r'[^a-z0-9 ]+')
+
+
+def _match(text, keywords):
+    return any(keyword in text for keyword in keywords)
+
+
+def _normalize_tip(tip):
+    """Lowercase and strip punctuation so near-identical tips dedupe together"""
+    return ' '.join(_NON_WORD.sub(' ', tip.lower()).split())
+
+
+def normalize_observation(text):
+    """
+    Reduce one frame analysis to categorical signals.
+    Returns a dict with eye_contact, expression, posture and tip, or an
+    'unusable' reason for frames that were skipped.
+    """
+    text = (text or '').strip()
+    if any(text.startswith(prefix) for prefix in UNUSABLE_PREFIXES):
+        return {'unusable': 'skipped'}
+
+    # The tip sentence usually repeats the signal words ("try to keep eye contact"),
+    # so classify only on the descriptive sentences.
+    observations = []
+    tip = None
+    for sentence in _SENTENCE_SPLIT.split(text):
+        lowered = sentence.lower()
+        if tip is None and _match(lowered, TIP_MARKERS):
+            tip = sentence.strip()
+        else:
+            observations.append(lowered)
+    described = ' '.join(observations) or text.lower()
+
+    if _match(described, EYE_CONTACT_AWAY):
+        eye_contact = 'looking away'
+    elif _match(described, EYE_CONTACT_ON_SCREEN):
+        eye_contact = 'on screen'
+    else:
+        eye_contact = 'not noted'
+
+    if _match(described, EXPRESSION_TENSE):
+        expression = 'tense'
+    elif _match(described, EXPRESSION_ENGAGED):
+        expression = 'engaged'
+    elif _match(described, EXPRESSION_NEUTRAL):
+        expression = 'neutral'
+    else:
+        expression = 'not noted'
+
+    if _match(described, POSTURE_SLOUCHED):
+        posture = 'slouched'
+    elif _match(described, POSTURE_UPRIGHT):
+        posture = 'upright'
+    else:
+        posture = 'not noted'
+
+    return {
+        'eye_contact': eye_contact,
+        'expression': expression,
+        'posture': posture,
+        'tip': tip,
+    }
+
+
+def aggregate_observations(frame_analyses):
+    """Count signal frequencies, dedupe tips and record when signals change"""
+    counts = {key: Counter() for key, _ in SIGNALS}
+    unusable = Counter()
+    tips = Counter()
+    tip_text = {}
+    timeline = []
+    previous = None
+
+    for index, analysis in enumerate(frame_analyses, 1):
+        signals = normalize_observation(analysis)
+        if 'unusable' in signals:
+            unusable[signals['unusable']] += 1
+            continue
+
+        for key, _ in SIGNALS:
+            counts[key][signals[key]] += 1
+
+        if signals['tip']:
+            tip_key = _normalize_tip(signals['tip'])
+            tips[tip_key] += 1
+            tip_text.setdefault(tip_key, signals['tip'])
+
+        current = tuple(signals[key] for key, _ in SIGNALS)
+        if previous is None:
+            timeline.append((index, [f"{label.lower()} {value}" for (_, label), value in zip(SIGNALS, current)]))
+        elif current != previous:
+            changes = [f"{label.lower()} {old} -> {new}"
+                       for (_, label), old, new in zip(SIGNALS, previous, current) if old != new]
+            timeline.append((index, changes))
+        previous = current
+
+    return {
+        'total': len(frame_analyses),
+        'counts': counts,
+        'unusable': unusable,
+        'tips': [(tip_text[key], count) for key, count in tips.most_common()],
+        'timeline': timeline,
+    }
+
+
+def summarize_body_language(frame_analyses, max_tips=5, max_timeline=8, rejected=None):
+    """
+    Build a compact body language block whose size does not grow with interview length.
+    rejected counts frames the local quality gate rejected, by reason; they only add to the
+    unusable frame counts and never to the signals.
+    """
+    if not frame_analyses and not rejected:
+        return "No frames were analyzed."
+
+    aggregate = aggregate_observations(frame_analyses)
+    analyzed = aggregate['total'] - sum(aggregate['unusable'].values())
+    aggregate['unusable'].update(rejected or {})
+    captured = aggregate['total'] + sum((rejected or {}).values())
+
+    lines = [f"Frames captured: {captured} ({analyzed} analyzed)"]
+    if aggregate['unusable']:
+        reasons = ', '.join(f"{reason} x{count}" for reason, count in aggregate['unusable'].most_common())
+        lines.append(f"Unusable frames: {reasons}")
+
+    if analyzed:
+        for key, label in SIGNALS:
+            frequencies = ', '.join(f"{value} {count}/{analyzed}" for value, count in aggregate['counts'][key].most_common())
+            lines.append(f"{label}: {frequencies}")
+
+        timeline = aggregate['timeline']
+        if len(timeline) > max_timeline:
+            head = max_timeline // 2
+            omitted = len(timeline) - max_timeline
+            timeline = timeline[:head] + [(None, [f"... {omitted} more changes ..."])] + timeline[-(max_timeline - head):]
+        lines.append("Changes over time:")
+        for index, changes in timeline:
+            prefix = f"Frame {index}: " if index is not None else ""
+            lines.append(f"- {prefix}{'; '.join(changes)}")
+
+        if aggregate['tips']:
+            lines.append("Most repeated tips:")
+            for tip, count in aggregate['tips'][:max_tips]:
+                lines.append(f"- (x{count}) {tip}")
+
+    return '\n'.join(lines)
@@ -0,0 +1,111 @@
+"""
+Adaptive webcam capture pacing.
+/api/analyze-frame tells the client when to send the next frame
+(nextCaptureMs) instead of the client capturing on a fixed 30s timer. The
+interval grows as Gemini calls approach the shared per-minute quota and is
+never shorter than the active sessions' fair share of it; after a 429 or
+while the Gemini breaker is open it backs off to the maximum. When quota is
+idle it shrinks, and it shrinks further while the candidate's body language
+is changing between frames and grows while it is steady.
+Call and session counts live in the session backend, so every worker sees them.
+"""
+
+import os
+import uuid
+
+from body_language import SIGNALS, normalize_observation
+
+CAPTURE_PACING_ENABLED = os.getenv('CAPTURE_PACING', 'true').lower() in ('1', 'true', 'yes')
+CAPTURE_INTERVAL_MS = int(os.getenv('CAPTURE_INTERVAL_MS', '30000'))  # interval at nominal load
+CAPTURE_MIN_MS = int(os.getenv('CAPTURE_MIN_MS', '10000'))
+CAPTURE_MAX_MS = int(os.getenv('CAPTURE_MAX_MS', '120000'))
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', '15'))  # requests per minute allowed by the Gemini API key
+CAPTURE_QUOTA_SHARE = float(os.getenv('CAPTURE_QUOTA_SHARE', '0.7'))  # part of the quota frames may use
+QUOTA_COOLDOWN = float(os.getenv('GEMINI_QUOTA_COOLDOWN', '60'))  # seconds of maximum interval after a 429
+CHANGE_WINDOW = 4  # recent usable observations compared for change
+
+QUOTA_WINDOW = 60  # seconds; Gemini quotas are per minute
+CALL_KEY_PREFIX = 'quota:gemini:call:'
+EXHAUSTED_KEY = 'quota:gemini:exhausted'
+ACTIVE_KEY_PREFIX = 'capture:active:'
+
+
+class CapturePacer:
+    """Computes nextCaptureMs from quota usage, active sessions and observation change"""
+
+    def __init__(self, session_state, breaker=None, rpm=GEMINI_RPM, quota_share=CAPTURE_QUOTA_SHARE,
+                 base_ms=CAPTURE_INTERVAL_MS, min_ms=CAPTURE_MIN_MS, max_ms=CAPTURE_MAX_MS):
+        self.session_state = session_state
+        self.breaker = breaker
+        self.rpm = rpm
+        self.quota_share = quota_share
+        self.base_ms = base_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+
+    def observe_upstream(self, upstream, duration, result, error):
+        """resilience call observer: count every Gemini call against the per-minute quota"""
+        if upstream.split(':')[0] != 'gemini':
+            return
+        self.session_state.set(f"{CALL_KEY_PREFIX}{uuid.uuid4().hex}", 1, ttl=QUOTA_WINDOW)
+        if error is not None and type(error).__name__ == 'ResourceExhausted':
+            self.quota_exhausted()
+
+    def quota_exhausted(self):
+        self.session_state.set(EXHAUSTED_KEY, True, ttl=QUOTA_COOLDOWN)
+
+    def mark_active(self, session_id):
+        """Count the session as capturing until it misses a couple of maximum intervals"""
+        self.session_state.set(f"{ACTIVE_KEY_PREFIX}{session_id}", 1, ttl=2 * self.max_ms / 1000)
+
+    def quota_state(self):
+        calls = self.session_state.count_keys(CALL_KEY_PREFIX)
+        budget = max(1.0, self.rpm * self.quota_share)
+        return {
+            'callsLastMinute': calls,
+            'captureBudgetPerMinute': round(budget, 1),
+            'utilization': round(calls / budget, 2),
+            'exhausted': bool(self.session_state.get(EXHAUSTED_KEY)),
+            'breakerOpen': self.breaker is not None and self.breaker.state == 'open',
+        }
+
+    @staticmethod
+    def change_rate(observations):
+        """Fraction of body-language signals that changed between consecutive recent frames (None if too few)"""
+        recent = []
+        for observation in reversed(observations):
+            signals = normalize_observation(observation)
+            if 'unusable' not in signals:
+                recent.append(tuple(signals[key] for key, _ in SIGNALS))
+                if len(recent) == CHANGE_WINDOW:
+                    break
+        if len(recent) < 2:
+            return None
+        changed = sum(a != b for newer, older in zip(recent, recent[1:]) for a, b in zip(newer, older))
+        return changed / ((len(recent) - 1) * len(SIGNALS))
+
+    def next_capture_ms(self, session_id, observations):
+        """Milliseconds until the session's next frame; also marks the session active"""
+        self.mark_active(session_id)
+        quota = self.quota_state()
+        if quota['exhausted'] or quota['breakerOpen']:
+            return self.max_ms
+
+        # Idle quota halves the interval; at the capture budget it is 1.5x
+        interval = self.base_ms * (0.5 + quota['utilization'])
+        change = self.change_rate(observations)
+        if change is not None:
+            interval *= 1.5 - change  # steady: 1.5x, every signal changing: 0.5x
+
+        active = max(1, self.session_state.count_keys(ACTIVE_KEY_PREFIX))
+        fair_share_ms = active * 60000 / quota['captureBudgetPerMinute']
+        interval = max(interval, fair_share_ms)
+        return int(min(self.max_ms, max(self.min_ms, interval)))
+
+    def stats(self):
+        return {
+            **self.quota_state(),
+            'activeSessions': self.session_state.count_keys(ACTIVE_KEY_PREFIX),
+            'enabled': CAPTURE_PACING_ENABLED,
+            'intervalMs': {'base': self.base_ms, 'min': self.min_ms, 'max': self.max_ms},
+        }
@@ -0,0 +1,104 @@
+"""
+Bounded LRU + TTL cache for agent follow-up questions.
+Keyed by (mode, question_context, normalized answer hash, user_id, job topics
+hash) so replays and repeated answers are served without a uAgents round trip,
+and a bank question chosen for one user or job is never replayed to another.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+FOLLOWUP_CACHE_ENABLED = os.getenv('FOLLOWUP_CACHE', '1') != '0'
+FOLLOWUP_CACHE_SIZE = int(os.getenv('FOLLOWUP_CACHE_SIZE', '1024'))
+FOLLOWUP_CACHE_TTL = float(os.getenv('FOLLOWUP_CACHE_TTL', '3600'))  # seconds
+# Follow-ups generated by the LLM (fresh or from the agent's cache); fallback tiers are never cached
+CACHEABLE_TIERS = ('llm', 'cache')
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())
+
+
+def followup_cache_key(mode, answer, question_context=None, user_id=None, job_topics=None):
+    """Build the cache key for a follow-up request"""
+    answer_hash = hashlib.sha256(normalize_text(answer).encode('utf-8')).hexdigest()
+    topics_hash = hashlib.sha256('\n'.join(normalize_text(t) for t in job_topics or ()).encode('utf-8')).hexdigest()
+    return (mode, normalize_text(question_context), answer_hash, user_id or '', topics_hash)
+
+
+class FollowUpCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed TTL"""
+
+    def __init__(self, max_size=FOLLOWUP_CACHE_SIZE, ttl=FOLLOWUP_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries if full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss metrics and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': FOLLOWUP_CACHE_ENABLED,
+                'size': len(self._entries),
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypasses': self.bypasses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+followup_cache = FollowUpCache()
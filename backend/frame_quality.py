@@ -0,0 +1,137 @@
+"""
+Local frame quality gate for body language analysis.
+Cheap NumPy checks on a downscaled copy of each webcam frame so black, blurred,
+overexposed or empty frames are rejected before a Gemini vision call is made.
+"""
+
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+# Thresholds are on the 0-255 grayscale range unless noted otherwise.
+FRAME_QUALITY_THRESHOLDS = {
+    'min_brightness': float(os.getenv('FRAME_MIN_BRIGHTNESS', '35')),
+    'max_brightness': float(os.getenv('FRAME_MAX_BRIGHTNESS', '225')),
+    'min_contrast': float(os.getenv('FRAME_MIN_CONTRAST', '12')),
+    'min_sharpness': float(os.getenv('FRAME_MIN_SHARPNESS', '25')),
+    'min_skin_ratio': float(os.getenv('FRAME_MIN_SKIN_RATIO', '0.02')),  # fraction of the center region
+    'max_side': int(os.getenv('FRAME_QUALITY_MAX_SIDE', '160')),  # downscale target in pixels
+}
+
+FRAME_QUALITY_GATE_ENABLED = os.getenv('FRAME_QUALITY_GATE', '1') != '0'
+
+# Tips returned to the client for rejected frames; the review only counts rejections by reason
+REJECTION_OBSERVATIONS = {
+    'too_dark': "The frame was too dark to read your body language. Try adding a light source in front of you.",
+    'overexposed': "The frame was washed out by bright light. Try facing away from windows or lowering the brightness behind the camera.",
+    'low_contrast': "The frame had very little detail. Make sure your camera is uncovered and you are clearly lit.",
+    'blurry': "The frame was too blurry to analyze. Try to stay within the camera's focus and keep the camera steady.",
+    'no_person': "You weren't visible in the frame. Try to stay centered in the camera view so the interviewer can see you.",
+}
+
+_stats_lock = threading.Lock()
+_frame_stats = Counter()
+
+
+def _downscaled_arrays(image, max_side):
+    """Return (grayscale, YCbCr) float32 arrays of a small copy of the image"""
+    small = image.convert('RGB')
+    small.thumbnail((max_side, max_side), Image.BILINEAR)
+    gray = np.asarray(small.convert('L'), dtype=np.float32)
+    ycbcr = np.asarray(small.convert('YCbCr'), dtype=np.float32)
+    return gray, ycbcr
+
+
+def _laplacian_variance(gray):
+    """Variance of the 4-neighbour Laplacian, a standard focus measure"""
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    lap = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+           - 4.0 * gray[1:-1, 1:-1])
+    return float(lap.var())
+
+
+def _skin_ratio(ycbcr):
+    """Fraction of skin-toned pixels in the center of the frame where a face is expected"""
+    height, width = ycbcr.shape[:2]
+    center = ycbcr[int(height * 0.1):int(height * 0.85), int(width * 0.2):int(width * 0.8)]
+    if center.size == 0:
+        return 0.0
+    cb = center[..., 1]
+    cr = center[..., 2]
+    skin = (cb >= 77) & (cb <= 127) & (cr >= 133) & (cr <= 173)
+    return float(skin.mean())
+
+
+def compute_frame_metrics(image, max_side=None):
+    """Compute brightness, contrast, sharpness and skin ratio for a PIL image"""
+    if max_side is None:
+        max_side = FRAME_QUALITY_THRESHOLDS['max_side']
+    gray, ycbcr = _downscaled_arrays(image, max_side)
+    return {
+        'brightness': float(gray.mean()),
+        'contrast': float(gray.std()),
+        'sharpness': _laplacian_variance(gray),
+        'skinRatio': _skin_ratio(ycbcr),
+    }
+
+
+def assess_frame(image, thresholds=None):
+    """
+    Decide whether a frame is worth sending to Gemini.
+    Returns (accepted, reason, metrics); reason is None for accepted frames.
+    """
+    limits = dict(FRAME_QUALITY_THRESHOLDS)
+    if thresholds:
+        limits.update(thresholds)
+
+    metrics = compute_frame_metrics(image, limits['max_side'])
+
+    # Ordered so the most fundamental problem is reported first
+    if metrics['brightness'] < limits['min_brightness']:
+        reason = 'too_dark'
+    elif metrics['brightness'] > limits['max_brightness']:
+        reason = 'overexposed'
+    elif metrics['contrast'] < limits['min_contrast']:
+        reason = 'low_contrast'
+    elif metrics['sharpness'] < limits['min_sharpness']:
+        reason = 'blurry'
+    elif metrics['skinRatio'] < limits['min_skin_ratio']:
+        reason = 'no_person'
+    else:
+        reason = None
+
+    with _stats_lock:
+        _frame_stats['assessed'] += 1
+        if reason:
+            _frame_stats['rejected'] += 1
+            _frame_stats[f'rejected_{reason}'] += 1
+        else:
+            _frame_stats['accepted'] += 1
+
+    return reason is None, reason, metrics
+
+
+def get_frame_quality_stats():
+    """Return a snapshot of the gate counters, including per-reason rejections"""
+    with _stats_lock:
+        snapshot = dict(_frame_stats)
+    return {
+        'enabled': FRAME_QUALITY_GATE_ENABLED,
+        'assessed': snapshot.get('assessed', 0),
+        'accepted': snapshot.get('accepted', 0),
+        'rejected': snapshot.get('rejected', 0),
+        'rejectedByReason': {
+            reason: snapshot.get(f'rejected_{reason}', 0) for reason in REJECTION_OBSERVATIONS
+        },
+        'thresholds': dict(FRAME_QUALITY_THRESHOLDS),
+    }
+
+
+def reset_frame_quality_stats():
+    """Clear all gate counters"""
+    with _stats_lock:
+        _frame_stats.clear()
@@ -0,0 +1,272 @@
+"""
+Indexed local store for interview history.
+Sessions, transcripts, frame observations and review JSON are kept in SQLite
+(indexed on user, mode and time) so per-user trends and paginated queries stay
+fast without loading whole histories into memory.
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import time
+
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.db'))
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '50'))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', '500'))
+EXPORT_BATCH_SIZE = 200
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        user_id TEXT,
+        mode TEXT,
+        started_at REAL NOT NULL,
+        ended_at REAL,
+        overall_score INTEGER,
+        config TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS transcripts (
+        session_id TEXT PRIMARY KEY REFERENCES sessions(session_id),
+        content TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS frame_observations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL REFERENCES sessions(session_id),
+        captured_at REAL NOT NULL,
+        observation TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS reviews (
+        session_id TEXT PRIMARY KEY REFERENCES sessions(session_id),
+        review TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_user_time ON sessions(user_id, started_at DESC, session_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_mode_time ON sessions(mode, started_at DESC, session_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_time ON sessions(started_at DESC, session_id)",
+    "CREATE INDEX IF NOT EXISTS idx_frames_session ON frame_observations(session_id, captured_at)",
+]
+
+
+def _encode_cursor(started_at, session_id):
+    return base64.urlsafe_b64encode(json.dumps([started_at, session_id]).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        started_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(started_at), str(session_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+
+
+class HistoryStore:
+    """SQLite-backed interview history with keyset pagination and streaming export"""
+
+    def __init__(self, db_path=HISTORY_DB_PATH):
+        self.db_path = db_path
+        with self._connect() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def record_session(self, session_id, user_id=None, mode=None, config=None, started_at=None):
+        """Create a session row, or fill in missing fields on an existing one"""
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO sessions (session_id, user_id, mode, started_at, config)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(session_id) DO UPDATE SET
+                       user_id = COALESCE(excluded.user_id, sessions.user_id),
+                       mode = COALESCE(excluded.mode, sessions.mode),
+                       config = COALESCE(excluded.config, sessions.config)""",
+                (session_id, user_id, mode, started_at or time.time(),
+                 json.dumps(config) if config is not None else None),
+            )
+
+    def add_frame_observation(self, session_id, observation, captured_at=None):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, started_at) VALUES (?, ?)",
+                (session_id, time.time()),
+            )
+            conn.execute(
+                "INSERT INTO frame_observations (session_id, captured_at, observation) VALUES (?, ?, ?)",
+                (session_id, captured_at or time.time(), observation),
+            )
+
+    def save_review(self, session_id, transcript, review, user_id=None, mode=None):
+        """Store the transcript and review and close out the session"""
+        now = time.time()
+        score = review.get('overallScore') if isinstance(review, dict) else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, started_at) VALUES (?, ?)",
+                (session_id, now),
+            )
+            # Values recorded when the session started take precedence over the review request's
+            conn.execute(
+                """UPDATE sessions SET ended_at = ?, overall_score = ?,
+                       user_id = COALESCE(user_id, ?), mode = COALESCE(mode, ?)
+                   WHERE session_id = ?""",
+                (now, score if isinstance(score, int) else None, user_id, mode, session_id),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts (session_id, content) VALUES (?, ?)",
+                (session_id, transcript),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO reviews (session_id, review, created_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(review), now),
+            )
+
+    @staticmethod
+    def _filters(user_id=None, mode=None, since=None, until=None, table=''):
+        prefix = f"{table}." if table else ''
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append(f'{prefix}user_id = ?')
+            params.append(user_id)
+        if mode is not None:
+            clauses.append(f'{prefix}mode = ?')
+            params.append(mode)
+        if since is not None:
+            clauses.append(f'{prefix}started_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append(f'{prefix}started_at < ?')
+            params.append(until)
+        return clauses, params
+
+    @staticmethod
+    def _session_summary(row):
+        return {
+            'sessionId': row['session_id'],
+            'userId': row['user_id'],
+            'mode': row['mode'],
+            'startedAt': row['started_at'],
+            'endedAt': row['ended_at'],
+            'overallScore': row['overall_score'],
+            'config': json.loads(row['config']) if row['config'] else None,
+        }
+
+    def query_sessions(self, user_id=None, mode=None, since=None, until=None, limit=None, cursor=None):
+        """
+        Return one page of sessions, newest first.
+        Pagination is keyset-based on (started_at, session_id), so deep pages cost the same as the first.
+        """
+        limit = min(max(1, limit or HISTORY_PAGE_SIZE), HISTORY_MAX_PAGE_SIZE)
+        clauses, params = self._filters(user_id, mode, since, until)
+        if cursor:
+            started_at, session_id = _decode_cursor(cursor)
+            clauses.append('(started_at < ? OR (started_at = ? AND session_id < ?))')
+            params.extend([started_at, started_at, session_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""SELECT * FROM sessions {where}
+                    ORDER BY started_at DESC, session_id DESC LIMIT ?""",
+                params + [limit + 1],
+            ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]['started_at'], rows[-1]['session_id']) if has_more else None
+        return {'sessions': [self._session_summary(row) for row in rows], 'nextCursor': next_cursor}
+
+    def get_session(self, session_id):
+        """Return a session with its transcript, frame observations and review"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None:
+                return None
+            transcript = conn.execute(
+                'SELECT content FROM transcripts WHERE session_id = ?', (session_id,)
+            ).fetchone()
+            review = conn.execute('SELECT review FROM reviews WHERE session_id = ?', (session_id,)).fetchone()
+            frames = conn.execute(
+                """SELECT captured_at, observation FROM frame_observations
+                   WHERE session_id = ? ORDER BY captured_at""",
+                (session_id,),
+            ).fetchall()
+
+        session = self._session_summary(row)
+        session['transcript'] = transcript['content'] if transcript else None
+        session['frameObservations'] = [
+            {'capturedAt': frame['captured_at'], 'observation': frame['observation']} for frame in frames
+        ]
+        session['review'] = json.loads(review['review']) if review else None
+        return session
+
+    def user_trends(self, user_id, mode=None, since=None, bucket_days=7):
+        """Aggregate a user's scores per mode and per time bucket in SQL"""
+        clauses, params = self._filters(user_id, mode, since)
+        where = f"WHERE {' AND '.join(clauses)}"
+        bucket_seconds = bucket_days * 86400
+
+        with self._connect() as conn:
+            by_mode = conn.execute(
+                f"""SELECT mode, COUNT(*) AS sessions, AVG(overall_score) AS avg_score,
+                           MIN(overall_score) AS min_score, MAX(overall_score) AS max_score
+                    FROM sessions {where} GROUP BY mode ORDER BY mode""",
+                params,
+            ).fetchall()
+            buckets = conn.execute(
+                f"""SELECT CAST(started_at / ? AS INTEGER) * ? AS bucket_start,
+                           COUNT(*) AS sessions, AVG(overall_score) AS avg_score
+                    FROM sessions {where} GROUP BY bucket_start ORDER BY bucket_start""",
+                [bucket_seconds, bucket_seconds] + params,
+            ).fetchall()
+
+        def _round(value):
+            return round(value, 1) if value is not None else None
+
+        return {
+            'userId': user_id,
+            'bucketDays': bucket_days,
+            'byMode': [{
+                'mode': row['mode'],
+                'sessions': row['sessions'],
+                'averageScore': _round(row['avg_score']),
+                'minScore': row['min_score'],
+                'maxScore': row['max_score'],
+            } for row in by_mode],
+            'timeline': [{
+                'bucketStart': row['bucket_start'],
+                'sessions': row['sessions'],
+                'averageScore': _round(row['avg_score']),
+            } for row in buckets],
+        }
+
+    def iter_export(self, user_id=None, mode=None, since=None, until=None):
+        """Yield one NDJSON line per session (with transcript and review), reading rows in batches"""
+        clauses, params = self._filters(user_id, mode, since, until, table='s')
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"""SELECT s.*, t.content AS transcript, r.review AS review
+                    FROM sessions s
+                    LEFT JOIN transcripts t ON t.session_id = s.session_id
+                    LEFT JOIN reviews r ON r.session_id = s.session_id
+                    {where}
+                    ORDER BY s.started_at, s.session_id""",
+                params,
+            )
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    record = self._session_summary(row)
+                    record['transcript'] = row['transcript']
+                    record['review'] = json.loads(row['review']) if row['review'] else None
+                    yield json.dumps(record) + '\n'
+        finally:
+            conn.close()
@@ -0,0 +1,199 @@
+"""
+Idempotency-Key support for expensive endpoints.
+A client that retries (or a double-invoked React effect) sends the same
+Idempotency-Key with the same request. While the first request is running,
+duplicates wait for it and get its response; once it has finished, duplicates
+within IDEMPOTENCY_TTL get the stored response without calling Gemini or VAPI
+again. Pending markers and stored responses live in the session backend, so a
+duplicate handled by another worker is deduplicated too.
+"""
+
+import base64
+import functools
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+IDEMPOTENCY_ENABLED = os.getenv('IDEMPOTENCY', 'true').lower() in ('1', 'true', 'yes')
+IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', '600'))  # seconds a finished response is replayed
+IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', '60'))  # seconds a duplicate waits for the original
+IDEMPOTENCY_PENDING_TTL = float(os.getenv('IDEMPOTENCY_PENDING_TTL', '300'))  # in-flight marker of a crashed worker
+IDEMPOTENCY_POLL = 0.05  # seconds between checks while waiting; doubles up to 0.5
+KEY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+KEY_PREFIX = 'idempotency:'
+
+
+def _encode(response):
+    body, status, mimetype = response
+    return [base64.b64encode(body).decode('ascii'), status, mimetype]
+
+
+def _decode(stored):
+    body, status, mimetype = stored
+    return base64.b64decode(body), status, mimetype
+
+
+class IdempotencyStore:
+    """In-flight and finished requests in the session backend, keyed by (endpoint, Idempotency-Key)"""
+
+    def __init__(self, session_state, ttl=IDEMPOTENCY_TTL, wait=IDEMPOTENCY_WAIT, pending_ttl=IDEMPOTENCY_PENDING_TTL):
+        self.session_state = session_state
+        self.ttl = ttl
+        self.wait = wait
+        self.pending_ttl = pending_ttl
+        self._lock = threading.Lock()
+        self._counts = {'requests': 0, 'executed': 0, 'replayed': 0, 'attached': 0, 'mismatched': 0,
+                        'waitTimeouts': 0, 'expirations': 0}
+        self._by_endpoint = {}
+        self._in_flight = 0
+
+    def _count(self, name, endpoint=None):
+        with self._lock:
+            self._counts[name] += 1
+            if endpoint and name in ('replayed', 'attached'):
+                counts = self._by_endpoint.setdefault(endpoint, {'replayed': 0, 'attached': 0})
+                counts[name] += 1
+
+    @staticmethod
+    def _key(endpoint, key):
+        return f"{KEY_PREFIX}{endpoint}:{key}"
+
+    def begin(self, endpoint, key, fingerprint):
+        """
+        Claim a key. Returns ('execute', token) for the first request, ('wait', None) for an
+        in-flight or finished duplicate, or ('mismatch', None) when the key was used for a different request.
+        """
+        token = uuid.uuid4().hex
+        seen = {}
+
+        def claim(entry):
+            # Entries past their own expiry are treated as absent even before the backend drops them
+            if entry is not None and entry['expiresAt'] <= time.time():
+                seen['expired'] = True
+                entry = None
+            seen['entry'] = entry
+            if entry is not None:
+                return entry
+            return {'fingerprint': fingerprint, 'owner': token, 'response': None,
+                    'expiresAt': time.time() + self.pending_ttl}
+
+        self._count('requests')
+        # The backend's own expiry only bounds storage; the pending and replay windows are expiresAt
+        self.session_state.update(self._key(endpoint, key), claim, ttl=max(self.ttl, self.pending_ttl))
+        if seen.get('expired'):
+            self._count('expirations')
+        entry = seen['entry']
+        if entry is None:
+            self._count('executed')
+            with self._lock:
+                self._in_flight += 1
+            return 'execute', token
+        if entry['fingerprint'] != fingerprint:
+            self._count('mismatched')
+            return 'mismatch', None
+        self._count('replayed' if entry['response'] is not None else 'attached', endpoint)
+        return 'wait', None
+
+    def finish(self, endpoint, key, token, response):
+        """Store a finished response (None when the view raised) for waiting and later duplicates"""
+        scoped = self._key(endpoint, key)
+        try:
+            entry = self.session_state.get(scoped)
+            if not entry or entry['owner'] != token:
+                return  # the marker expired and another request took the key over
+            # Server errors and crashes are not kept, so a later retry runs again
+            if response is None or response[1] >= 500:
+                self.session_state.delete(scoped)
+            else:
+                self.session_state.set(scoped, {**entry, 'response': _encode(response),
+                                                'expiresAt': time.time() + self.ttl}, ttl=self.ttl)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def wait_for(self, endpoint, key):
+        """
+        The original request's response, polled from the session backend: ('done', response),
+        ('released', None) when it failed and stored nothing, or ('timeout', None).
+        """
+        scoped = self._key(endpoint, key)
+        deadline = time.time() + self.wait
+        delay = IDEMPOTENCY_POLL
+        while True:
+            entry = self.session_state.get(scoped)
+            if not entry or entry['expiresAt'] <= time.time():
+                return 'released', None
+            if entry['response'] is not None:
+                return 'done', _decode(entry['response'])
+            if time.time() >= deadline:
+                self._count('waitTimeouts')
+                return 'timeout', None
+            time.sleep(min(delay, max(0.0, deadline - time.time())))
+            delay = min(delay * 2, 0.5)
+
+    def stats(self):
+        entries = self.session_state.count_keys(KEY_PREFIX)
+        with self._lock:
+            return {
+                **self._counts,
+                'deduplicated': self._counts['replayed'] + self._counts['attached'],
+                'byEndpoint': {endpoint: dict(counts) for endpoint, counts in self._by_endpoint.items()},
+                'entries': entries,
+                'inFlight': self._in_flight,
+                'ttlSeconds': self.ttl,
+            }
+
+    def idempotent(self, view):
+        """Deduplicate requests to a Flask view that carry an Idempotency-Key header"""
+        from flask import jsonify, make_response, request
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(KEY_HEADER)
+            if not IDEMPOTENCY_ENABLED or not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({'error': f"{KEY_HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+            endpoint = request.path
+            outcome, token = self.begin(endpoint, key, request_fingerprint(request))
+            if outcome == 'mismatch':
+                return jsonify({'error': f"{KEY_HEADER} was already used for a different request"}), 422
+
+            if outcome == 'wait':
+                state, stored = self.wait_for(endpoint, key)
+                if state == 'released':
+                    # The original request failed; run this one normally
+                    return view(*args, **kwargs)
+                if state == 'timeout':
+                    return jsonify({'error': f"A request with this {KEY_HEADER} is still in progress"}), 409
+                body, status, mimetype = stored
+                response = make_response(body, status)
+                response.mimetype = mimetype
+                response.headers[REPLAYED_HEADER] = 'true'
+                return response
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                self.finish(endpoint, key, token, None)
+                raise
+            if response.is_streamed or 'no-store' in response.headers.get('Cache-Control', ''):
+                self.finish(endpoint, key, token, None)  # streamed and no-store responses are not kept
+                return response
+            self.finish(endpoint, key, token, (response.get_data(), response.status_code, response.mimetype))
+            return response
+
+        return wrapper
+
+
+def request_fingerprint(req):
+    """Hash of what makes two requests the same operation: method, path, query and body"""
+    digest = hashlib.sha256()
+    digest.update(f"{req.method} {req.path}?{req.query_string.decode('latin-1')}\n".encode())
+    digest.update(req.get_data(cache=True))
+    return digest.hexdigest()
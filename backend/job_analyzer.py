@@ -0,0 +1,454 @@
+"""
+Local job posting analyzer.
+Tokenizes a posting once and matches every keyword dictionary (role,
+seniority, industry, skills) in that single pass with a precompiled n-gram
+index, then pulls responsibilities and requirements out of bullet sections.
+The result uses the same schema as the Gemini job analysis plus a confidence
+score that decides whether Gemini is needed at all.
+"""
+
+import os
+import re
+
+MIN_LOCAL_CONFIDENCE = float(os.getenv('JOB_ANALYZER_MIN_CONFIDENCE', '0.8'))
+
+ROLE_KEYWORDS = {
+    'software engineer': 'Software Engineer', 'software developer': 'Software Developer',
+    'frontend engineer': 'Frontend Engineer', 'front end engineer': 'Frontend Engineer',
+    'backend engineer': 'Backend Engineer', 'back end engineer': 'Backend Engineer',
+    'full stack engineer': 'Full Stack Engineer', 'full stack developer': 'Full Stack Developer',
+    'data engineer': 'Data Engineer', 'data scientist': 'Data Scientist', 'data analyst': 'Data Analyst',
+    'machine learning engineer': 'Machine Learning Engineer', 'ml engineer': 'Machine Learning Engineer',
+    'devops engineer': 'DevOps Engineer', 'site reliability engineer': 'Site Reliability Engineer',
+    'security engineer': 'Security Engineer', 'qa engineer': 'QA Engineer',
+    'product manager': 'Product Manager', 'project manager': 'Project Manager',
+    'program manager': 'Program Manager', 'engineering manager': 'Engineering Manager',
+    'product designer': 'Product Designer', 'ux designer': 'UX Designer',
+    'business analyst': 'Business Analyst', 'account executive': 'Account Executive',
+    'marketing manager': 'Marketing Manager', 'sales representative': 'Sales Representative',
+    'customer success manager': 'Customer Success Manager', 'registered nurse': 'Registered Nurse',
+    'teacher': 'Teacher', 'consultant': 'Consultant', 'accountant': 'Accountant',
+    # Generic role nouns, used only when nothing more specific matches
+    'engineer': 'Engineer', 'developer': 'Developer', 'manager': 'Manager', 'analyst': 'Analyst',
+    'specialist': 'Specialist', 'coordinator': 'Coordinator', 'assistant': 'Assistant',
+    'director': 'Director', 'architect': 'Architect', 'designer': 'Designer', 'scientist': 'Scientist',
+}
+
+SENIORITY_KEYWORDS = {
+    'intern': 'Junior', 'internship': 'Junior', 'entry level': 'Junior', 'entry-level': 'Junior',
+    'junior': 'Junior', 'jr': 'Junior', 'graduate': 'Junior', 'new grad': 'Junior',
+    'mid level': 'Mid', 'mid-level': 'Mid', 'intermediate': 'Mid',
+    'senior': 'Senior', 'sr': 'Senior', 'staff': 'Senior', 'principal': 'Senior', 'lead': 'Senior',
+    'head of': 'Senior', 'director': 'Senior', 'vp': 'Senior',
+}
+# Everyday words ("lead the onboarding", "our staff"); they only set seniority from the title line
+TITLE_ONLY_SENIORITY = {'staff', 'lead', 'graduate'}
+
+INDUSTRY_KEYWORDS = {
+    'software': 'Technology', 'saas': 'Technology', 'cloud': 'Technology',
+    'healthcare': 'Healthcare', 'hospital': 'Healthcare', 'clinical': 'Healthcare',
+    'finance': 'Finance', 'financial': 'Finance', 'fintech': 'Finance', 'banking': 'Finance',
+    'marketing': 'Marketing', 'advertising': 'Marketing',
+    'retail': 'Retail', 'e-commerce': 'Retail', 'ecommerce': 'Retail',
+    'education': 'Education', 'university': 'Education', 'edtech': 'Education',
+    'consulting': 'Consulting', 'manufacturing': 'Manufacturing', 'logistics': 'Logistics',
+    'insurance': 'Insurance', 'government': 'Government', 'gaming': 'Gaming', 'media': 'Media',
+}
+
+SKILL_KEYWORDS = {
+    'python': 'Python', 'java': 'Java', 'javascript': 'JavaScript', 'typescript': 'TypeScript',
+    'go': 'Go', 'golang': 'Go', 'rust': 'Rust', 'c++': 'C++', 'c#': 'C#', 'ruby': 'Ruby', 'scala': 'Scala',
+    'kotlin': 'Kotlin', 'swift': 'Swift', 'php': 'PHP', 'sql': 'SQL', 'nosql': 'NoSQL',
+    'react': 'React', 'angular': 'Angular', 'vue': 'Vue', 'node.js': 'Node.js', 'nodejs': 'Node.js',
+    'django': 'Django', 'flask': 'Flask', 'spring': 'Spring',
+    'aws': 'AWS', 'azure': 'Azure', 'gcp': 'GCP', 'google cloud': 'GCP', 'docker': 'Docker',
+    'kubernetes': 'Kubernetes', 'terraform': 'Terraform', 'linux': 'Linux', 'git': 'Git',
+    'postgresql': 'PostgreSQL', 'postgres': 'PostgreSQL', 'mysql': 'MySQL', 'mongodb': 'MongoDB',
+    'redis': 'Redis', 'kafka': 'Kafka', 'spark': 'Spark', 'airflow': 'Airflow',
+    'machine learning': 'Machine Learning', 'deep learning': 'Deep Learning', 'pytorch': 'PyTorch',
+    'tensorflow': 'TensorFlow', 'pandas': 'pandas', 'tableau': 'Tableau', 'excel': 'Excel',
+    'distributed systems': 'Distributed Systems', 'system design': 'System Design',
+    'microservices': 'Microservices', 'rest': 'REST APIs', 'graphql': 'GraphQL', 'ci/cd': 'CI/CD',
+    'agile': 'Agile', 'scrum': 'Scrum', 'figma': 'Figma', 'salesforce': 'Salesforce', 'seo': 'SEO',
+    'communication': 'Communication', 'leadership': 'Leadership', 'mentoring': 'Mentoring',
+    'stakeholder management': 'Stakeholder Management', 'problem solving': 'Problem Solving',
+    'problem-solving': 'Problem Solving', 'collaboration': 'Collaboration', 'project management': 'Project Management',
+}
+# Skills that are also everyday words ("go above and beyond", "excel at", "rest assured"). They count only
+# when written in their technical form and listed next to another skill ("Python, Go and Rust").
+AMBIGUOUS_SKILLS = {'go': 'Go', 'rest': 'REST', 'excel': 'Excel', 'swift': 'Swift', 'spring': 'Spring',
+                    'spark': 'Spark', 'rust': 'Rust'}
+SKILL_CONTEXT_TOKENS = 4  # how close the neighbouring skill must be
+
+SECTION_HEADINGS = {
+    'responsibilities': ['responsibilit', 'what you will do', "what you'll do", 'what you’ll do', 'duties',
+                         'the role', 'your role', 'day to day', 'day-to-day', 'you will'],
+    # 'preferred' is checked before 'requirements' so "Preferred qualifications" lands there
+    'preferred': ['nice to have', 'preferred', 'bonus', 'plus'],
+    'requirements': ['requirement', 'qualification', 'what you bring', 'what we are looking for',
+                     "what we're looking for", 'must have', 'you have', 'skills', 'experience'],
+}
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+_TOKEN_ANY_CASE = re.compile(_TOKEN.pattern, re.I)
+_BULLET = re.compile(r'^\s*(?:[-*•·▪–]|\d+[.)])\s+(.*\S)')
+_YEARS = re.compile(r'(\d{1,2})\s*\+?\s*(?:years|yrs)')
+# A capitalized company word; dots only inside it ("Booking.com"), so "Stripe. You" stops at the sentence end
+_COMPANY_WORD = r"[A-Z][\w&'-]*(?:\.[\w&'-]+)*"
+_TITLE_AT_COMPANY = re.compile(r'^(?P<title>[^\n]{3,80}?)\s+(?:at|@)\s+(?P<company>' + _COMPANY_WORD
+                               + r'(?:\s+' + _COMPANY_WORD + r'){0,4})')
+_COMPANY_LABEL = re.compile(r'^\s*(?:company|employer|organization)\s*:\s*(?P<company>[^\n]{2,60})', re.I | re.M)
+_COMPANY_HIRING = re.compile(r'(?:^|[.!?]\s+)(?P<company>' + _COMPANY_WORD + r'(?:\s+' + _COMPANY_WORD
+                             + r'){0,3})\s+is\s+(?:hiring|looking|seeking)', re.M)
+_ABOUT_COMPANY = re.compile(r'^\s*about\s+(?P<company>(?!the role|the team|you|us)' + _COMPANY_WORD
+                            + r'(?:\s+' + _COMPANY_WORD + r'){0,3})\s*:?\s*$', re.M)
+# "We're hiring a Product Manager to ..." -> the capitalized words after the verb
+_HIRING_TITLE = re.compile(r"\b(?:hiring|seeking|looking for)\s+(?:an?\s+)?(?P<title>[A-Z][\w/&+-]*(?:,?\s+[A-Z][\w/&+-]*){0,6})")
+_SENTENCE_OPENERS = ('we ', "we're", 'we’re', 'our ', 'join ', 'are you', 'you ', 'about ', 'this ', 'as a')
+TITLE_MAX_WORDS = 8
+
+
+def _tokens(text):
+    return _TOKEN.findall(text)
+
+
+def _cased_tokens(text):
+    """Tokens with their original casing; lowercasing them gives the lookup tokens at the same positions"""
+    return _TOKEN_ANY_CASE.findall(text)
+
+
+def _build_index():
+    """
+    Compile every dictionary into one n-gram -> [(category, canonical)] lookup table,
+    plus the set of proper prefixes so a scan stops extending as soon as no phrase can match.
+    """
+    index = {}
+    prefixes = set()
+    for category, dictionary in (('role', ROLE_KEYWORDS), ('seniority', SENIORITY_KEYWORDS),
+                                 ('industry', INDUSTRY_KEYWORDS), ('skill', SKILL_KEYWORDS)):
+        for phrase, canonical in dictionary.items():
+            key = tuple(_tokens(phrase))
+            index.setdefault(key, []).append((category, canonical))
+            prefixes.update(key[:length] for length in range(1, len(key)))
+    return index, prefixes
+
+
+_INDEX, _PREFIXES = _build_index()
+
+
+def match_keywords(tokens):
+    """
+    Single pass over the token list, looking up every n-gram that starts at each position.
+    Returns {category: [(position, canonical, ngram_length), ...]} in document order.
+    """
+    matches = {'role': [], 'seniority': [], 'industry': [], 'skill': []}
+    index, prefixes = _INDEX, _PREFIXES
+    count = len(tokens)
+    for position in range(count):
+        key = (tokens[position],)
+        end = position + 1
+        while True:
+            hits = index.get(key)
+            if hits:
+                for category, canonical in hits:
+                    matches[category].append((position, canonical, len(key)))
+            if key not in prefixes or end >= count:
+                break
+            key += (tokens[end],)
+            end += 1
+    return matches
+
+
+def _classify_heading(line):
+    lowered = line.lower().strip().rstrip(':').strip()
+    if not lowered or len(lowered) > 60:
+        return None
+    for section, markers in SECTION_HEADINGS.items():
+        if any(marker in lowered for marker in markers):
+            return section
+    return None
+
+
+def extract_sections(content):
+    """Group bullet points under the responsibilities / requirements / preferred heading above them"""
+    sections = {'responsibilities': [], 'requirements': [], 'preferred': []}
+    current = None
+    for line in content.splitlines():
+        bullet = _BULLET.match(line)
+        if bullet:
+            if current:
+                sections[current].append(bullet.group(1).strip())
+            continue
+        stripped = line.strip()
+        if not stripped:
+            continue
+        heading = _classify_heading(stripped) if (stripped.endswith(':') or len(stripped.split()) <= 6) else None
+        if heading:
+            current = heading
+        elif stripped.endswith(':'):
+            current = None
+    return sections
+
+
+def _looks_like_title(text):
+    """A job title is short and is not a sentence ("We're hiring a ...", "Join our team ...")"""
+    lowered = text.lower()
+    return (len(text.split()) <= TITLE_MAX_WORDS and not lowered.startswith(_SENTENCE_OPENERS)
+            and not re.search(r'[.!?]\s', text))
+
+
+def _extract_title_and_company(content):
+    """(title, company, title_is_first_line); title is None when only sentences were found"""
+    first_lines = [line.strip() for line in content.splitlines() if line.strip()][:3]
+    title = company = None
+    for line in first_lines:
+        match = _TITLE_AT_COMPANY.match(line)
+        if match:
+            company = match.group('company').strip(' .,')
+            candidate = match.group('title').strip(' -|,')
+            if _looks_like_title(candidate):
+                title = candidate
+            break
+    if not company:
+        for pattern in (_COMPANY_LABEL, _COMPANY_HIRING, _ABOUT_COMPANY):
+            match = pattern.search(content)
+            if match:
+                company = match.group('company').strip(' .,')
+                break
+    if not title and first_lines and _looks_like_title(first_lines[0]):
+        title = first_lines[0]
+    title_is_first_line = bool(title and first_lines and first_lines[0].startswith(title))
+    if not title:
+        match = _HIRING_TITLE.search(content)
+        if match and _looks_like_title(match.group('title')):
+            title = match.group('title').strip(' ,')
+    return title, company, title_is_first_line
+
+
+def _pick_role(matches, title_token_count):
+    """Prefer the most specific (longest) role phrase, favouring ones in the title line"""
+    roles = matches['role']
+    if not roles:
+        return None
+    in_title = [role for role in roles if role[0] < title_token_count]
+    candidates = in_title or roles
+    position, canonical, length = max(candidates, key=lambda role: (role[2], -role[0]))
+    return canonical
+
+
+def _most_common(entries):
+    counts = {}
+    for _, canonical, _ in entries:
+        counts[canonical] = counts.get(canonical, 0) + 1
+    return max(counts, key=counts.get) if counts else None
+
+
+def _find_skills(cased_tokens, matches=None):
+    """
+    Canonical skills in document order. Ambiguous words count only in their technical
+    form ("Go", "REST") and within SKILL_CONTEXT_TOKENS of an unambiguous skill.
+    """
+    if matches is None:
+        matches = match_keywords([token.lower() for token in cased_tokens])
+    clear, ambiguous = [], []
+    for entry in matches['skill']:
+        position, _, length = entry
+        word = cased_tokens[position].lower()
+        (ambiguous if length == 1 and word in AMBIGUOUS_SKILLS else clear).append(entry)
+    for entry in ambiguous:
+        position = entry[0]
+        if (cased_tokens[position] == AMBIGUOUS_SKILLS[cased_tokens[position].lower()]
+                and any(abs(other[0] - position) <= SKILL_CONTEXT_TOKENS for other in clear)):
+            clear.append(entry)
+    skills = []
+    for _, canonical, _ in sorted(clear):
+        if canonical not in skills:
+            skills.append(canonical)
+    return skills
+
+
+def _summarize(items, limit=3):
+    if not items:
+        return None
+    text = '; '.join(item.rstrip('.') for item in items[:limit])
+    return text + '.'
+
+
+def analyze_job_posting(content):
+    """Analyze a job posting locally; returns the job analysis schema plus lists and a confidence score"""
+    lines = [line for line in content.splitlines() if line.strip()]
+    title, company, title_is_first_line = _extract_title_and_company(content)
+    # Role and seniority words in a title on the first line take precedence over the body
+    title_tokens = _tokens(lines[0].lower()) if title_is_first_line else []
+    cased_tokens = _cased_tokens(content)
+    tokens = [token.lower() for token in cased_tokens]
+    matches = match_keywords(tokens)
+    sections = extract_sections(content)
+
+    role = _pick_role(matches, len(title_tokens))
+    seniority = None
+    title_seniority = [entry for entry in matches['seniority'] if entry[0] < len(title_tokens)]
+    if title_seniority:
+        seniority = title_seniority[0][1]
+    else:
+        years = [int(value) for value in _YEARS.findall(content.lower())]
+        if years:
+            seniority = 'Senior' if max(years) >= 5 else 'Mid' if max(years) >= 2 else 'Junior'
+        else:
+            seniority = _most_common([entry for entry in matches['seniority']
+                                      if tokens[entry[0]] not in TITLE_ONLY_SENIORITY])
+    industry = _most_common(matches['industry'])
+
+    responsibilities = sections['responsibilities']
+    requirements = sections['requirements'] + sections['preferred']
+    # Skills listed under a requirements heading are trusted more than ones picked out of prose
+    section_skills = _find_skills(_cased_tokens('\n'.join(requirements)))
+    skills = section_skills + [skill for skill in _find_skills(cased_tokens, matches) if skill not in section_skills]
+
+    role_title = role
+    if role and title and role.lower() in title.lower() and len(title) <= 80:
+        role_title = title  # keep the posting's own wording, e.g. "Senior Software Engineer, Data Platform"
+
+    confidence = 0.0
+    confidence += 0.25 if role else 0.0
+    confidence += 0.15 if company else 0.0
+    confidence += 0.1 if seniority else 0.0
+    confidence += 0.1 if industry else 0.0
+    confidence += 0.2 if len(responsibilities) >= 2 else 0.1 if responsibilities else 0.0
+    confidence += (0.2 if (len(requirements) >= 2 and len(section_skills) >= 2)
+                   else 0.1 if requirements else 0.05 if skills else 0.0)
+
+    required_skills = ', '.join(skills[:8]) + '.' if skills else None
+    if sections['requirements']:
+        required_skills = f"{required_skills} {_summarize(sections['requirements'])}" if required_skills else _summarize(sections['requirements'])
+
+    focus_parts = []
+    if role:
+        focus_parts.append(f"Assess fit for a {seniority.lower() + ' ' if seniority else ''}{role} role")
+    if responsibilities:
+        responsibility = responsibilities[0].rstrip('.')
+        focus_parts.append(f"ask for concrete examples of {responsibility[:1].lower() + responsibility[1:]}")
+    if skills:
+        focus_parts.append(f"probe depth in {', '.join(skills[:3])}")
+    interview_focus = '; '.join(focus_parts) + '.' if focus_parts else None
+    # Only the first letter; role and skill names keep their casing
+    interview_focus = interview_focus[:1].upper() + interview_focus[1:] if interview_focus else "Focus on general interview skills and experience"
+
+    return {
+        "role": role_title or "Job Role",
+        "company": company or "Company",
+        "keyResponsibilities": _summarize(responsibilities) or "Responsibilities will be assessed during the interview",
+        "requiredSkills": required_skills or "Skills will be evaluated during the interview",
+        "experienceLevel": seniority or "Not specified",
+        "industry": industry or "Not specified",
+        "interviewFocus": interview_focus,
+        "skills": skills,
+        "responsibilities": responsibilities,
+        "requirements": requirements,
+        "confidence": round(confidence, 2),
+        "source": "local",
+    }
+
+
+JOB_CHUNK_CHARS = int(os.getenv('JOB_CHUNK_CHARS', '4000'))
+JOB_MAX_CHUNKS = int(os.getenv('JOB_MAX_CHUNKS', '8'))
+
+_TEXT_FIELDS = ('keyResponsibilities', 'requiredSkills', 'interviewFocus')
+_LABEL_FIELDS = ('role', 'company', 'experienceLevel', 'industry')
+_PLACEHOLDERS = {'', 'not specified', 'n/a', 'none', 'unknown', 'job role', 'company'}
+
+
+def _is_section_start(line):
+    stripped = line.strip()
+    return bool(stripped) and not _BULLET.match(line) and (
+        stripped.endswith(':') or _classify_heading(stripped) is not None)
+
+
+def job_chunk_chars(content, max_chars=None, max_chunks=JOB_MAX_CHUNKS):
+    """Starting chunk size for a posting: max_chars, or larger when max_chunks chunks of it could not hold it"""
+    return max(max_chars or JOB_CHUNK_CHARS, -(-len(content) // max_chunks))
+
+
+def split_job_sections(content, max_chars=None, max_chunks=JOB_MAX_CHUNKS):
+    """
+    Split a posting into chunks of at most max_chars on section boundaries.
+    A section (heading plus its lines) is only broken on line boundaries when it alone
+    is too long; the chunk size grows until no more than max_chunks are produced.
+    """
+    max_chars = job_chunk_chars(content, max_chars, max_chunks)
+    if len(content) <= max_chars:
+        return [content]
+
+    sections, current = [], []
+    for line in content.splitlines():
+        if current and _is_section_start(line):
+            sections.append('\n'.join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append('\n'.join(current))
+
+    while True:
+        chunks = _pack_sections(sections, max_chars)
+        if len(chunks) <= max_chunks:
+            return chunks
+        max_chars += max(1, max_chars // 8)
+
+
+def _pack_sections(sections, max_chars):
+    """Greedily pack sections into chunks of at most max_chars, breaking long sections on line boundaries"""
+    pieces = []
+    for section in sections:
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        buffer = ''
+        for line in section.splitlines():
+            while len(line) > max_chars:
+                if buffer:
+                    pieces.append(buffer)
+                    buffer = ''
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            if buffer and len(buffer) + 1 + len(line) > max_chars:
+                pieces.append(buffer)
+                buffer = line
+            else:
+                buffer = f"{buffer}\n{line}" if buffer else line
+        if buffer:
+            pieces.append(buffer)
+
+    chunks, buffer = [], ''
+    for piece in pieces:
+        if buffer and len(buffer) + 1 + len(piece) > max_chars:
+            chunks.append(buffer)
+            buffer = piece
+        else:
+            buffer = f"{buffer}\n{piece}" if buffer else piece
+    if buffer.strip():
+        chunks.append(buffer)
+    return chunks
+
+
+def merge_job_analyses(partials):
+    """
+    Reduce per-chunk analyses into one: label fields take the earliest specified value
+    (the first chunk holds the title), text fields keep every distinct sentence in order.
+    """
+    merged = {}
+    for field in _LABEL_FIELDS:
+        merged[field] = next((str(p[field]).strip() for p in partials
+                              if str(p.get(field, '')).strip().lower() not in _PLACEHOLDERS), "Not specified")
+    for field in _TEXT_FIELDS:
+        seen, sentences = set(), []
+        for partial in partials:
+            value = str(partial.get(field, '')).strip()
+            if value.lower() in _PLACEHOLDERS:
+                continue
+            for sentence in re.split(r'(?<=[.!?])\s+', value):
+                key = ' '.join(_tokens(sentence.lower()))
+                if key and key not in seen:
+                    seen.add(key)
+                    sentences.append(sentence)
+        merged[field] = ' '.join(sentences) or "Not specified"
+    return merged
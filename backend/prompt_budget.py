@@ -0,0 +1,163 @@
+"""
+Prompt token budgeting and accounting.
+Every assembled Gemini/VAPI prompt is counted against a per-call budget; when
+a prompt is over budget its lowest-priority inputs are trimmed first (e.g.
+oldest frame notes, then middle transcript turns) and the per-call token
+counts are recorded for /api/prompt-budget.
+
+Token counts are estimated locally (about four characters per token for
+Gemini-family tokenizers) so budgeting never costs an extra network call.
+"""
+
+import os
+import re
+import threading
+
+CHARS_PER_TOKEN = float(os.getenv('PROMPT_CHARS_PER_TOKEN', '4'))
+
+PROMPT_BUDGETS = {
+    'synthesis': int(os.getenv('PROMPT_BUDGET_SYNTHESIS', '32000')),
+    'system_prompt': int(os.getenv('PROMPT_BUDGET_SYSTEM_PROMPT', '3000')),
+    'job_analysis': int(os.getenv('PROMPT_BUDGET_JOB_ANALYSIS', '2000')),
+    'frame_analysis': int(os.getenv('PROMPT_BUDGET_FRAME_ANALYSIS', '1000')),
+}
+
+OMITTED_MARKER = "[... {count} turns omitted for length ...]"
+_OMITTED = re.compile(r'^\[\.\.\. (\d+) turns omitted for length \.\.\.\]$')
+
+
+def count_tokens(text):
+    """Estimated token count of a prompt (a list prompt counts only its text parts)"""
+    if isinstance(text, (list, tuple)):
+        return sum(count_tokens(part) for part in text if isinstance(part, str))
+    return int(-(-len(text) // CHARS_PER_TOKEN)) if text else 0
+
+
+class PromptAccounting:
+    """Thread-safe per-call token statistics"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, call, tokens, budget=None, trimmed=False, original_tokens=None):
+        with self._lock:
+            entry = self._stats.setdefault(call, {
+                'calls': 0, 'totalTokens': 0, 'maxTokens': 0, 'lastTokens': 0,
+                'trimmedCalls': 0, 'tokensTrimmed': 0, 'budget': budget,
+            })
+            entry['calls'] += 1
+            entry['totalTokens'] += tokens
+            entry['maxTokens'] = max(entry['maxTokens'], tokens)
+            entry['lastTokens'] = tokens
+            entry['budget'] = budget
+            if trimmed:
+                entry['trimmedCalls'] += 1
+                entry['tokensTrimmed'] += max(0, (original_tokens or tokens) - tokens)
+
+    def stats(self):
+        with self._lock:
+            return {
+                call: {**entry, 'avgTokens': round(entry['totalTokens'] / entry['calls'], 1)}
+                for call, entry in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+accounting = PromptAccounting()
+
+
+def drop_oldest(items, excess_tokens):
+    """Trimmer: drop items from the front until about excess_tokens are removed; None when empty"""
+    if not items:
+        return None
+    removed = dropped = 0
+    while dropped < len(items) and removed < excess_tokens:
+        removed += count_tokens(items[dropped])
+        dropped += 1
+    return list(items[max(dropped, 1):])
+
+
+def trim_middle_turns(transcript, excess_tokens):
+    """
+    Trimmer: remove a contiguous block of turns from the middle of a transcript
+    (opening and closing turns matter most) and replace it with a marker line.
+    Returns None when too few turns are left to trim.
+    """
+    lines = transcript.splitlines()
+    if len(lines) <= 3:
+        return None
+    tokens = [count_tokens(line) for line in lines]
+    middle = len(lines) // 2
+    start, end = middle, middle + 1  # lines[start:end] will be removed
+    removed = tokens[middle]
+    needed = excess_tokens + count_tokens(OMITTED_MARKER)
+    while removed < needed and (start > 1 or end < len(lines) - 1):
+        if start > 1 and (end >= len(lines) - 1 or middle - start <= end - middle):
+            start -= 1
+            removed += tokens[start]
+        else:
+            removed += tokens[end]
+            end += 1
+
+    omitted = 0
+    for line in lines[start:end]:
+        marker = _OMITTED.match(line)
+        omitted += int(marker.group(1)) if marker else 1
+    return '\n'.join(lines[:start] + [OMITTED_MARKER.format(count=omitted)] + lines[end:])
+
+
+def truncate_text(text, max_tokens):
+    """Cut text to about max_tokens, preferring a sentence boundary"""
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind('. '), cut.rfind('; '))
+    return (cut[:boundary + 1] if boundary > max_chars // 2 else cut.rstrip()) + ' ...'
+
+
+def fit_prompt(call, render, parts, trimmers, budget=None):
+    """
+    Render a prompt from parts and trim it into the call's budget.
+
+    render(**parts) builds the prompt; trimmers is a priority-ordered list of
+    (part_name, trim_fn) where trim_fn(value, excess_tokens) returns a smaller
+    value or None when that part cannot shrink further. A trim that recovers
+    less than a tenth of the excess (e.g. dropping frame notes that are already
+    aggregated) is undone and the next trimmer is tried. The final size
+    is recorded in accounting. Returns (prompt, tokens).
+    """
+    budget = PROMPT_BUDGETS.get(call) if budget is None else budget
+    parts = dict(parts)
+    prompt = render(**parts)
+    tokens = original = count_tokens(prompt)
+    pending = list(trimmers)
+    while budget and tokens > budget and pending:
+        name, trim_fn = pending[0]
+        trimmed_value = trim_fn(parts[name], tokens - budget)
+        if trimmed_value is None:
+            pending.pop(0)
+            continue
+        candidate_parts = {**parts, name: trimmed_value}
+        candidate = render(**candidate_parts)
+        candidate_tokens = count_tokens(candidate)
+        if tokens - candidate_tokens < max(1, (tokens - budget) // 10):
+            pending.pop(0)
+            continue
+        parts, prompt, tokens = candidate_parts, candidate, candidate_tokens
+
+    if tokens < original:
+        print(f"Trimmed {call} prompt from {original} to {tokens} tokens (budget {budget})")
+    elif budget and tokens > budget:
+        print(f"{call} prompt is {tokens} tokens, over its {budget} token budget with nothing left to trim")
+    accounting.record(call, tokens, budget, trimmed=tokens < original, original_tokens=original)
+    return prompt, tokens
+
+
+def get_prompt_budget_stats():
+    """Budgets and per-call token statistics"""
+    return {'budgets': dict(PROMPT_BUDGETS), 'charsPerToken': CHARS_PER_TOKEN, 'calls': accounting.stats()}
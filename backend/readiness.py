@@ -0,0 +1,124 @@
+"""
+Startup prewarm and dependency readiness.
+Each dependency (Gemini, VAPI, the interview agents, local stores) registers a
+probe that both warms it (client initialization, TLS handshake, pooled
+connections) and proves it is reachable. Results with their measured latency
+back /api/health/ready so traffic is only routed to warmed instances.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+PREWARM_ENABLED = os.getenv('PREWARM', 'false').lower() in ('1', 'true', 'yes')
+READINESS_REQUIRED = {name.strip() for name in
+                      os.getenv('READINESS_REQUIRED', 'gemini,vapi,agents,stores').split(',')
+                      if name.strip()}
+PROBE_TIMEOUT = float(os.getenv('READINESS_PROBE_TIMEOUT', '5'))  # seconds per probe
+READINESS_MAX_AGE = float(os.getenv('READINESS_MAX_AGE', '30'))  # re-probe when results are older
+
+
+class DependencyDisabled(Exception):
+    """Raised by a probe whose dependency is not configured on this instance"""
+
+
+class ReadinessRegistry:
+    """Named dependency probes, their last results, and the overall readiness verdict"""
+
+    def __init__(self, required=READINESS_REQUIRED, timeout=PROBE_TIMEOUT, max_age=READINESS_MAX_AGE):
+        self.required = set(required)
+        self.timeout = timeout
+        self.max_age = max_age
+        self._probes = {}
+        self._results = {}
+        self._checked_at = None
+        self._warming = False
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='readiness')
+
+    def register(self, name, probe_fn):
+        """probe_fn() warms and checks the dependency; it may return a detail dict"""
+        self._probes[name] = probe_fn
+
+    def _run_probe(self, name, probe_fn):
+        start = time.perf_counter()
+        future = self._executor.submit(probe_fn)
+        try:
+            detail = future.result(timeout=self.timeout)
+            result = {'status': 'ready'}
+            if detail:
+                result['detail'] = detail
+        except DependencyDisabled as e:
+            result = {'status': 'disabled', 'detail': str(e)}
+        except FutureTimeout:
+            result = {'status': 'unavailable', 'error': f"probe timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {'status': 'unavailable', 'error': str(e)}
+        result['latencyMs'] = round((time.perf_counter() - start) * 1000, 1)
+        result['required'] = name in self.required
+        return result
+
+    def probe_all(self):
+        """Run every probe concurrently; a probe already in progress is not started twice"""
+        if not self._probe_lock.acquire(blocking=False):
+            return self.results()
+        try:
+            runners = {name: threading.Thread(target=lambda n=name, fn=fn: self._store(n, self._run_probe(n, fn)))
+                       for name, fn in self._probes.items()}
+            for runner in runners.values():
+                runner.start()
+            for runner in runners.values():
+                runner.join()
+            with self._lock:
+                self._checked_at = time.time()
+        finally:
+            self._probe_lock.release()
+        return self.results()
+
+    def _store(self, name, result):
+        with self._lock:
+            self._results[name] = result
+
+    def results(self):
+        with self._lock:
+            return {name: dict(result) for name, result in self._results.items()}
+
+    def prewarm(self):
+        """Probe every dependency once at startup, in a background thread"""
+        def run():
+            start = time.perf_counter()
+            results = self.probe_all()
+            with self._lock:
+                self._warming = False
+            summary = ', '.join(f"{name}={r['status']} ({r['latencyMs']}ms)" for name, r in sorted(results.items()))
+            print(f"Prewarm finished in {(time.perf_counter() - start) * 1000:.0f}ms: {summary}")
+
+        with self._lock:
+            self._warming = True
+        thread = threading.Thread(target=run, name='prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self, refresh=False):
+        """Readiness report; stale or missing results are re-probed unless a prewarm is running"""
+        with self._lock:
+            warming = self._warming
+            stale = self._checked_at is None or time.time() - self._checked_at > self.max_age
+        if not warming and (refresh or stale):
+            self.probe_all()
+
+        with self._lock:
+            results = {name: dict(result) for name, result in self._results.items()}
+            warming = self._warming
+            checked_at = self._checked_at
+        blocking = sorted(name for name, result in results.items()
+                          if result['required'] and result['status'] == 'unavailable')
+        return {
+            'ready': not warming and checked_at is not None and not blocking,
+            'warming': warming,
+            'checkedAt': checked_at,
+            'blocking': blocking,
+            'dependencies': results,
+        }
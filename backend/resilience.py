@@ -0,0 +1,266 @@
+"""
+Resilience layer for upstream calls (Gemini, VAPI, LinkedIn, agents).
+Every call runs under a hard deadline and a per-upstream circuit breaker that
+fails fast while an upstream's error rate is high; idempotent calls can
+optionally be hedged to cut tail latency.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Per-upstream deadlines in seconds
+UPSTREAM_TIMEOUTS = {
+    'gemini': float(os.getenv('GEMINI_TIMEOUT', '30')),
+    'gemini_vision': float(os.getenv('GEMINI_VISION_TIMEOUT', '20')),
+    'vapi': float(os.getenv('VAPI_TIMEOUT', '15')),
+    'linkedin': float(os.getenv('LINKEDIN_TIMEOUT', '15')),
+    'agent': float(os.getenv('AGENT_TIMEOUT', '12')),
+}
+
+# Seconds to wait before sending a duplicate of an idempotent call; 0 disables hedging
+UPSTREAM_HEDGE_AFTER = {
+    'gemini': float(os.getenv('GEMINI_HEDGE_AFTER', '0')),
+    'linkedin': float(os.getenv('LINKEDIN_HEDGE_AFTER', '0')),
+    'agent': float(os.getenv('AGENT_HEDGE_AFTER', '0')),
+}
+
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', '20'))  # most recent calls considered
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', '5'))
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', '0.5'))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+# Timed-out calls still occupying a pool thread; past this an upstream is rejected so it cannot fill the pool
+UPSTREAM_MAX_ABANDONED = int(os.getenv('UPSTREAM_MAX_ABANDONED', '8'))
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('UPSTREAM_MAX_WORKERS', '32')),
+                               thread_name_prefix='upstream')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an upstream call does not finish within its deadline"""
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker over a sliding window of recent calls"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_seconds = reset_seconds
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.abandoned = 0  # timed-out calls whose thread is still running
+        self.last_error = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.time() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self):
+        """Return True if a call may go through; half-open lets a single trial call pass"""
+        with self._lock:
+            if self.abandoned >= UPSTREAM_MAX_ABANDONED:
+                self.rejected += 1
+                return False
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.calls += 1
+            self._outcomes.append(True)
+            if self._state != self.CLOSED:
+                print(f"Circuit breaker '{self.name}' closed after a successful trial call")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._trial_in_flight = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            if isinstance(error, DeadlineExceeded):
+                self.timeouts += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            self._outcomes.append(False)
+            self._trial_in_flight = False
+
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            recent_failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= self.min_calls
+                    and recent_failures / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def abandon(self, future):
+        """Count a timed-out call whose thread could not be cancelled until it finally returns"""
+        with self._lock:
+            self.abandoned += 1
+        future.add_done_callback(self._release_abandoned)
+
+    def _release_abandoned(self, _future):
+        with self._lock:
+            self.abandoned -= 1
+
+    def _open(self):
+        if self._state != self.OPEN:
+            print(f"!!! Circuit breaker '{self.name}' opened: {self.last_error} !!!")
+        self._state = self.OPEN
+        self._opened_at = time.time()
+
+    def status(self):
+        with self._lock:
+            state = self._current_state()
+            recent = len(self._outcomes)
+            return {
+                'state': state,
+                'recentCalls': recent,
+                'recentFailureRate': round(self._outcomes.count(False) / recent, 3) if recent else 0.0,
+                'calls': self.calls,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+                'abandoned': self.abandoned,
+                'retryInSeconds': max(0.0, round(self.reset_seconds - (time.time() - self._opened_at), 1))
+                if state == self.OPEN else 0.0,
+                'lastError': self.last_error,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """Return the circuit breaker for an upstream, creating it on first use"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_status():
+    """Return the state of every circuit breaker, keyed by upstream name"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.status() for name, breaker in breakers.items()}
+
+
+def _run_with_deadline(fn, args, kwargs, timeout, hedge_after, on_abandon=None):
+    """
+    Run fn in the upstream pool, optionally hedged, and wait at most timeout seconds.
+    Calls that already started cannot be cancelled; they are passed to on_abandon.
+    """
+    deadline = time.time() + timeout
+    futures = [_executor.submit(fn, *args, **kwargs)]
+
+    if hedge_after and hedge_after < timeout:
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done:
+            futures.append(_executor.submit(fn, *args, **kwargs))
+
+    error = None
+    pending = set(futures)
+    while pending:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    if not other.cancel() and on_abandon:
+                        on_abandon(other)
+                return future.result()
+            error = future.exception()
+    if pending:
+        for future in pending:
+            if not future.cancel() and on_abandon:
+                on_abandon(future)
+        raise DeadlineExceeded(f"Upstream call did not finish within {timeout:.1f}s")
+    raise error
+
+
+def guarded_call(upstream, fn, *args, deadline=None, hedge_after=None, **kwargs):
+    """
+    Call fn(*args, **kwargs) through the named upstream's circuit breaker and deadline.
+    Raises CircuitOpenError without calling fn while the breaker is open, DeadlineExceeded
+    on timeout, and otherwise re-raises fn's own exception so existing handlers still apply.
+    Upstream names may carry a qualifier after a colon (e.g. 'agent:easy') to get a
+    separate breaker that shares the base upstream's deadline.
+    Pass hedge_after only for idempotent calls. A timed-out call keeps its pool thread until
+    it returns, so fn should also pass the deadline to its client (see request_timeout).
+    """
+    breaker = get_breaker(upstream)
+    if not breaker.allow():
+        if breaker.abandoned >= UPSTREAM_MAX_ABANDONED:
+            raise CircuitOpenError(f"Upstream '{upstream}' is temporarily unavailable "
+                                   f"({breaker.abandoned} timed-out calls still running)")
+        raise CircuitOpenError(f"Upstream '{upstream}' is temporarily unavailable (circuit open)")
+
+    if deadline is None:
+        deadline = UPSTREAM_TIMEOUTS.get(upstream.split(':')[0], 30)
+    start = time.time()
+    try:
+        result = _run_with_deadline(fn, args, kwargs, deadline, hedge_after, breaker.abandon)
+    except Exception as e:
+        breaker.record_failure(e)
+        _notify_observers(upstream, time.time() - start, None, e)
+        raise
+    breaker.record_success()
+    _notify_observers(upstream, time.time() - start, result, None)
+    return result
+
+
+def request_timeout(upstream):
+    """Per-request client timeout for an upstream: its deadline, so a timed-out call frees its thread"""
+    return UPSTREAM_TIMEOUTS.get(upstream.split(':')[0], 30)
+
+
+_call_observers = []
+
+
+def add_call_observer(observer):
+    """Register observer(upstream, duration_seconds, result, error), called after every guarded call"""
+    _call_observers.append(observer)
+
+
+def _notify_observers(upstream, duration, result, error):
+    for observer in _call_observers:
+        try:
+            observer(upstream, duration, result, error)
+        except Exception as e:
+            print(f"Upstream call observer failed: {e}")
@@ -0,0 +1,264 @@
+"""
+Background review jobs persisted in SQLite.
+Review generation is submitted once per session and runs off the request
+thread; status and results survive restarts and can be polled or pushed to
+a completion callback. Every worker process shares the database: a job is
+run by whichever worker atomically claims it, under a lease that the worker
+renews while it runs, so a job abandoned by a dead worker is picked up again
+once its lease expires.
+"""
+
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+REVIEW_DB_PATH = os.getenv('REVIEW_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reviews.db'))
+REVIEW_WORKERS = int(os.getenv('REVIEW_WORKERS', '4'))
+CALLBACK_TIMEOUT = float(os.getenv('REVIEW_CALLBACK_TIMEOUT', '10'))
+# Comma-separated base URLs completion callbacks may be sent to; empty disables callbacks
+CALLBACK_ALLOWLIST = [url.strip() for url in os.getenv('REVIEW_CALLBACK_ALLOWLIST', '').split(',') if url.strip()]
+JOB_LEASE_SECONDS = float(os.getenv('REVIEW_JOB_LEASE', '120'))  # a running job's owner must renew within this
+
+# Jobs in these states are never started again; 'failed' and 'partial' jobs may be resubmitted
+ACTIVE_STATUSES = ('queued', 'running', 'done')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_jobs (
+    session_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    mode TEXT,
+    payload TEXT NOT NULL,
+    callback_url TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    lease_until REAL
+)
+"""
+
+# Columns added after the first release, for databases created before them
+_MIGRATIONS = {'owner': 'ALTER TABLE review_jobs ADD COLUMN owner TEXT',
+               'lease_until': 'ALTER TABLE review_jobs ADD COLUMN lease_until REAL'}
+
+
+class CallbackNotAllowed(ValueError):
+    """Raised when a completion callback URL is not under REVIEW_CALLBACK_ALLOWLIST"""
+
+
+def callback_allowed(url, allowlist=None):
+    """True if url has the scheme and host of an allowlisted base URL and is under its path"""
+    allowlist = CALLBACK_ALLOWLIST if allowlist is None else allowlist
+    target = urlsplit(url or '')
+    if target.scheme not in ('http', 'https') or target.username or target.password:
+        return False
+    for base in allowlist:
+        allowed = urlsplit(base)
+        if (target.scheme, target.netloc.lower()) == (allowed.scheme, allowed.netloc.lower()) \
+                and target.path.startswith(allowed.path or '/'):
+            return True
+    return False
+
+
+class ReviewJobQueue:
+    """Runs review generation in a worker pool and records every job in SQLite"""
+
+    def __init__(self, generate_fn, db_path=REVIEW_DB_PATH, workers=REVIEW_WORKERS, on_done=None, run_context=None,
+                 lease_seconds=JOB_LEASE_SECONDS):
+        self.generate_fn = generate_fn
+        self.on_done = on_done  # called as on_done(session_id, payload, review) for successful jobs
+        self.run_context = run_context  # optional run_context(session_id) context manager around generation
+        self.db_path = db_path
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='review-job')
+        self._submit_lock = threading.Lock()
+        self._lease_thread = None
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(review_jobs)')}
+            for column, statement in _MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def submit(self, session_id, transcript, mode, frame_notes, callback_url=None, user_id=None, timing=None,
+               time_limit=None, rejected_frames=None):
+        """
+        Queue a review for session_id unless one is already queued, running or done.
+        A resubmitted failed or partial job keeps the frames, transcript and timing it was first
+        submitted with when the retry has none (they were consumed by the first request), and
+        the review sections it already generated unless the retry brings new data.
+        Raises CallbackNotAllowed for a callback_url outside REVIEW_CALLBACK_ALLOWLIST.
+        Returns the job's current status record.
+        """
+        if callback_url and not callback_allowed(callback_url):
+            raise CallbackNotAllowed(f"callbackUrl must be under one of REVIEW_CALLBACK_ALLOWLIST: {callback_url}")
+        with self._submit_lock, self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT status, payload FROM review_jobs WHERE session_id = ?', (session_id,)).fetchone()
+            if row and row['status'] in ACTIVE_STATUSES:
+                conn.rollback()
+                return self.get(session_id)
+            previous = json.loads(row['payload']) if row else {}
+            same_input = not frame_notes and (not transcript or transcript == previous.get('transcript'))
+            payload = json.dumps({
+                'transcript': transcript or previous.get('transcript'),
+                'mode': mode,
+                'frameNotes': list(frame_notes) or previous.get('frameNotes') or [],
+                'rejectedFrames': rejected_frames or previous.get('rejectedFrames'),
+                'userId': user_id or previous.get('userId'),
+                'timing': timing or previous.get('timing'),
+                'timeLimit': time_limit or previous.get('timeLimit'),
+                'sections': (previous.get('sections') or {}) if same_input else {},
+            })
+            conn.execute(
+                """INSERT OR REPLACE INTO review_jobs
+                   (session_id, status, mode, payload, callback_url, created_at)
+                   VALUES (?, 'queued', ?, ?, ?, ?)""",
+                (session_id, mode, payload, callback_url, time.time()),
+            )
+        self._executor.submit(self._run, session_id)
+        return self.get(session_id)
+
+    def get(self, session_id):
+        """Return the job record for session_id, or None"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM review_jobs WHERE session_id = ?', (session_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def resume_pending(self):
+        """
+        Start a thread that renews this worker's leases and picks up jobs no live
+        worker owns: queued jobs left by a stopped worker and running jobs whose
+        lease expired. Returns the number of jobs picked up now.
+        """
+        if self._lease_thread is None:
+            self._lease_thread = threading.Thread(target=self._lease_loop, name='review-job-lease', daemon=True)
+            self._lease_thread.start()
+        return self._resume_orphans(min_age=0)
+
+    def _resume_orphans(self, min_age):
+        # Queued jobs younger than min_age are left to the worker that queued them
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT session_id FROM review_jobs
+                   WHERE (status = 'queued' AND created_at <= ?) OR (status = 'running' AND COALESCE(lease_until, 0) < ?)""",
+                (now - min_age, now),
+            ).fetchall()
+        for row in rows:
+            print(f"Resuming review job for session {row['session_id']}")
+            self._executor.submit(self._run, row['session_id'])
+        return len(rows)
+
+    def _lease_loop(self):
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            time.sleep(interval)
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "UPDATE review_jobs SET lease_until = ? WHERE owner = ? AND status = 'running'",
+                        (time.time() + self.lease_seconds, self.owner),
+                    )
+                self._resume_orphans(min_age=self.lease_seconds)
+            except sqlite3.Error as e:
+                print(f"Review job lease renewal failed: {e}")
+
+    def _claim(self, session_id):
+        """Atomically take a queued job, or a running one whose lease expired; returns its row or None"""
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute(
+                """UPDATE review_jobs SET status = 'running', owner = ?, lease_until = ?, started_at = ?
+                   WHERE session_id = ?
+                     AND (status = 'queued' OR (status = 'running' AND COALESCE(lease_until, 0) < ?))""",
+                (self.owner, now + self.lease_seconds, now, session_id, now),
+            ).rowcount
+            if not claimed:
+                return None
+            return conn.execute('SELECT * FROM review_jobs WHERE session_id = ?', (session_id,)).fetchone()
+
+    def _run(self, session_id):
+        row = self._claim(session_id)
+        if row is None:
+            return  # done, failed, or owned by another worker
+        payload = json.loads(row['payload'])
+
+        # Sections finished by an earlier partial attempt are reused; new ones are added in place
+        sections = payload.setdefault('sections', {})
+        try:
+            with (self.run_context(session_id) if self.run_context else contextlib.nullcontext()):
+                review, status_code = self.generate_fn(payload['transcript'], payload['mode'], payload['frameNotes'],
+                                                       payload.get('timing'), payload.get('timeLimit'),
+                                                       sections=sections,
+                                                       rejected_frames=payload.get('rejectedFrames'))
+            status = 'failed' if status_code >= 400 else 'partial' if review.get('partial') else 'done'
+            error = review.get('error') or (review.get('summary') if status == 'failed' else None)
+            if status == 'partial':
+                error = f"Review sections could not be generated: {', '.join(review.get('missingSections', []))}"
+        except Exception as e:
+            print(f"Review job for session {session_id} crashed: {e}")
+            review, status, error = None, 'failed', str(e)
+
+        with self._connect() as conn:
+            updated = conn.execute(
+                """UPDATE review_jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL,
+                          payload = ?
+                   WHERE session_id = ? AND owner = ? AND status = 'running'""",
+                (status, json.dumps(review) if review is not None else None, error, time.time(),
+                 json.dumps(payload), session_id, self.owner),
+            ).rowcount
+        if not updated:
+            print(f"Review job for session {session_id} was taken over by another worker; dropping this result")
+            return
+        print(f"Review job for session {session_id} finished with status: {status}")
+
+        if status == 'done' and self.on_done:
+            try:
+                self.on_done(session_id, payload, review)
+            except Exception as e:
+                print(f"Review job completion hook for session {session_id} failed: {e}")
+
+        if row['callback_url']:
+            self._notify(row['callback_url'], self.get(session_id))
+
+    @staticmethod
+    def _notify(callback_url, record):
+        if not callback_allowed(callback_url):
+            print(f"Review completion callback to {callback_url} is not allowlisted; skipping")
+            return
+        try:
+            requests.post(callback_url, json=record, timeout=CALLBACK_TIMEOUT, allow_redirects=False)
+        except requests.exceptions.RequestException as e:
+            print(f"Review completion callback to {callback_url} failed: {e}")
+
+    @staticmethod
+    def _to_record(row):
+        return {
+            'sessionId': row['session_id'],
+            'status': row['status'],
+            'mode': row['mode'],
+            'review': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'createdAt': row['created_at'],
+            'startedAt': row['started_at'],
+            'finishedAt': row['finished_at'],
+        }
@@ -0,0 +1,211 @@
+"""
+Sectioned review generation.
+Instead of one large generation, the review is split into independent
+sections (verbal content and STAR, body language, mode-specific scoring)
+that are generated concurrently and merged locally into the review JSON.
+Each section has its own static rubric, sent inline as an unchanged prompt
+prefix (nothing is cached), and a small per-review suffix. A failed section leaves the others intact.
+"""
+
+import json
+import os
+
+REVIEW_PIPELINE = os.getenv('REVIEW_PIPELINE', 'sectioned')  # or 'single' for one synthesis call
+REVIEW_SECTION_WORKERS = int(os.getenv('REVIEW_SECTION_WORKERS', '12'))
+
+VERBAL_RUBRIC = """
+    You are an expert interview coach. Review only what the candidate SAID in a mock interview;
+    body language and the score are reviewed separately.
+
+    Assess clarity, conciseness, structure and STAR method usage (Situation, Task, Action, Result).
+    - If the candidate demonstrates STAR structure, include it in "whatYouDidWell" with specific praise, e.g.
+      "You effectively used the STAR method by clearly describing the situation, your specific tasks, the
+      actions you took, and the results achieved."
+    - Refer to specific answers when pointing out strengths and weaknesses
+    - Point out repeated filler words and answers that ramble or stay vague
+
+    Return ONLY a valid JSON object:
+    {
+      "whatYouDidWell": ["Point about the answers that went well.", "Another point."],
+      "areasForImprovement": ["Point about the answers to improve.", "Another point."],
+      "summary": "A brief paragraph summarizing the verbal performance."
+    }
+"""
+
+BODY_LANGUAGE_RUBRIC = """
+    You are an expert interview coach. Review only the candidate's body language in a mock interview,
+    from webcam observations aggregated across frames; the answers and the score are reviewed separately.
+
+    Assess engagement, eye contact and screen focus, posture, composure and confidence, and how they
+    changed over the interview. Ignore frames marked unusable.
+
+    Return ONLY a valid JSON object:
+    {
+      "whatYouDidWell": ["Body-language point that went well."],
+      "areasForImprovement": ["Body-language point to improve."],
+      "summary": "One sentence on body language."
+    }
+"""
+
+# Mode-specific scoring rules, shared with the single-call synthesis rubric
+SCORING_CRITERIA = """
+    MODE-SPECIFIC SCORING CRITERIA:
+
+    EASY MODE (Beginner Level):
+    - Base score starts at 100 points
+    - Focus on basic communication skills and comfort level
+    - Deduct 1 point per repeated filler word between sentences
+    - STAR method usage is a bonus (+5 points if demonstrated)
+    - Body language: Basic engagement and screen focus (+3 points if good)
+    - Clear communication: +2 points if responses are easy to understand
+    - Expected score range: 70-100 (beginners should score well)
+
+    MEDIUM MODE (Intermediate Level):
+    - Base score starts at 100 points
+    - Higher expectations for structured responses and STAR method
+    - Deduct 1 point per repeated filler word between sentences
+    - STAR method usage is expected (-10 points if not demonstrated)
+    - Time management: -5 points if consistently exceeding 15 seconds
+    - Body language: Professional engagement and confidence (+3 points if good)
+    - Structured responses: +5 points if consistently using STAR method
+    - Problem-solving: +3 points if showing analytical thinking
+    - Expected score range: 60-95 (moderate challenge)
+
+    HARD MODE (Advanced Level):
+    - Base score starts at 100 points
+    - Strict expectations for quick thinking and structured responses
+    - Deduct 1 point per repeated filler word between sentences
+    - STAR method usage is mandatory (-15 points if not demonstrated)
+    - Time pressure: -10 points if not starting within 5 seconds consistently
+    - Complex scenario handling: -10 points if answers lack depth
+    - Body language: High confidence and composure under pressure (+5 points if excellent)
+    - Quick thinking: +5 points if responding rapidly and thoughtfully
+    - Leadership demonstration: +3 points if showing leadership qualities
+    - Expected score range: 40-90 (significant challenge)
+
+    CUSTOM MODE (User-Configured):
+    - Base score starts at 100 points
+    - Scoring should adapt based on the custom configuration
+    - Question Type Focus: Score based on how well the candidate addressed the specific question type
+    - Time Management: Apply deductions based on the configured time limit
+    - Curveball Handling: Assess how well the candidate handled the configured curveball strategy
+    - Body language: Professional engagement and confidence (+3 points if good)
+    - STAR method usage: +5 points if demonstrated (regardless of question type)
+    - Adapt scoring expectations based on the difficulty level implied by the configuration
+    - Expected score range: 50-100 (varies based on configuration)
+
+    SCORING BREAKDOWN REQUIREMENTS:
+    - List ALL bonuses earned with specific point values
+    - List ALL deductions with specific point values
+    - Be specific about what earned or lost points (e.g., "+5 points for STAR method", "-2 points for 3 'um' usages")
+    - Include body language observations in the breakdown
+    - Show the calculation: baseScore + bonuses - deductions = finalScore
+
+"""
+
+SCORING_RUBRIC = """
+    You are an expert interview coach. Score a mock interview using the mode-specific criteria below.
+""" + SCORING_CRITERIA + """
+    Return ONLY a valid JSON object:
+    {
+      "overallScore": <an integer score from 1 to 100>,
+      "scoreExplanation": "A brief, one-sentence explanation of the score, noting how verbal and non-verbal factors were weighted.",
+      "scoringBreakdown": {
+        "baseScore": 100,
+        "bonuses": ["+5 points for effective STAR method usage", "+3 points for strong eye contact"],
+        "deductions": ["-2 points for repeated 'um' usage", "-5 points for exceeding time limits"],
+        "finalScore": <calculated final score>
+      }
+    }
+"""
+
+
+def verbal_suffix(transcript, mode, body_language, timing_summary):
+    return f"""
+    This interview was conducted in {mode.upper()} MODE.
+
+    Transcript:
+    ---
+    {transcript}
+    ---
+    """
+
+
+def body_language_suffix(transcript, mode, body_language, timing_summary):
+    return f"""
+    This interview was conducted in {mode.upper()} MODE.
+
+    Body Language Observations (aggregated across frames):
+    ---
+    {body_language}
+    ---
+    """
+
+
+def scoring_suffix(transcript, mode, body_language, timing_summary):
+    timing_section = f"""
+    Measured Answer Timing (from call events; use these numbers for time-based bonuses and deductions):
+    ---
+    {timing_summary}
+    ---
+""" if timing_summary else ""
+    return f"""
+    IMPORTANT: This interview was conducted in {mode.upper()} MODE. Apply the appropriate scoring criteria above.
+
+    Transcript:
+    ---
+    {transcript}
+    ---
+
+    Body Language Observations (aggregated across frames):
+    ---
+    {body_language}
+    ---
+    {timing_section}"""
+
+
+# name -> (rubric, suffix builder, keys the section's JSON must contain)
+REVIEW_SECTIONS = {
+    'verbal': (VERBAL_RUBRIC, verbal_suffix, ('whatYouDidWell', 'areasForImprovement')),
+    'body_language': (BODY_LANGUAGE_RUBRIC, body_language_suffix, ('whatYouDidWell', 'areasForImprovement')),
+    'scoring': (SCORING_RUBRIC, scoring_suffix, ('overallScore',)),
+}
+
+
+def parse_section(name, text):
+    """JSON object of a section's response; raises ValueError when it is missing required keys"""
+    section = json.loads(text.strip().replace("```json", "").replace("```", ""))
+    if not isinstance(section, dict):
+        raise ValueError(f"Review section '{name}' is not a JSON object")
+    missing = [key for key in REVIEW_SECTIONS[name][2] if key not in section]
+    if missing:
+        raise ValueError(f"Review section '{name}' is missing {', '.join(missing)}")
+    if name == 'scoring':
+        section['overallScore'] = int(section['overallScore'])
+    return section
+
+
+def merge_review_sections(sections):
+    """
+    Assemble the review JSON from section results ({name: dict, or None when it failed}).
+    Missing sections are listed under 'missingSections' and leave their fields empty.
+    """
+    verbal = sections.get('verbal') or {}
+    body = sections.get('body_language') or {}
+    scoring = sections.get('scoring') or {}
+
+    review = {
+        'whatYouDidWell': list(verbal.get('whatYouDidWell') or []) + list(body.get('whatYouDidWell') or []),
+        'areasForImprovement': (list(verbal.get('areasForImprovement') or [])
+                                + list(body.get('areasForImprovement') or [])),
+        'overallScore': scoring.get('overallScore'),
+        'scoreExplanation': scoring.get('scoreExplanation') or "Could not generate a score explanation.",
+        'summary': ' '.join(part for part in (verbal.get('summary'), body.get('summary')) if part)
+                   or "Part of your review could not be generated. Please try again for the full review.",
+    }
+    if scoring.get('scoringBreakdown'):
+        review['scoringBreakdown'] = scoring['scoringBreakdown']
+    missing = sorted(name for name, result in sections.items() if result is None)
+    if missing:
+        review['missingSections'] = missing
+    return review
@@ -0,0 +1,234 @@
+"""
+Session recording for offline replay.
+With SESSION_RECORDING enabled, every request a session sends through the
+backend (assistant parameters, frames, job descriptions, follow-ups, review
+requests, VAPI events) and every upstream response it caused is appended to
+a compressed log that replay_session.py can drive the backend from.
+
+Layout under RECORDINGS_DIR:
+    frames/<sha256>.<ext>                         each distinct frame once, by content hash
+    sessions/<session_id>/events.<pid>.jsonl.gz   append-only; one writer per process
+"""
+
+import base64
+import contextlib
+import contextvars
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RECORDING_ENABLED = os.getenv('SESSION_RECORDING', 'false').lower() in ('1', 'true', 'yes')
+RECORDINGS_DIR = os.getenv('RECORDINGS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings'))
+MAX_OPEN_WRITERS = int(os.getenv('RECORDING_MAX_OPEN_FILES', '64'))
+
+RECORDED_PATHS = (
+    '/api/vapi-assistant', '/api/analyze-frame', '/api/analyze-job-description', '/api/agent-followup',
+    '/api/get-review', '/api/review-jobs/', '/api/vapi/events',
+)
+
+_FRAME_EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'}
+
+
+def _safe_name(session_id):
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(session_id))[:128] or 'unknown'
+
+
+def serialize_upstream_result(result):
+    """Keep the part of an upstream response the backend actually reads"""
+    if result is None:
+        return None
+    if hasattr(result, 'status_code') and hasattr(result, 'content'):  # requests.Response
+        return {'statusCode': result.status_code, 'text': result.text, 'url': result.url}
+    if getattr(result, 'id', None) is not None:  # VAPI assistant
+        return {'id': result.id}
+    try:
+        return {'text': result.text}  # Gemini response
+    except Exception:
+        pass
+    if hasattr(result, 'dict'):  # uAgents / pydantic message
+        return {'fields': result.dict()}
+    if isinstance(getattr(result, '__dict__', None), dict):
+        return {'fields': dict(vars(result))}
+    return {'repr': repr(result)[:1000]}
+
+
+class SessionRecorder:
+    """
+    Buffers one request's upstream calls and appends them with the request to its session log.
+    The buffer lives in a context variable, so calls made from worker threads that run in a
+    copy of the request's context (contextvars.copy_context) are recorded with it.
+    """
+
+    def __init__(self, root=RECORDINGS_DIR):
+        self.root = root
+        self.frames_dir = os.path.join(root, 'frames')
+        self.sessions_dir = os.path.join(root, 'sessions')
+        os.makedirs(self.frames_dir, exist_ok=True)
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        self._writers = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = contextvars.ContextVar(f'recording_pending_{id(self)}', default=None)
+        self._seq = itertools.count()
+
+    # --- capture -------------------------------------------------------------
+
+    def begin(self):
+        """Start buffering upstream calls made in the current context"""
+        self._pending.set([])
+
+    def observe_upstream(self, upstream, duration, result, error):
+        """resilience call observer; only calls made inside a recorded request or job are kept"""
+        pending = self._pending.get()
+        if pending is None:
+            return
+        pending.append({
+            'type': 'upstream',
+            'upstream': upstream,
+            't': time.time() - duration,
+            'durationMs': round(duration * 1000, 1),
+            'result': serialize_upstream_result(result),
+            'error': f"{type(error).__name__}: {error}" if error else None,
+        })
+
+    def end(self, session_id, request_record):
+        """Write the buffered upstream calls and the request record to session_id's log"""
+        pending = self._pending.get() or []
+        self._pending.set(None)
+        self.write(session_id, pending + [request_record])
+
+    @contextlib.contextmanager
+    def bind(self, session_id):
+        """Record upstream calls made inside the block (e.g. a background review job) for session_id"""
+        self.begin()
+        try:
+            yield
+        finally:
+            pending = self._pending.get() or []
+            self._pending.set(None)
+            if pending:
+                self.write(session_id, pending)
+
+    def store_frame(self, frame_data_url):
+        """Store a frame data URL once by content hash and return the reference that replaces it"""
+        header, encoded = frame_data_url.split(',', 1)
+        mime = header[5:].split(';')[0] if header.startswith('data:') else 'image/jpeg'
+        frame_bytes = base64.b64decode(encoded)
+        digest = hashlib.sha256(frame_bytes).hexdigest()
+        filename = f"{digest}.{_FRAME_EXTENSIONS.get(mime, 'bin')}"
+        path = os.path.join(self.frames_dir, filename)
+        if not os.path.exists(path):
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(frame_bytes)
+            os.replace(temp_path, path)
+        return {'frameRef': filename, 'mime': mime, 'bytes': len(frame_bytes)}
+
+    # --- storage -------------------------------------------------------------
+
+    def _writer(self, session_id):
+        writer = self._writers.get(session_id)
+        if writer is None:
+            directory = os.path.join(self.sessions_dir, _safe_name(session_id))
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"events.{os.getpid()}.jsonl.gz")
+            writer = gzip.GzipFile(path, 'ab', compresslevel=6)
+            self._writers[session_id] = writer
+            while len(self._writers) > MAX_OPEN_WRITERS:
+                _, oldest = self._writers.popitem(last=False)
+                oldest.close()
+        self._writers.move_to_end(session_id)
+        return writer
+
+    def write(self, session_id, records):
+        """Append records to the session's log; a sync flush keeps the file readable while it is open"""
+        with self._lock:
+            writer = self._writer(session_id)
+            for record in records:
+                record['seq'] = next(self._seq)
+                writer.write((json.dumps(record, separators=(',', ':')) + '\n').encode())
+            writer.flush()
+
+    def close(self):
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+
+def list_recordings(root=RECORDINGS_DIR):
+    sessions_dir = os.path.join(root, 'sessions')
+    if not os.path.isdir(sessions_dir):
+        return []
+    return sorted(os.listdir(sessions_dir))
+
+
+def read_recording(session_id, root=RECORDINGS_DIR):
+    """All records of a session from every writer process, in time order"""
+    directory = os.path.join(root, 'sessions', _safe_name(session_id))
+    records = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.jsonl.gz'):
+            continue
+        with gzip.open(os.path.join(directory, filename), 'rt') as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        records.append(json.loads(line))
+            except EOFError:
+                pass  # still open in a running process: everything up to the last flush is readable
+    records.sort(key=lambda record: (record['t'], record.get('seq', 0)))
+    return records
+
+
+def load_frame(frame_ref, root=RECORDINGS_DIR):
+    """Rebuild the data URL for a stored frame reference"""
+    with open(os.path.join(root, 'frames', frame_ref['frameRef']), 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode()
+    return f"data:{frame_ref['mime']};base64,{encoded}"
+
+
+def install_recording(app, recorder, resolve_session_id):
+    """
+    Record the Flask app's session traffic.
+    resolve_session_id(request, body, response_json) names the session a request belongs to.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _begin_recording():
+        if request.path.startswith(RECORDED_PATHS):
+            g.recording_started = time.time()
+            recorder.begin()
+
+    @app.after_request
+    def _end_recording(response):
+        started = g.pop('recording_started', None)
+        if started is None:
+            return response
+        try:
+            body = request.get_json(silent=True)
+            recorded_body = body
+            if isinstance(body, dict) and isinstance(body.get('frame'), str) and body['frame'].startswith('data:'):
+                recorded_body = {**body, 'frame': recorder.store_frame(body['frame'])}
+            response_json = response.get_json(silent=True) if response.is_json else None
+            recorder.end(resolve_session_id(request, body, response_json), {
+                'type': 'request',
+                't': started,
+                'method': request.method,
+                'path': request.path,
+                'args': request.args.to_dict(),
+                # Only headers that change behaviour; secrets are never written to recordings
+                'headers': {name: request.headers[name] for name in ('Cache-Control',) if name in request.headers},
+                'json': recorded_body,
+                'status': response.status_code,
+                'durationMs': round((time.time() - started) * 1000, 1),
+                'response': response_json,
+            })
+        except Exception as e:
+            print(f"Failed to record request {request.path}: {e}")
+        return response
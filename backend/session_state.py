@@ -0,0 +1,304 @@
+"""
+Pluggable session-state backends.
+Interview state (frame observations, job analysis, rate-limit flags, the active
+session) lives behind this interface so several gunicorn workers or hosts can
+share it. Appends are atomic and expiry is handled by the backend.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')  # 'memory' or 'sqlite'
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions.db'))
+SESSION_TTL = float(os.getenv('SESSION_TTL', str(4 * 3600)))  # seconds
+
+
+class SessionBackend:
+    """
+    Key/value and append-only list storage with per-key expiry.
+    Values must be JSON-serializable. A ttl of None uses the backend default.
+    """
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def update(self, key, fn, ttl=None):
+        """Atomically replace the value at key with fn(current value or None) and return it"""
+        raise NotImplementedError
+
+    def append(self, key, value, ttl=None):
+        """Atomically append value to the list at key and return the new length"""
+        raise NotImplementedError
+
+    def get_list(self, key):
+        raise NotImplementedError
+
+    def pop_list(self, key):
+        """Atomically return the whole list at key and remove it"""
+        raise NotImplementedError
+
+    def count_keys(self, prefix):
+        """Number of live keys (values or lists) starting with prefix"""
+        raise NotImplementedError
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Single-process backend; state is lost on restart and not shared between workers"""
+
+    def __init__(self, default_ttl=SESSION_TTL):
+        self.default_ttl = default_ttl
+        self._values = {}
+        self._lists = {}
+        self._lock = threading.Lock()
+
+    def _expiry(self, ttl):
+        return time.time() + (self.default_ttl if ttl is None else ttl)
+
+    def _live(self, store, key):
+        entry = store.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del store[key]
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._live(self._values, key)
+            return entry[0] if entry else default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (value, self._expiry(ttl))
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+            self._lists.pop(key, None)
+
+    def update(self, key, fn, ttl=None):
+        with self._lock:
+            entry = self._live(self._values, key)
+            value = fn(entry[0] if entry else None)
+            self._values[key] = (value, self._expiry(ttl))
+            return value
+
+    def append(self, key, value, ttl=None):
+        with self._lock:
+            entry = self._live(self._lists, key)
+            items = entry[0] if entry else []
+            items.append(value)
+            self._lists[key] = (items, self._expiry(ttl))
+            return len(items)
+
+    def get_list(self, key):
+        with self._lock:
+            entry = self._live(self._lists, key)
+            return list(entry[0]) if entry else []
+
+    def pop_list(self, key):
+        with self._lock:
+            entry = self._live(self._lists, key)
+            self._lists.pop(key, None)
+            return entry[0] if entry else []
+
+    def count_keys(self, prefix):
+        with self._lock:
+            keys = {key for key in list(self._values) if self._live(self._values, key) and key.startswith(prefix)}
+            keys |= {key for key in list(self._lists) if self._live(self._lists, key) and key.startswith(prefix)}
+            return len(keys)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Shared backend on a local SQLite file in WAL mode.
+    Every worker process on the host opens the same file; each operation is a
+    single transaction, so appends from different workers never interleave.
+    """
+
+    PURGE_INTERVAL = 60  # seconds between sweeps of expired rows
+
+    def __init__(self, db_path=SESSION_DB_PATH, default_ttl=SESSION_TTL):
+        self.db_path = db_path
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+        conn = self._conn()
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS session_values (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS session_lists (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )""")
+            # One row per list holding its length and expiry, so an append touches O(1) rows
+            conn.execute("""CREATE TABLE IF NOT EXISTS session_list_meta (
+                key TEXT PRIMARY KEY,
+                length INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_lists_key ON session_lists(key, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_values_expiry ON session_values(expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_list_meta_expiry ON session_list_meta(expires_at)")
+
+    def _conn(self):
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _expiry(self, ttl):
+        return time.time() + (self.default_ttl if ttl is None else ttl)
+
+    def _maybe_purge(self, conn):
+        now = time.time()
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        conn.execute('DELETE FROM session_values WHERE expires_at <= ?', (now,))
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'DELETE FROM session_lists WHERE key IN (SELECT key FROM session_list_meta WHERE expires_at <= ?)',
+                (now,),
+            )
+            conn.execute('DELETE FROM session_list_meta WHERE expires_at <= ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            'SELECT value FROM session_values WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value, ttl=None):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO session_values (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), self._expiry(ttl)),
+        )
+        self._maybe_purge(conn)
+
+    def delete(self, key):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM session_values WHERE key = ?', (key,))
+            conn.execute('DELETE FROM session_lists WHERE key = ?', (key,))
+            conn.execute('DELETE FROM session_list_meta WHERE key = ?', (key,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def update(self, key, fn, ttl=None):
+        conn = self._conn()
+        # BEGIN IMMEDIATE takes the write lock before reading, so concurrent updates from any worker serialize
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT value FROM session_values WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+            value = fn(json.loads(row[0]) if row else None)
+            conn.execute(
+                'INSERT OR REPLACE INTO session_values (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), self._expiry(ttl)),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._maybe_purge(conn)
+        return value
+
+    def append(self, key, value, ttl=None):
+        conn = self._conn()
+        expires_at = self._expiry(ttl)
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            meta = conn.execute('SELECT length, expires_at FROM session_list_meta WHERE key = ?', (key,)).fetchone()
+            if meta and meta[1] <= now:
+                conn.execute('DELETE FROM session_lists WHERE key = ?', (key,))  # expired, not yet purged
+                meta = None
+            length = (meta[0] if meta else 0) + 1
+            conn.execute(
+                'INSERT INTO session_lists (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), expires_at),
+            )
+            # Appending refreshes the whole list's expiry, like an EXPIRE after RPUSH
+            conn.execute(
+                'INSERT OR REPLACE INTO session_list_meta (key, length, expires_at) VALUES (?, ?, ?)',
+                (key, length, expires_at),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._maybe_purge(conn)
+        return length
+
+    _LIVE_LIST = """SELECT l.value FROM session_lists l JOIN session_list_meta m ON m.key = l.key
+                    WHERE l.key = ? AND m.expires_at > ? ORDER BY l.id"""
+
+    def get_list(self, key):
+        rows = self._conn().execute(self._LIVE_LIST, (key, time.time())).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def pop_list(self, key):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(self._LIVE_LIST, (key, time.time())).fetchall()
+            conn.execute('DELETE FROM session_lists WHERE key = ?', (key,))
+            conn.execute('DELETE FROM session_list_meta WHERE key = ?', (key,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [json.loads(row[0]) for row in rows]
+
+    def count_keys(self, prefix):
+        pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        now = time.time()
+        row = self._conn().execute(
+            """SELECT COUNT(*) FROM (
+                   SELECT key FROM session_values WHERE key LIKE ? ESCAPE '\\' AND expires_at > ?
+                   UNION
+                   SELECT key FROM session_list_meta WHERE key LIKE ? ESCAPE '\\' AND expires_at > ?
+               )""",
+            (pattern, now, pattern, now),
+        ).fetchone()
+        return row[0]
+
+
+def create_session_backend(kind=SESSION_BACKEND):
+    """Build the session backend selected by SESSION_BACKEND"""
+    if kind == 'memory':
+        return InMemorySessionBackend()
+    if kind == 'sqlite':
+        print(f"Using shared SQLite session backend at {SESSION_DB_PATH}")
+        return SQLiteSessionBackend()
+    raise ValueError(f"Unknown SESSION_BACKEND: {kind}")
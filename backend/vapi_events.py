@@ -0,0 +1,299 @@
+"""
+VAPI server-event ingestion.
+VAPI posts call events (transcripts, speech start/stop, end-of-call report)
+to the backend's webhook. Each event is verified and folded into a small
+per-session timing state in constant time; completed turns, final transcript
+lines and the end-of-call report are appended to the session log so the
+review can use measured response latency and answer duration. The timing
+state is updated atomically in the session backend, so concurrent deliveries
+to different workers do not lose events.
+"""
+
+import hmac
+import os
+import re
+import threading
+import time
+
+try:
+    from interview_agents import MODE_CONFIGS
+except ImportError:
+    MODE_CONFIGS = {}
+
+VAPI_WEBHOOK_SECRET = os.getenv('VAPI_WEBHOOK_SECRET')
+SECRET_HEADER = 'X-Vapi-Secret'
+
+HANDLED_EVENTS = ('transcript', 'speech-update', 'end-of-call-report')
+
+_TIME_LIMIT = re.compile(r'(\d+)\s*(second|sec|minute|min)', re.I)
+
+SPEAKER_LABELS = {'assistant': 'Interviewer', 'user': 'Candidate'}
+
+
+class InvalidEvent(ValueError):
+    """Raised for a webhook payload that is not a well-formed VAPI server message"""
+
+
+def parse_time_limit(time_limit):
+    """Seconds per answer from a custom session's timeLimit ("30 seconds per answer"), or None"""
+    match = _TIME_LIMIT.search(time_limit or '')
+    if not match:
+        return None  # "No Time Limit"
+    return int(match.group(1)) * (60 if match.group(2).lower().startswith('min') else 1)
+
+
+def timing_rules(mode, time_limit=None):
+    """
+    Timing rules that can be measured instead of guessed: the mode's MODE_CONFIGS limits
+    (start_limit: seconds to begin answering, else time_limit: seconds per answer), or a
+    custom session's configured timeLimit.
+    """
+    if mode == 'custom':
+        seconds = parse_time_limit(time_limit)
+        return {'max_answer_seconds': seconds} if seconds else {}
+    config = MODE_CONFIGS.get(mode) or {}
+    if config.get('start_limit'):
+        return {'max_start_seconds': config['start_limit']}
+    if config.get('time_limit'):
+        return {'max_answer_seconds': config['time_limit']}
+    return {}
+
+
+def timing_key(session_id):
+    return f"vapi_timing:{session_id}"
+
+
+def turns_key(session_id):
+    return f"vapi_turns:{session_id}"
+
+
+def transcript_key(session_id):
+    return f"vapi_transcript:{session_id}"
+
+
+def call_key(session_id):
+    return f"vapi_call:{session_id}"
+
+
+def verify_secret(provided, secret=VAPI_WEBHOOK_SECRET):
+    """Constant-time check of the shared secret VAPI sends with every server message; False without a secret"""
+    if not secret or not provided:
+        return False
+    return hmac.compare_digest(provided.encode('utf-8'), secret.encode('utf-8'))
+
+
+def parse_event(payload):
+    """Validate a webhook body and return its message, or raise InvalidEvent"""
+    if not isinstance(payload, dict) or not isinstance(payload.get('message'), dict):
+        raise InvalidEvent("Body must be a JSON object with a 'message' object")
+    message = payload['message']
+    event_type = message.get('type')
+    if not isinstance(event_type, str):
+        raise InvalidEvent("Message has no 'type'")
+    if event_type == 'transcript' and not isinstance(message.get('transcript'), str):
+        raise InvalidEvent("Transcript message has no 'transcript' text")
+    if event_type == 'speech-update' and (message.get('status') not in ('started', 'stopped')
+                                          or message.get('role') not in SPEAKER_LABELS):
+        raise InvalidEvent("Speech update needs a role and a started/stopped status")
+    return message
+
+
+def event_session_id(message, explicit=None):
+    """Session an event belongs to: the webhook's sessionId, else the call's assistant id"""
+    if explicit:
+        return explicit
+    call = message.get('call') or {}
+    return call.get('assistantId') or (message.get('assistant') or {}).get('id') or call.get('id')
+
+
+def event_timestamp_ms(message):
+    timestamp = message.get('timestamp')
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return time.time() * 1000
+
+
+def new_timing_state():
+    return {
+        'assistantStoppedAt': None,  # when the interviewer last finished speaking
+        'question': None,            # what the interviewer said since they last started speaking
+        'answerStartedAt': None,     # first candidate speech after the question
+        'answerEndedAt': None,       # latest candidate speech stop
+        'answerWords': 0,
+        'turns': 0,
+        'ended': False,
+    }
+
+
+def _close_turn(state):
+    """Return the finished turn for the pending answer, or None, and reset the answer fields"""
+    if state['answerStartedAt'] is None:
+        return None
+    latency = None
+    if state['assistantStoppedAt'] is not None:
+        latency = max(0.0, state['answerStartedAt'] - state['assistantStoppedAt'])
+    ended = state['answerEndedAt'] if state['answerEndedAt'] is not None else state['answerStartedAt']
+    state['turns'] += 1
+    turn = {
+        'turn': state['turns'],
+        'question': state['question'],
+        'responseLatencyMs': round(latency, 1) if latency is not None else None,
+        'answerDurationMs': round(max(0.0, ended - state['answerStartedAt']), 1),
+        'answerWords': state['answerWords'],
+    }
+    state['answerStartedAt'] = state['answerEndedAt'] = None
+    state['answerWords'] = 0
+    return turn
+
+
+def apply_event(state, message):
+    """
+    Fold one event into the timing state.
+    Returns (state, finished_turn_or_None, transcript_line_or_None); O(1) per event.
+    """
+    event_type = message['type']
+    timestamp = event_timestamp_ms(message)
+    turn = line = None
+
+    if event_type == 'speech-update':
+        role, status = message['role'], message['status']
+        if role == 'assistant' and status == 'started':
+            turn = _close_turn(state)  # the interviewer speaking again ends the answer
+            if turn:
+                state['question'] = None  # a new question begins; otherwise the interviewer is still asking
+        elif role == 'assistant' and status == 'stopped':
+            state['assistantStoppedAt'] = timestamp
+        elif role == 'user' and status == 'started':
+            if state['answerStartedAt'] is None:
+                state['answerStartedAt'] = timestamp
+        elif role == 'user' and status == 'stopped':
+            if state['answerStartedAt'] is not None:
+                state['answerEndedAt'] = timestamp
+
+    elif event_type == 'transcript' and message.get('transcriptType', 'final') == 'final':
+        role = message.get('role')
+        text = message['transcript'].strip()
+        if text and role in SPEAKER_LABELS:
+            line = f"{SPEAKER_LABELS[role]}: {text}"
+            if role == 'assistant':
+                state['question'] = f"{state['question']} {text}" if state['question'] else text
+            else:
+                state['answerWords'] += len(text.split())
+
+    elif event_type == 'end-of-call-report':
+        turn = _close_turn(state)
+        state['ended'] = True
+
+    return state, turn, line
+
+
+class VapiEventIngestor:
+    """Applies verified events to the session backend; one atomic update plus at most two appends per event"""
+
+    def __init__(self, session_state):
+        self.session_state = session_state
+        self._counts = {'received': 0, 'ingested': 0, 'ignored': 0, 'rejected': 0}
+        self._counts_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def reject(self):
+        self._count('rejected')
+
+    def ingest(self, message, session_id):
+        """Apply one parsed event to session_id's timing state and log; returns what was recorded"""
+        self._count('received')
+        if message['type'] not in HANDLED_EVENTS:
+            self._count('ignored')
+            return {'ignored': message['type']}
+
+        # One transaction per event, so deliveries handled by different workers never overwrite each other
+        applied = {}
+
+        def step(state):
+            state, applied['turn'], applied['line'] = apply_event(state or new_timing_state(), message)
+            return state
+
+        self.session_state.update(timing_key(session_id), step)
+        turn, line = applied['turn'], applied['line']
+
+        if line:
+            self.session_state.append(transcript_key(session_id), line)
+        if turn:
+            self.session_state.append(turns_key(session_id), turn)
+        if message['type'] == 'end-of-call-report':
+            self.session_state.set(call_key(session_id), {
+                'endedReason': message.get('endedReason'),
+                'durationSeconds': message.get('durationSeconds'),
+                'transcript': message.get('transcript') or (message.get('artifact') or {}).get('transcript'),
+            })
+        self._count('ingested')
+        return {'turn': turn, 'line': line}
+
+    def session_timing(self, session_id, mode=None, time_limit=None):
+        """Measured turns and their summary for a session"""
+        turns = self.session_state.get_list(turns_key(session_id))
+        return {'sessionId': session_id, 'turns': turns, 'summary': timing_summary(turns, mode, time_limit)}
+
+    def server_transcript(self, session_id):
+        """Transcript assembled from final transcript events, or the end-of-call report's transcript"""
+        lines = self.session_state.get_list(transcript_key(session_id))
+        if lines:
+            return '\n'.join(lines)
+        report = self.session_state.get(call_key(session_id)) or {}
+        return report.get('transcript')
+
+    def stats(self):
+        with self._counts_lock:
+            return dict(self._counts, webhook='enabled' if VAPI_WEBHOOK_SECRET else 'disabled (VAPI_WEBHOOK_SECRET not set)')
+
+
+def timing_summary(turns, mode=None, time_limit=None):
+    """Aggregate response latency and answer duration, counting turns that break the mode's timing rules"""
+    if not turns:
+        return None
+    latencies = [t['responseLatencyMs'] for t in turns if t.get('responseLatencyMs') is not None]
+    durations = [t['answerDurationMs'] for t in turns]
+    summary = {
+        'turns': len(turns),
+        'avgResponseLatencySeconds': round(sum(latencies) / len(latencies) / 1000, 1) if latencies else None,
+        'maxResponseLatencySeconds': round(max(latencies) / 1000, 1) if latencies else None,
+        'avgAnswerSeconds': round(sum(durations) / len(durations) / 1000, 1),
+        'maxAnswerSeconds': round(max(durations) / 1000, 1),
+    }
+    rules = timing_rules(mode, time_limit)
+    if 'max_start_seconds' in rules:
+        limit = rules['max_start_seconds'] * 1000
+        summary['lateStarts'] = sum(1 for latency in latencies if latency > limit)
+        summary['maxStartSeconds'] = rules['max_start_seconds']
+    if 'max_answer_seconds' in rules:
+        limit = rules['max_answer_seconds'] * 1000
+        summary['overlongAnswers'] = sum(1 for duration in durations if duration > limit)
+        summary['maxAnswerSecondsAllowed'] = rules['max_answer_seconds']
+    return summary
+
+
+def format_timing_for_prompt(turns, mode=None, max_turns=20, time_limit=None):
+    """Compact timing block for the review prompt"""
+    summary = timing_summary(turns, mode, time_limit)
+    if not summary:
+        return None
+    lines = [f"Answered turns: {summary['turns']}"]
+    if summary['avgResponseLatencySeconds'] is not None:
+        lines.append(f"Time to begin answering: avg {summary['avgResponseLatencySeconds']}s, "
+                     f"max {summary['maxResponseLatencySeconds']}s")
+    lines.append(f"Answer duration: avg {summary['avgAnswerSeconds']}s, max {summary['maxAnswerSeconds']}s")
+    if 'lateStarts' in summary:
+        lines.append(f"Answers not started within {summary['maxStartSeconds']}s: "
+                     f"{summary['lateStarts']} of {summary['turns']}")
+    if 'overlongAnswers' in summary:
+        lines.append(f"Answers longer than {summary['maxAnswerSecondsAllowed']}s: "
+                     f"{summary['overlongAnswers']} of {summary['turns']}")
+    shown = turns if len(turns) <= max_turns else turns[:max_turns // 2] + turns[-(max_turns // 2):]
+    lines.append("Per turn (begin after question / answer length):")
+    for turn in shown:
+        latency = f"{turn['responseLatencyMs'] / 1000:.1f}s" if turn.get('responseLatencyMs') is not None else "n/a"
+        lines.append(f"- Turn {turn['turn']}: {latency} / {turn['answerDurationMs'] / 1000:.1f}s")
+    return '\n'.join(lines)
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the CPU-bound paths in the backend and agents.
+Runs offline on fixed, deterministic fixtures of realistic size (long job
+posts, an hour-long transcript, 1080p frames, a saved LinkedIn page) and
+compares each result with a baseline file, failing when a path regresses
+beyond the configured threshold.
+
+Usage:
+    python3 benchmark.py --save-baseline          # record benchmark_baseline.json
+    python3 benchmark.py                          # compare against it (exit 1 on regression)
+    python3 benchmark.py --require-baseline       # CI: also exit 1 when the baseline is missing
+    python3 benchmark.py --threshold 0.5 --only fallback_job_analysis
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmark_baseline.json')
+
+WORDS = ("team project customer data design deliver build improve lead system process quality "
+         "deadline stakeholder feedback metric result launch product service analysis plan review "
+         "migrate scale latency budget mentor hire roadmap incident outage recovery tradeoff").split()
+
+
+def _sentence(rng, min_words=8, max_words=20):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def make_job_post(rng, sections=6, bullets=12):
+    """A long (~12k character) job post with headed bullet sections"""
+    lines = ["Senior Software Engineer, Data Platform at Northwind Analytics",
+             "Location: Remote (US). Full-time.", ""]
+    lines.extend(_sentence(rng) for _ in range(8))
+    headings = ["About the role", "Responsibilities", "Requirements", "Preferred qualifications",
+                "Our stack", "Benefits", "About us", "How we work"]
+    for heading in headings[:sections]:
+        lines.extend(["", f"{heading}:"])
+        lines.extend(f"- {_sentence(rng, 6, 16)}" for _ in range(bullets))
+    return '\n'.join(lines)
+
+
+def make_transcript(rng, minutes=60, words_per_minute=150):
+    """An hour-long interview transcript with alternating turns"""
+    turns = []
+    remaining = minutes * words_per_minute
+    speaker = 'Interviewer'
+    while remaining > 0:
+        sentences = [_sentence(rng) for _ in range(1 if speaker == 'Interviewer' else rng.randint(4, 9))]
+        text = ' '.join(sentences)
+        turns.append(f"{speaker}: {text}")
+        remaining -= len(text.split())
+        speaker = 'Candidate' if speaker == 'Interviewer' else 'Interviewer'
+    return '\n'.join(turns)
+
+
+def make_frame_notes(rng, count=120):
+    """One frame analysis every 30 seconds for an hour"""
+    openers = ["You look engaged and friendly.", "You seem a bit nervous and are looking away from the screen.",
+               "Your posture is upright and you are maintaining eye contact with the screen area.",
+               "You appear calm and focused."]
+    tips = ["Try to sit up a little straighter.", "Try to keep your focus on the screen area.",
+            "Try to relax your shoulders.", "Keep smiling when you introduce yourself."]
+    return [f"{rng.choice(openers)} {rng.choice(tips)}" for _ in range(count)]
+
+
+def make_frame_data_url(rng, width=1920, height=1080):
+    """A 1080p JPEG webcam-style frame as a data URL"""
+    from PIL import Image, ImageDraw
+    image = Image.new('RGB', (width, height), (105, 115, 125))
+    draw = ImageDraw.Draw(image)
+    for _ in range(3000):
+        x, y = rng.randrange(width), rng.randrange(height)
+        shade = rng.randrange(50, 210)
+        draw.rectangle((x, y, x + rng.randint(4, 20), y + rng.randint(4, 20)), fill=(shade, shade - 10, shade + 10))
+    draw.ellipse((width * 0.4, height * 0.18, width * 0.6, height * 0.72), fill=(224, 172, 140))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def make_linkedin_html(rng, job_post):
+    """A saved-page-sized (~250 KB) LinkedIn job page with the description deep in the markup"""
+    nav = ''.join(f'<li class="nav-item"><a href="/x/{i}">{rng.choice(WORDS)}</a></li>' for i in range(400))
+    cards = ''.join(
+        f'<div class="job-card"><h3>{_sentence(rng, 2, 4)}</h3><span class="meta">{_sentence(rng, 3, 6)}</span></div>'
+        for _ in range(300)
+    )
+    description = ''.join(f'<p>{line}</p>' for line in job_post.split('\n') if line)
+    return f"""<!DOCTYPE html><html><head><title>Senior Software Engineer | LinkedIn</title>
+<script>{'var x=1;' * 4000}</script></head><body>
+<nav><ul>{nav}</ul></nav><main><section class="top-card">{cards}</section>
+<section class="core-section-container"><div class="show-more-less-html__markup">{description}</div></section>
+</main></body></html>"""
+
+
+def load_fixtures(args):
+    rng = random.Random(1234)
+    job_post = make_job_post(rng)
+    fixtures = {
+        'job_post': job_post,
+        'transcript': make_transcript(rng),
+        'frame_notes': make_frame_notes(rng),
+        'frame_data_url': make_frame_data_url(rng),
+        'linkedin_html': make_linkedin_html(rng, job_post),
+        'answers': [_sentence(rng, 20, 60) + rng.choice([' I led the team.', ' It was a challenge.',
+                                                           ' We had a conflict.', ' I worked there.', ''])
+                    for _ in range(100)],
+    }
+    if args.html_fixture:
+        with open(args.html_fixture, 'rb') as f:
+            fixtures['linkedin_html'] = f.read()
+    return fixtures
+
+
+def import_backend():
+    """Import app.py with its databases redirected to a scratch directory"""
+    state_dir = tempfile.mkdtemp(prefix='acey-bench-')
+    for name, filename in [('REVIEW_DB_PATH', 'reviews.db'), ('HISTORY_DB_PATH', 'history.db'),
+                           ('SESSION_DB_PATH', 'sessions.db')]:
+        os.environ.setdefault(name, os.path.join(state_dir, filename))
+    os.environ.setdefault('AGENT_HEALTH_INTERVAL', '0')
+    os.environ.setdefault('FOLLOWUP_LLM', 'false')  # benchmark the keyword tier offline
+    os.environ.setdefault('FOLLOWUP_BANK', 'false')  # the bank tier has its own benchmark (question_bank_retrieve)
+    sys.path.insert(0, ROOT_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as backend
+    return backend
+
+
+def build_benchmarks(backend, fixtures):
+    """Map of benchmark name -> zero-argument callable"""
+    import interview_agents
+    from frame_quality import assess_frame
+
+    answers = fixtures['answers']
+    loop = asyncio.new_event_loop()
+
+    async def follow_up_batch():
+        for index, answer in enumerate(answers):
+            mode = ('easy', 'medium', 'hard')[index % 3]
+            await interview_agents.generate_follow_up_question(answer, mode, interview_agents.MODE_CONFIGS[mode])
+
+    frame_image = backend.decode_frame(fixtures['frame_data_url'])
+    frame_image.load()
+
+    return {
+        'fallback_job_analysis': lambda: backend.fallback_job_analysis(fixtures['job_post']),
+        'generate_follow_up_question_x100': lambda: loop.run_until_complete(follow_up_batch()),
+        'question_bank_retrieve': lambda: interview_agents.question_retriever.retrieve(
+            answers[0], 'medium', job_topics=['skill:Python', 'responsibility:Mentor junior engineers']),
+        'parse_linkedin_html': lambda: backend.parse_linkedin_html(fixtures['linkedin_html']),
+        'decode_frame_1080p': lambda: backend.decode_frame(fixtures['frame_data_url']),
+        'frame_quality_gate_1080p': lambda: assess_frame(frame_image),
+        'build_custom_system_prompt': lambda: backend.build_custom_system_prompt(
+            'Behavioral & Situational', '1 minute per answer', 'Follow-up questions', 'Staff Engineer Loop'),
+        'build_synthesis_prompt_1h': lambda: backend.build_synthesis_prompt(
+            fixtures['transcript'], 'medium', fixtures['frame_notes']),
+    }
+
+
+def time_benchmark(fn, rounds, min_round_seconds):
+    """Median and minimum seconds per call, calibrating iterations so each round lasts long enough"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()  # warm up
+        iterations = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_round_seconds or iterations >= 100000:
+                break
+            iterations *= 2
+
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            samples.append((time.perf_counter() - start) / iterations)
+    return {
+        'medianUs': round(statistics.median(samples) * 1e6, 3),
+        'minUs': round(min(samples) * 1e6, 3),
+        'iterations': iterations,
+        'rounds': rounds,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return a list of (name, baseline_us, current_us, ratio) for regressed benchmarks"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        limit = baseline.get('thresholds', {}).get(name, threshold)
+        ratio = result['medianUs'] / base['medianUs'] if base['medianUs'] else 1.0
+        result['baselineUs'] = base['medianUs']
+        result['ratio'] = round(ratio, 3)
+        if ratio > 1 + limit:
+            regressions.append((name, base['medianUs'], result['medianUs'], ratio))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline file to compare against / save to')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=float(os.getenv('BENCH_THRESHOLD', '0.25')),
+                        help='allowed slowdown before failing, as a fraction (0.25 = 25%%)')
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--min-round-seconds', type=float, default=0.05)
+    parser.add_argument('--only', action='append', help='run only the named benchmark (repeatable)')
+    parser.add_argument('--html-fixture', help='use a saved LinkedIn job page instead of the generated one')
+    parser.add_argument('--output', help='also write the results JSON here')
+    parser.add_argument('--require-baseline', action='store_true',
+                        default=os.getenv('CI', '').lower() in ('1', 'true', 'yes'),
+                        help='fail when the baseline file is missing (default on when CI is set)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fixtures = load_fixtures(args)
+    backend = import_backend()
+    benchmarks = build_benchmarks(backend, fixtures)
+    if args.only:
+        unknown = set(args.only) - set(benchmarks)
+        if unknown:
+            print(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+            return 2
+        benchmarks = {name: fn for name, fn in benchmarks.items() if name in args.only}
+
+    results = {}
+    for name, fn in benchmarks.items():
+        results[name] = time_benchmark(fn, args.rounds, args.min_round_seconds)
+        print(f"{name:<36} {results[name]['medianUs']:>14.1f} us/call")
+
+    report = {'python': sys.version.split()[0], 'createdAt': time.time(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f)
+        # Keep per-benchmark threshold overrides and results of benchmarks not run this time
+        report['thresholds'] = previous.get('thresholds', {})
+        report['results'] = {**previous.get('results', {}), **results}
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        return 1 if args.require_baseline else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print("\n❌ Performance regressions:")
+        for name, base_us, current_us, ratio in regressions:
+            print(f"  {name}: {base_us:.1f} us -> {current_us:.1f} us ({(ratio - 1) * 100:+.0f}%)")
+        return 1
+    print("\n✅ No regressions beyond threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,27 @@ import { useLocation, useOutletContext, useNavigate } from 'react-router-dom';
 import Vapi from '@vapi-ai/web';
 import Webcam from 'react-webcam';
 import CatAnimation from './CatAnimation';
-import { checkAndAwardBadge } from './placeholders';
+import { checkAndAwardBadge, getUserId } from './placeholders';
 import './Conversation.css';
 
 const vapi = new Vapi('9ef2dad6-738e-4ba5-830b-a7c5f87dfd2d');
+// Used until the backend suggests an interval with nextCaptureMs
+const DEFAULT_CAPTURE_MS = 30000;
+const REVIEW_POLL_MS = 2000;
+
+// Poll a background review job until it finishes; returns the review or { error }
+const waitForReviewJob = async (job) => {
+  while (job.status === 'queued' || job.status === 'running') {
+    await new Promise((resolve) => setTimeout(resolve, REVIEW_POLL_MS));
+    const response = await fetch(`http://127.0.0.1:5001/api/review-jobs/${encodeURIComponent(job.sessionId)}`);
+    job = await response.json();
+    if (!response.ok) return { error: job.error || 'Failed to generate report.' };
+  }
+  // A partial job still carries the sections that were generated
+  return job.status === 'done' || job.status === 'partial'
+    ? job.review
+    : { error: job.error || 'Failed to generate report.' };
+};
 
 const Conversation = () => {
   const { clearSessionName, selection } = useOutletContext();
@@ -22,10 +39,19 @@ const Conversation = () => {
   const [isAISpeaking, setIsAISpeaking] = useState(false);
   const [customSettings, setCustomSettings] = useState(customConfig || null);
   const webcamRef = useRef(null);
-  const captureIntervalRef = useRef(null);
+  const captureTimeoutRef = useRef(null);
+  const capturingRef = useRef(false);
   const nodeRef = useRef(null);
   const speechTimeoutRef = useRef(null);
   const aiActivityRef = useRef(false);
+  // Idempotency key of the current call; every request of the call derives its key from it
+  const callKeyRef = useRef(null);
+  // Number of frames captured in the current call, so each frame (and its retries) has a stable key
+  const frameSeqRef = useRef(0);
+  // Review attempts in the current call; a retry of a partial review needs a fresh key
+  const reviewAttemptRef = useRef(0);
+  // Backend session of the current call; frames and the review are stored under it
+  const sessionIdRef = useRef(null);
 
   // Use a ref to hold the transcript to avoid stale closures in event handlers
   const transcriptRef = useRef('');
@@ -33,31 +59,41 @@ const Conversation = () => {
     transcriptRef.current = transcript;
   }, [transcript]);
 
+  // Returns the delay before the next capture, or null to stop capturing
   const sendFrameForAnalysis = useCallback(async () => {
+    let nextCaptureMs = DEFAULT_CAPTURE_MS;
     if (webcamRef.current) {
       console.log('Attempting to capture frame...');
       const frame = webcamRef.current.getScreenshot();
       if (frame) {
         console.log('Frame captured successfully, sending to backend...');
+        frameSeqRef.current += 1;
+        const frameKey = `${callKeyRef.current || crypto.randomUUID()}:frame:${frameSeqRef.current}`;
         try {
           const response = await fetch('http://127.0.0.1:5001/api/analyze-frame', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ frame }),
+            headers: { 'Content-Type': 'application/json', 'Idempotency-Key': frameKey },
+            body: JSON.stringify({ frame, sessionId: sessionIdRef.current, userId: getUserId() }),
           });
 
           if (response.ok) {
             const result = await response.json();
             console.log('Frame analysis successful:', result);
+            nextCaptureMs = result.nextCaptureMs || nextCaptureMs;
           } else {
             console.error('Frame analysis failed with status:', response.status);
+            const errorText = await response.text();
+            console.error('Error response:', errorText);
             // If we hit a rate limit, stop sending frames.
             if (response.status === 429) {
               console.log('Rate limit hit. Halting frame analysis for this call.');
-              clearInterval(captureIntervalRef.current);
+              return null;
+            }
+            try {
+              nextCaptureMs = JSON.parse(errorText).nextCaptureMs || nextCaptureMs;
+            } catch (parseError) {
+              // Not a JSON error body; keep the default interval
             }
-            const errorText = await response.text();
-            console.error('Error response:', errorText);
           }
         } catch (error) {
           console.error('Error sending frame for analysis:', error);
@@ -68,21 +104,37 @@ const Conversation = () => {
     } else {
       console.error('Webcam ref is not available');
     }
+    return nextCaptureMs;
   }, []);
 
-  const fetchReview = useCallback(async (finalTranscript) => {
+  const fetchReview = useCallback(async (finalTranscript, retry = false) => {
     setReport({ status: 'loading' });
+    const callKey = callKeyRef.current || crypto.randomUUID();
+    if (retry) reviewAttemptRef.current += 1;
+    const attempt = reviewAttemptRef.current;
     try {
       const reviewResponse = await fetch('http://127.0.0.1:5001/api/get-review', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': attempt ? `${callKey}:review:${attempt}` : `${callKey}:review`
+        },
         body: JSON.stringify({
           transcript: finalTranscript,
-          mode: interviewMode
+          mode: interviewMode,
+          sessionId: sessionIdRef.current,
+          userId: getUserId()
         }),
       });
-      const data = await reviewResponse.json();
-      if (reviewResponse.ok) {
+      let data = await reviewResponse.json();
+      // With a sessionId the review runs as a background job
+      if (reviewResponse.ok && data.sessionId && data.status) {
+        data = await waitForReviewJob(data);
+      }
+      if (reviewResponse.ok && data.partial) {
+        // Show the sections that were generated; only a complete review is saved
+        setReport(data);
+      } else if (reviewResponse.ok && !data.error) {
         setReport(data);
 
         // Save the completed interview to chat history
@@ -106,7 +158,7 @@ const Conversation = () => {
         }
 
       } else {
-        setReport({ summary: data.review?.error || 'Failed to generate report.' });
+        setReport({ summary: data.review?.error || data.error || 'Failed to generate report.' });
       }
     } catch (error) {
       console.error('Error fetching review:', error);
@@ -115,13 +167,29 @@ const Conversation = () => {
   }, [interviewMode]);
 
   useEffect(() => {
+    // Capture a frame, then wait as long as the backend asked before the next one
+    const captureLoop = async () => {
+      const nextCaptureMs = await sendFrameForAnalysis();
+      if (capturingRef.current && nextCaptureMs) {
+        console.log(`Next frame in ${Math.round(nextCaptureMs / 1000)}s`);
+        captureTimeoutRef.current = setTimeout(captureLoop, nextCaptureMs);
+      }
+    };
+
+    const stopCapture = () => {
+      capturingRef.current = false;
+      clearTimeout(captureTimeoutRef.current);
+    };
+
     const handleCallStart = () => {
       setCallStatus('active');
       setTranscript('');
+      reviewAttemptRef.current = 0;
       setIsAISpeaking(false);
       console.log('Call has started');
-      sendFrameForAnalysis();
-      captureIntervalRef.current = setInterval(sendFrameForAnalysis, 30000);
+      stopCapture();
+      capturingRef.current = true;
+      captureLoop();
     };
 
     const handleCallEnd = () => {
@@ -129,7 +197,7 @@ const Conversation = () => {
       setIsAISpeaking(false);
       aiActivityRef.current = false;
       console.log('Call has ended');
-      clearInterval(captureIntervalRef.current);
+      stopCapture();
       fetchReview(transcriptRef.current);
     };
 
@@ -183,7 +251,7 @@ const Conversation = () => {
       console.error('Full error object:', JSON.stringify(e, null, 2));
       console.error('Error message:', e.error?.message);
       console.error('Error type:', typeof e.error);
-      clearInterval(captureIntervalRef.current);
+      stopCapture();
     };
 
     vapi.on('call-start', handleCallStart);
@@ -206,8 +274,11 @@ const Conversation = () => {
   const startCall = async () => {
     setCallStatus('loading');
     setReport(null);
+    // One key per call, created before the assistant request so that request can derive its key from it
+    callKeyRef.current = crypto.randomUUID();
+    frameSeqRef.current = 0;
     try {
-      let url = `http://127.0.0.1:5001/api/vapi-assistant?mode=${interviewMode}`;
+      let url = `http://127.0.0.1:5001/api/vapi-assistant?mode=${interviewMode}&userId=${encodeURIComponent(getUserId())}`;
 
       // If custom mode, include custom configuration
       if (interviewMode === 'custom' && customSettings) {
@@ -220,10 +291,11 @@ const Conversation = () => {
         url += `&${customParams.toString()}`;
       }
 
-      const response = await fetch(url);
+      const response = await fetch(url, { headers: { 'Idempotency-Key': `${callKeyRef.current}:assistant` } });
       if (!response.ok) throw new Error(`Backend error: ${response.statusText}`);
-      const { assistantId } = await response.json();
+      const { assistantId, sessionId } = await response.json();
       if (!assistantId) throw new Error('Assistant ID not received from backend.');
+      sessionIdRef.current = sessionId;
 
       console.log('Starting VAPI call with assistant ID:', assistantId);
       console.log('Interview mode:', interviewMode);
@@ -255,7 +327,7 @@ const Conversation = () => {
   };
 
   const saveToHistory = () => {
-    if (transcript && report && report.overallScore != null) {
+    if (transcript && report && report.overallScore != null && !report.partial) {
       const interviewData = {
         id: Date.now().toString(),
         title: `Interview - ${interviewMode.charAt(0).toUpperCase() + interviewMode.slice(1)} Mode`,
@@ -352,14 +424,16 @@ const Conversation = () => {
             {report && report.status === 'loading' && (
               <span className="loading-indicator">Generating report...</span>
             )}
-            {report && report.overallScore != null && (
+            {report && (report.overallScore != null || report.partial) && (
               <>
                 <button onClick={viewReport} className="view-report-btn">
                   View Report
                 </button>
-                <button onClick={saveToHistory} className="save-history-btn">
-                  Save to History
-                </button>
+                {!report.partial && (
+                  <button onClick={saveToHistory} className="save-history-btn">
+                    Save to History
+                  </button>
+                )}
               </>
             )}
           </div>
@@ -379,7 +453,15 @@ const Conversation = () => {
             </div>
           )}
         </div>
-        {report && report.summary && report.overallScore == null && (
+        {report && report.partial && (
+          <div className="error-message">
+            <p>Part of your review could not be generated ({report.missingSections.join(', ')}).</p>
+            <button onClick={() => fetchReview(transcriptRef.current, true)} className="view-report-btn">
+              Retry Missing Sections
+            </button>
+          </div>
+        )}
+        {report && report.summary && report.overallScore == null && !report.partial && (
           <div className="error-message">
             <p>{report.summary}</p>
           </div>
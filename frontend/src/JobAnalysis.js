@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
+import { getUserId } from './placeholders';
 import './JobAnalysis.css';
 
 const questionTypes = [
@@ -66,7 +67,7 @@ const JobAnalysis = () => {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ jobDescription: description }),
+                body: JSON.stringify({ jobDescription: description, userId: getUserId() }),
             });
 
             const data = await response.json();
@@ -46,16 +46,24 @@ const Report = () => {
         <p className="report-summary">{report.summary}</p>
       </header>
 
-      <div className="score-container">
-        <div className="score-circle">
-          <span className="score-number">{report.overallScore}</span>
-          <span className="score-label">/ 100</span>
+      {report.partial && (
+        <p className="report-summary">
+          Part of this review could not be generated ({report.missingSections.join(', ')}); retry from the interview page.
+        </p>
+      )}
+
+      {report.overallScore != null && (
+        <div className="score-container">
+          <div className="score-circle">
+            <span className="score-number">{report.overallScore}</span>
+            <span className="score-label">/ 100</span>
+          </div>
+          <h2>Overall Score</h2>
+          {report.scoreExplanation && (
+            <p className="score-explanation">{report.scoreExplanation}</p>
+          )}
         </div>
-        <h2>Overall Score</h2>
-        {report.scoreExplanation && (
-          <p className="score-explanation">{report.scoreExplanation}</p>
-        )}
-      </div>
+      )}
 
       {report.scoringBreakdown && (
         <div className="scoring-breakdown">
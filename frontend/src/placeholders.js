@@ -40,6 +40,16 @@ const saveBadges = (badges) => {
   localStorage.setItem('userBadges', JSON.stringify(badges));
 };
 
+// Stable id for this browser, sent with interviews so the backend can scope history to it
+const getUserId = () => {
+  let userId = localStorage.getItem('userId');
+  if (!userId) {
+    userId = crypto.randomUUID();
+    localStorage.setItem('userId', userId);
+  }
+  return userId;
+};
+
 const checkAndAwardBadge = (difficulty, score) => {
   if (score >= 70) {
     const badge = BADGES[difficulty];
@@ -807,7 +817,7 @@ export const Badges = () => {
 };
 
 // Export badge functions for use in other components
-export { checkAndAwardBadge, getBadges, BADGES };
+export { checkAndAwardBadge, getBadges, getUserId, BADGES };
 
 // Test function for development (remove in production)
 export const testBadgeSystem = () => {
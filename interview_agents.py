@@ -6,19 +6,45 @@ Each agent handles interview responses with different difficulty levels and prom
 """
 
 import asyncio
-from typing import Optional
+from typing import List, Optional
 from uagents import Agent, Context, Protocol, Model
 from uagents.setup import fund_agent_if_low
 from pydantic import Field
+from collections import OrderedDict, deque
 import json
+import math
+import os
+import re
+import secrets
+import threading
 import time
 
+from question_bank import QUESTION_BANK, QuestionRetriever
+
+try:
+    import google.generativeai as genai
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+
+# Follow-up generation tiers: an LLM follow-up when it arrives within the budget,
+# otherwise the best unasked question-bank match, then the keyword follow-up.
+# Late LLM results still warm the cache.
+FOLLOWUP_LLM_ENABLED = os.getenv('FOLLOWUP_LLM', 'true').lower() in ('1', 'true', 'yes')
+FOLLOWUP_LLM_MODEL = os.getenv('FOLLOWUP_LLM_MODEL', 'gemini-1.5-flash')
+FOLLOWUP_LLM_BUDGET_MS = float(os.getenv('FOLLOWUP_LLM_BUDGET_MS', '400'))
+FOLLOWUP_LLM_TIMEOUT = float(os.getenv('FOLLOWUP_LLM_TIMEOUT', '10'))  # seconds before a late LLM call is dropped
+FOLLOWUP_LLM_CACHE_SIZE = int(os.getenv('FOLLOWUP_LLM_CACHE_SIZE', '512'))
+FOLLOWUP_STATS_INTERVAL = float(os.getenv('FOLLOWUP_STATS_INTERVAL', '60'))  # seconds between stats logs
+FOLLOWUP_BANK_ENABLED = os.getenv('FOLLOWUP_BANK', 'true').lower() in ('1', 'true', 'yes')
+
 # Message models using Pydantic
 class InterviewAnswer(Model):
     """Model for user's interview answer"""
     answer: str  # required
     question_context: Optional[str] = None
     user_id: Optional[str] = None
+    job_topics: Optional[List[str]] = None  # 'skill:<name>' / 'responsibility:<text>' from the job analysis
 
 class FollowUpQuestion(Model):
     """Model for agent's follow-up question"""
@@ -26,6 +52,9 @@ class FollowUpQuestion(Model):
     difficulty: str  # required
     reasoning: Optional[str] = None
     expected_focus: Optional[str] = None
+    tier: Optional[str] = None  # 'llm', 'cache', 'bank' or 'keyword'
+    latency_ms: Optional[float] = None
+    fallback_reason: Optional[str] = None  # why a local tier answered when the LLM tier was tried
 
 class InterviewMode(Model):
     """Model for interview mode selection"""
@@ -101,10 +130,17 @@ MODE_CONFIGS = {
         ],
         'tone': 'direct and challenging',
         'time_limit': 10,  # seconds (but system prompt says 5 for psychological pressure)
+        'start_limit': 5,  # seconds to begin answering, measured from call events and scored
         'scoring_focus': 'quick thinking and leadership scenarios'
     }
 }
 
+# Local retrieval over the follow-up bank plus each mode's opening questions
+question_retriever = QuestionRetriever({
+    mode: QUESTION_BANK[mode] + [(question, '', config['scoring_focus']) for question in config['question_types']]
+    for mode, config in MODE_CONFIGS.items()
+})
+
 # Create the interview protocol
 interview_protocol = Protocol()
 
@@ -127,18 +163,202 @@ async def handle_interview_answer(ctx: Context, sender: str, msg: InterviewAnswe
     config = MODE_CONFIGS[mode]
     
     # Analyze the answer and generate follow-up
-    follow_up = await generate_follow_up_question(msg.answer, mode, config)
+    follow_up = await generate_follow_up_question(msg.answer, mode, config, msg.question_context,
+                                                  user_id=msg.user_id, job_topics=msg.job_topics)
     
     # Send the follow-up question
     await ctx.send(sender, FollowUpQuestion(
         question=follow_up['question'],
         difficulty=mode,
         reasoning=follow_up['reasoning'],
-        expected_focus=follow_up['expected_focus']
+        expected_focus=follow_up['expected_focus'],
+        tier=follow_up.get('tier'),
+        latency_ms=follow_up.get('latency_ms'),
+        fallback_reason=follow_up.get('fallback_reason')
     ))
 
-async def generate_follow_up_question(answer: str, mode: str, config: dict) -> dict:
-    """Generate an appropriate follow-up question based on the mode and answer"""
+@interview_protocol.on_interval(period=FOLLOWUP_STATS_INTERVAL)
+async def log_follow_up_stats(ctx: Context):
+    """Periodically log per-tier latency and the fallback rate"""
+    stats = follow_up_stats.snapshot()
+    if stats['total']:
+        ctx.logger.info(f"Follow-up tiers: {json.dumps(stats)}")
+
+class FollowUpTierStats:
+    """Latency per generation tier and how often the keyword fallback was used"""
+
+    def __init__(self, window=1000):
+        self._latencies = {}
+        self._counts = {}
+        self._fallbacks = {}
+        self._late_results = 0
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, tier, latency_ms, fallback_reason=None):
+        with self._lock:
+            self._counts[tier] = self._counts.get(tier, 0) + 1
+            self._latencies.setdefault(tier, deque(maxlen=self._window)).append(latency_ms)
+            if fallback_reason:
+                self._fallbacks[fallback_reason] = self._fallbacks.get(fallback_reason, 0) + 1
+
+    def total(self):
+        with self._lock:
+            return sum(self._counts.values())
+
+    def record_late_result(self):
+        with self._lock:
+            self._late_results += 1
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+    def snapshot(self):
+        with self._lock:
+            total = sum(self._counts.values())
+            tiers = {}
+            for tier, samples in self._latencies.items():
+                ordered = sorted(samples)
+                tiers[tier] = {
+                    'count': self._counts[tier],
+                    'p50Ms': round(self._percentile(ordered, 0.5), 1),
+                    'p95Ms': round(self._percentile(ordered, 0.95), 1),
+                    'maxMs': round(ordered[-1], 1),
+                }
+            fallbacks = sum(self._fallbacks.values())
+            # Only requests where the LLM tier was tried count towards the fallback rate
+            attempted = fallbacks + self._counts.get('llm', 0) + self._counts.get('cache', 0)
+            return {
+                'total': total,
+                'tiers': tiers,
+                'fallbacks': dict(self._fallbacks),
+                'fallbackRate': round(fallbacks / attempted, 3) if attempted else 0.0,
+                'lateLlmResultsCached': self._late_results,
+            }
+
+follow_up_stats = FollowUpTierStats()
+
+def get_follow_up_stats():
+    """Per-tier latency and fallback rate of follow-up generation in this process"""
+    return follow_up_stats.snapshot()
+
+_llm_cache = OrderedDict()
+_llm_cache_lock = threading.Lock()
+_llm_inflight = {}
+_llm_model = None
+
+def _llm_cache_key(mode, answer, question_context):
+    normalize = lambda text: ' '.join(re.findall(r'[a-z0-9]+', (text or '').lower()))
+    return f"{mode}|{normalize(question_context)}|{normalize(answer)}"
+
+def _llm_cache_get(key):
+    with _llm_cache_lock:
+        value = _llm_cache.get(key)
+        if value is not None:
+            _llm_cache.move_to_end(key)
+        return value
+
+def _llm_cache_put(key, value):
+    with _llm_cache_lock:
+        _llm_cache[key] = value
+        _llm_cache.move_to_end(key)
+        while len(_llm_cache) > FOLLOWUP_LLM_CACHE_SIZE:
+            _llm_cache.popitem(last=False)
+
+def _get_llm_model():
+    """Lazily configure the follow-up model; None when the LLM tier is unavailable"""
+    global _llm_model
+    if _llm_model is None and FOLLOWUP_LLM_ENABLED and GENAI_AVAILABLE and os.getenv('GOOGLE_API_KEY'):
+        genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+        _llm_model = genai.GenerativeModel(FOLLOWUP_LLM_MODEL)
+    return _llm_model
+
+def llm_follow_up(answer: str, mode: str, config: dict, question_context: Optional[str] = None) -> dict:
+    """Ask the LLM for one follow-up question (blocking); raises on an unusable response"""
+    prompt = f"""You are a mock interviewer in {mode.upper()} mode; your tone is {config['tone']} and you focus on {config['scoring_focus']}.
+Question asked: {question_context or 'Not provided'}
+Candidate's answer: {answer}
+
+Write ONE short follow-up question that digs into something specific the candidate said.
+Return ONLY a JSON object: {{"question": "...", "reasoning": "...", "expected_focus": "..."}}"""
+    response = _get_llm_model().generate_content(prompt, request_options={'timeout': FOLLOWUP_LLM_TIMEOUT})
+    text = response.text.strip().replace("```json", "").replace("```", "")
+    result = json.loads(text)
+    if not result.get('question'):
+        raise ValueError("LLM follow-up has no question")
+    return {
+        'question': result['question'],
+        'reasoning': result.get('reasoning') or 'Follow-up on specifics of the answer',
+        'expected_focus': result.get('expected_focus') or config['scoring_focus'],
+    }
+
+async def generate_follow_up_question(answer: str, mode: str, config: dict,
+                                      question_context: Optional[str] = None, budget_ms: float = None,
+                                      user_id: Optional[str] = None, job_topics: Optional[List[str]] = None) -> dict:
+    """
+    Generate a follow-up question within a latency budget.
+    Tiers: a cached LLM follow-up, a fresh LLM follow-up if it arrives within budget_ms,
+    otherwise the best question-bank match user_id has not been asked, then the keyword
+    follow-up. An LLM call that misses the budget keeps running and caches its result
+    for the next identical answer.
+    """
+    start = time.perf_counter()
+    elapsed_ms = lambda: round((time.perf_counter() - start) * 1000, 1)
+    budget_ms = FOLLOWUP_LLM_BUDGET_MS if budget_ms is None else budget_ms
+
+    if _get_llm_model() is None:
+        return local_follow_up(answer, mode, question_context, user_id, job_topics, elapsed_ms)
+
+    key = _llm_cache_key(mode, answer, question_context)
+    cached = _llm_cache_get(key)
+    if cached is not None:
+        result = dict(cached, tier='cache', latency_ms=elapsed_ms())
+        follow_up_stats.record('cache', result['latency_ms'])
+        return result
+
+    loop = asyncio.get_running_loop()
+    future = _llm_inflight.get(key)
+    if future is None:
+        future = loop.run_in_executor(None, llm_follow_up, answer, mode, config, question_context)
+        _llm_inflight[key] = future
+
+        def on_done(done, llm_start=start):
+            _llm_inflight.pop(key, None)
+            if done.cancelled() or done.exception() is not None:
+                return
+            _llm_cache_put(key, done.result())
+            if (time.perf_counter() - llm_start) * 1000 > budget_ms:
+                follow_up_stats.record_late_result()
+
+        future.add_done_callback(on_done)
+
+    try:
+        llm_result = await asyncio.wait_for(asyncio.shield(future), timeout=budget_ms / 1000)
+        result = dict(llm_result, tier='llm', latency_ms=elapsed_ms())
+        follow_up_stats.record('llm', result['latency_ms'])
+        return result
+    except asyncio.TimeoutError:
+        reason = 'llm_timeout'
+    except Exception as e:
+        print(f"LLM follow-up failed: {e}")
+        reason = 'llm_error'
+
+    return local_follow_up(answer, mode, question_context, user_id, job_topics, elapsed_ms, fallback_reason=reason)
+
+def local_follow_up(answer, mode, question_context, user_id, job_topics, elapsed_ms, fallback_reason=None):
+    """Question-bank retrieval, or the keyword follow-up when no bank question fits"""
+    follow_up = None
+    if FOLLOWUP_BANK_ENABLED:
+        follow_up = question_retriever.retrieve(answer, mode, user_id, question_context, job_topics)
+    tier = 'bank' if follow_up else 'keyword'
+    result = dict(follow_up or keyword_follow_up(answer, mode), tier=tier, latency_ms=elapsed_ms(),
+                  fallback_reason=fallback_reason)
+    follow_up_stats.record(tier, result['latency_ms'], fallback_reason=fallback_reason)
+    return result
+
+def keyword_follow_up(answer: str, mode: str) -> dict:
+    """Rule-based follow-up question chosen from keywords in the answer"""
     
     # Simple logic for follow-up questions based on mode
     if mode == 'easy':
@@ -201,30 +421,85 @@ async def generate_follow_up_question(answer: str, mode: str, config: dict) -> d
                 'expected_focus': 'complex problem-solving and resilience'
             }
 
-# Create the three agents
-def create_interview_agents():
-    """Create and return the three interview agents"""
-    
-    agents = {}
-    
-    for mode, config in MODE_CONFIGS.items():
-        # Create agent with unique seed
-        agent = Agent(
-            name=config['name'],
-            port=8000 + list(MODE_CONFIGS.keys()).index(mode),  # Different ports for each agent
-            seed=f"interview_{mode}_seed_{int(time.time())}",
-            endpoint=["http://127.0.0.1:8000/submit"]
-        )
-        
-        # Add the protocol
-        agent.include(interview_protocol)
-        
-        # Store agent reference
-        agents[mode] = agent
-        
-        print(f"Created {config['name']} for {mode} mode")
+# Agent topology: replica 0 keeps the original ports (easy 8000, medium 8001, hard 8002);
+# further replicas of every mode are laid out in blocks after them.
+AGENT_HOST = os.getenv('AGENT_HOST', '127.0.0.1')
+AGENT_BASE_PORT = int(os.getenv('AGENT_BASE_PORT', '8000'))
+AGENT_REPLICAS = max(1, int(os.getenv('AGENT_REPLICAS', '1')))
+AGENT_SEED = os.getenv('AGENT_SEED')  # derives the agent keys; generated into AGENT_SEED_FILE when not set
+AGENT_SEED_FILE = os.getenv('AGENT_SEED_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.agent_seed'))
+AGENT_HEARTBEAT_INTERVAL = float(os.getenv('AGENT_HEARTBEAT_INTERVAL', '1'))  # seconds, under agent_supervisor.py
+
+def agent_port(mode: str, replica: int = 0) -> int:
+    """Return the port assigned to a given replica of a mode's agent"""
+    modes = list(MODE_CONFIGS.keys())
+    return AGENT_BASE_PORT + replica * len(modes) + modes.index(mode)
+
+def agent_endpoint(mode: str, replica: int = 0, host: str = None) -> str:
+    """Return the submit endpoint for a given replica of a mode's agent"""
+    return f"http://{host or AGENT_HOST}:{agent_port(mode, replica)}/submit"
+
+def load_agent_seed(path: str = AGENT_SEED_FILE) -> str:
+    """
+    AGENT_SEED, or the private seed stored in path. On first use a random seed is
+    generated and saved there (owner-only), so keys are never derived from a public value.
+    """
+    global AGENT_SEED
+    if AGENT_SEED:
+        return AGENT_SEED
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path) as f:
+            seed = f.read().strip()
+        if not seed:
+            raise RuntimeError(f"Agent seed file {path} is empty; delete it or set AGENT_SEED")
+    else:
+        seed = secrets.token_hex(32)
+        with os.fdopen(fd, 'w') as f:
+            f.write(seed + '\n')
+        print(f"Generated a private agent seed in {path}")
+    AGENT_SEED = seed
+    return seed
+
+def agent_seed(mode: str, replica: int = 0) -> str:
+    """Deterministic seed, so an agent keeps its address across restarts"""
+    return f"{load_agent_seed()}_{mode}_{replica}_seed"
+
+def create_agent(mode: str, replica: int = 0):
+    """Create one replica of a mode's agent with its fixed port and seed"""
+    config = MODE_CONFIGS[mode]
+    name = config['name'] if replica == 0 else f"{config['name']}-{replica}"
+    agent = Agent(
+        name=name,
+        port=agent_port(mode, replica),  # Different ports for each agent
+        seed=agent_seed(mode, replica),
+        endpoint=[agent_endpoint(mode, replica)]
+    )
+    agent.include(interview_protocol)
+    print(f"Created {name} for {mode} mode on port {agent_port(mode, replica)}")
+    return agent
+
+# Create the interview agents
+def create_interview_agents(replicas: int = None):
+    """Create and return the interview agents, keyed by mode, as lists of replicas"""
     
-    return agents
+    if replicas is None:
+        replicas = AGENT_REPLICAS
+    return {mode: [create_agent(mode, replica) for replica in range(replicas)] for mode in MODE_CONFIGS}
+
+def run_agent_process(mode: str, replica: int = 0, shared=None):
+    """
+    Run a single agent in this process (used by agent_supervisor.py).
+    shared is a [heartbeat time, messages handled] array the supervisor reads for liveness and throughput.
+    """
+    agent = create_agent(mode, replica)
+    if shared is not None:
+        @agent.on_interval(period=AGENT_HEARTBEAT_INTERVAL)
+        async def heartbeat(ctx: Context):
+            shared[0] = time.time()
+            shared[1] = follow_up_stats.total()
+    agent.run()
 
 # Main function to run the agents
 async def main():
@@ -237,11 +512,12 @@ async def main():
     print("Agents will listen for interview answers and respond with follow-up questions")
     print("Available modes: easy, medium, hard")
     print("\nAgent addresses:")
-    for mode, agent in agents.items():
-        print(f"  {mode}: {agent.address}")
+    for mode, replicas in agents.items():
+        for agent in replicas:
+            print(f"  {mode}: {agent.address}")
     
     # Start all agents in the same event loop
-    await asyncio.gather(*[agent.run_async() for agent in agents.values()])
+    await asyncio.gather(*[agent.run_async() for replicas in agents.values() for agent in replicas])
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Concurrent-interview load test for the Flask backend.
+Simulates N interview sessions end to end (assistant creation, optional job
+analysis, periodic frames, follow-ups and a review) against stubbed Gemini,
+VAPI and agent upstreams with configurable latency, and writes a
+machine-readable report with throughput, per-endpoint latency percentiles
+and error rates.
+
+Usage:
+    python3 load_test.py --sessions 20 --turns 5 --gemini-latency 0.8 --output load_report.json
+    python3 load_test.py --target http://localhost:5001   # real server, real upstreams
+"""
+
+import argparse
+import base64
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import requests
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+SAMPLE_ANSWERS = [
+    "I have 3 years of experience in software development, working mainly with Python and JavaScript.",
+    "I faced a challenge when our main database went down during peak hours and led the recovery.",
+    "As a team lead, I had to make the unpopular decision to delay a launch to fix quality issues.",
+    "I resolved a conflict between two senior developers by getting them to agree on shared metrics.",
+]
+
+SAMPLE_JOB_DESCRIPTION = """Senior Software Engineer at Acme Analytics
+We are looking for a senior engineer to build data pipelines and APIs.
+Responsibilities:
+- Design and operate Python services on AWS
+- Mentor junior engineers and lead code reviews
+Requirements:
+- 5+ years of experience with Python, SQL and distributed systems
+- Strong communication skills
+"""
+
+STUB_FRAME_ANALYSIS = ("You look engaged and friendly, and your posture is upright. "
+                       "Try to keep your focus on the screen area as if you're making eye contact.")
+STUB_JOB_ANALYSIS = {
+    "role": "Senior Software Engineer",
+    "company": "Acme Analytics",
+    "keyResponsibilities": "Build data pipelines and APIs.",
+    "requiredSkills": "Python, SQL, distributed systems.",
+    "experienceLevel": "Senior",
+    "industry": "Technology",
+    "interviewFocus": "System design and leadership.",
+}
+STUB_REVIEW = {
+    "whatYouDidWell": ["Clear structure."],
+    "areasForImprovement": ["Quantify results."],
+    "overallScore": 82,
+    "scoreExplanation": "Strong answers with minor gaps.",
+    "scoringBreakdown": {"baseScore": 100, "bonuses": [], "deductions": ["-18 points for vague results"], "finalScore": 82},
+    "summary": "A solid interview.",
+}
+
+
+class Latency:
+    """Sleeps for a base latency plus uniform jitter"""
+
+    def __init__(self, seconds, jitter):
+        self.seconds = seconds
+        self.jitter = jitter
+
+    def wait(self):
+        delay = self.seconds + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class StubGeminiModel:
+    """Stands in for genai.GenerativeModel with canned responses"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, contents, **kwargs):
+        self.latency.wait()
+        if isinstance(contents, list):
+            return SimpleNamespace(text=STUB_FRAME_ANALYSIS)
+        if 'job description' in contents:
+            return SimpleNamespace(text=json.dumps(STUB_JOB_ANALYSIS))
+        return SimpleNamespace(text=json.dumps(STUB_REVIEW))
+
+
+class StubVapi:
+    """Stands in for the VAPI client; only assistants.create is used"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.assistants = self
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        self.latency.wait()
+        with self._lock:
+            self._counter += 1
+            return SimpleNamespace(id=f"stub-assistant-{self._counter}")
+
+
+def make_stub_followup(latency):
+    def get_followup(mode, answer, question_context=None, user_id=None, timeout=10, bypass_cache=False,
+                     job_topics=None):
+        latency.wait()
+        return SimpleNamespace(
+            question="What was the outcome, and what would you do differently next time?",
+            difficulty=mode,
+            reasoning='Stubbed follow-up',
+            expected_focus='outcomes',
+            tier='keyword',
+            latency_ms=0.0,
+            fallback_reason=None,
+        )
+    return get_followup
+
+
+def start_stubbed_backend(args):
+    """Start the real Flask app in-process with stubbed upstreams; returns (base_url, server)"""
+    # Keep load-test state out of the backend's real databases
+    state_dir = tempfile.mkdtemp(prefix='acey-load-')
+    for name, filename in [('REVIEW_DB_PATH', 'reviews.db'), ('HISTORY_DB_PATH', 'history.db'),
+                           ('SESSION_DB_PATH', 'sessions.db')]:
+        os.environ.setdefault(name, os.path.join(state_dir, filename))
+    os.environ.setdefault('AGENT_HEALTH_INTERVAL', '0')
+
+    sys.path.insert(0, BACKEND_DIR)
+    import app as backend
+    from werkzeug.serving import make_server
+
+    backend.model = StubGeminiModel(Latency(args.gemini_latency, args.jitter))
+    backend.vapi = StubVapi(Latency(args.vapi_latency, args.jitter))
+    backend.get_followup_from_agent = make_stub_followup(Latency(args.agent_latency, args.jitter))
+    backend.AGENT_AVAILABLE = True
+
+    server = make_server('127.0.0.1', args.port, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def make_test_frame(width=640, height=480):
+    """A JPEG data URL with a lit, textured scene and a face-coloured region, so it passes the quality gate"""
+    from PIL import Image, ImageDraw
+    rng = random.Random(42)
+    image = Image.new('RGB', (width, height), (110, 120, 130))
+    draw = ImageDraw.Draw(image)
+    for _ in range(400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        shade = rng.randrange(60, 200)
+        draw.rectangle((x, y, x + 6, y + 6), fill=(shade, shade, shade))
+    draw.ellipse((width * 0.38, height * 0.2, width * 0.62, height * 0.7), fill=(224, 172, 140))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+class Recorder:
+    """Collects per-endpoint latencies and errors from all sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, http, method, base_url, path, endpoint, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = http.request(method, base_url + path, timeout=60, **kwargs)
+            ok = response.status_code < 400
+        except requests.exceptions.RequestException:
+            response, ok = None, False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.latencies[endpoint].append(elapsed_ms)
+            if not ok:
+                self.errors[endpoint] += 1
+        return response if ok else None
+
+
+def run_session(index, base_url, args, frame, recorder):
+    """One simulated interview; returns True if every step succeeded"""
+    http = requests.Session()
+    session_id = f"load-{int(time.time())}-{index}"
+    mode = ['easy', 'medium', 'hard'][index % 3]
+    ok = True
+
+    if args.job_analysis:
+        ok &= recorder.call(http, 'POST', base_url, '/api/analyze-job-description', 'analyze-job-description',
+                            json={'jobDescription': SAMPLE_JOB_DESCRIPTION, 'userId': session_id}) is not None
+
+    response = recorder.call(http, 'GET', base_url, f'/api/vapi-assistant?mode={mode}&sessionId={session_id}&userId={session_id}',
+                             'vapi-assistant')
+    if response is None:
+        return False
+
+    next_frame_at = time.time()
+    for turn in range(args.turns):
+        if time.time() >= next_frame_at:
+            ok &= recorder.call(http, 'POST', base_url, '/api/analyze-frame', 'analyze-frame',
+                                json={'frame': frame, 'sessionId': session_id}) is not None
+            next_frame_at = time.time() + args.frame_interval
+        ok &= recorder.call(http, 'POST', base_url, '/api/agent-followup', 'agent-followup', json={
+            'mode': mode,
+            'answer': SAMPLE_ANSWERS[(index + turn) % len(SAMPLE_ANSWERS)],
+            'question_context': f"Question {turn + 1}",
+            'user_id': session_id,
+            'bypass_cache': True,
+        }) is not None
+        time.sleep(args.turn_interval)
+
+    transcript = '\n'.join(f"User: {SAMPLE_ANSWERS[t % len(SAMPLE_ANSWERS)]}" for t in range(args.turns))
+    response = recorder.call(http, 'POST', base_url, '/api/get-review', 'get-review',
+                             json={'transcript': transcript, 'mode': mode, 'sessionId': session_id})
+    if response is None:
+        return False
+
+    # Reviews run as background jobs; poll until finished
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        response = recorder.call(http, 'GET', base_url, f'/api/review-jobs/{session_id}', 'review-jobs')
+        if response is None:
+            return False
+        status = response.json().get('status')
+        if status == 'done':
+            return ok
+        if status == 'failed':
+            return False
+        time.sleep(args.poll_interval)
+    return False
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def build_report(args, recorder, results, wall_seconds):
+    endpoints = {}
+    total_requests = 0
+    total_errors = 0
+    for endpoint, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        errors = recorder.errors.get(endpoint, 0)
+        total_requests += len(values)
+        total_errors += errors
+        endpoints[endpoint] = {
+            'requests': len(values),
+            'errors': errors,
+            'errorRate': round(errors / len(values), 4),
+            'p50Ms': round(percentile(values, 50), 2),
+            'p95Ms': round(percentile(values, 95), 2),
+            'p99Ms': round(percentile(values, 99), 2),
+            'meanMs': round(sum(values) / len(values), 2),
+            'maxMs': round(values[-1], 2),
+        }
+    completed = sum(1 for result in results if result)
+    return {
+        'config': {
+            'target': args.target or 'in-process (stubbed upstreams)',
+            'sessions': args.sessions,
+            'turns': args.turns,
+            'frameIntervalSeconds': args.frame_interval,
+            'turnIntervalSeconds': args.turn_interval,
+            'jobAnalysis': args.job_analysis,
+            'geminiLatencySeconds': args.gemini_latency,
+            'vapiLatencySeconds': args.vapi_latency,
+            'agentLatencySeconds': args.agent_latency,
+            'jitterSeconds': args.jitter,
+        },
+        'wallSeconds': round(wall_seconds, 3),
+        'sessions': {
+            'completed': completed,
+            'failed': len(results) - completed,
+            'perSecond': round(completed / wall_seconds, 3) if wall_seconds else None,
+        },
+        'requests': {
+            'total': total_requests,
+            'errors': total_errors,
+            'errorRate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+            'perSecond': round(total_requests / wall_seconds, 3) if wall_seconds else None,
+        },
+        'endpoints': endpoints,
+    }
+
+
+def run_load_test(args):
+    """Run the configured load test and return the report dict"""
+    server = None
+    if args.target:
+        base_url = args.target.rstrip('/')
+    else:
+        base_url, server = start_stubbed_backend(args)
+
+    frame = make_test_frame()
+    recorder = Recorder()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = []
+            for index in range(args.sessions):
+                futures.append(pool.submit(run_session, index, base_url, args, frame, recorder))
+                time.sleep(args.ramp_up / max(1, args.sessions))
+            results = [future.result() for future in futures]
+    finally:
+        if server is not None:
+            server.shutdown()
+    return build_report(args, recorder, results, time.perf_counter() - start)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=10, help='concurrent interview sessions')
+    parser.add_argument('--turns', type=int, default=5, help='follow-up questions per session')
+    parser.add_argument('--frame-interval', type=float, default=2.0, help='seconds between frames (K)')
+    parser.add_argument('--turn-interval', type=float, default=0.5, help='seconds between answers')
+    parser.add_argument('--ramp-up', type=float, default=1.0, help='seconds over which sessions start')
+    parser.add_argument('--poll-interval', type=float, default=0.25, help='seconds between review polls')
+    parser.add_argument('--job-analysis', action='store_true', help='analyze a job description per session')
+    parser.add_argument('--gemini-latency', type=float, default=0.5, help='stubbed Gemini latency (s)')
+    parser.add_argument('--vapi-latency', type=float, default=0.3, help='stubbed VAPI latency (s)')
+    parser.add_argument('--agent-latency', type=float, default=0.1, help='stubbed agent latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='uniform extra latency (s)')
+    parser.add_argument('--port', type=int, default=0, help='port for the in-process backend (0 = any)')
+    parser.add_argument('--target', help='base URL of a running backend; disables stubs')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"🚀 Running load test: {args.sessions} sessions x {args.turns} turns")
+    report = run_load_test(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Report written to {args.output}")
+    print(output)
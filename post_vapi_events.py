@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Post recorded VAPI server events to the webhook and print the measured timing.
+Each line of a fixture file is one webhook body ({"message": {...}}), in the
+order VAPI sent them. By default the events go to the real Flask app
+in-process (with scratch databases); --target posts them to a running server.
+
+Usage:
+    python3 post_vapi_events.py fixtures/vapi_events_hard_call.jsonl --mode hard
+    python3 post_vapi_events.py fixtures/vapi_events_hard_call.jsonl --target http://localhost:5001 --session-id demo-1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import secrets
+import sys
+import tempfile
+
+import requests
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+
+def load_events(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class LocalClient:
+    """The backend's Flask test client behind the same get/post calls as requests"""
+
+    def __init__(self):
+        state_dir = tempfile.mkdtemp(prefix='acey-vapi-events-')
+        for name, filename in [('REVIEW_DB_PATH', 'reviews.db'), ('HISTORY_DB_PATH', 'history.db'),
+                               ('SESSION_DB_PATH', 'sessions.db')]:
+            os.environ.setdefault(name, os.path.join(state_dir, filename))
+        os.environ.setdefault('AGENT_HEALTH_INTERVAL', '0')
+        sys.path.insert(0, BACKEND_DIR)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as backend
+        self.client = backend.app.test_client()
+
+    def post(self, path, body, headers):
+        response = self.client.post(path, json=body, headers=headers)
+        return response.status_code, response.get_json()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get_json()
+
+
+class RemoteClient:
+    def __init__(self, target):
+        self.target = target.rstrip('/')
+
+    def post(self, path, body, headers):
+        response = requests.post(self.target + path, json=body, headers=headers, timeout=10)
+        return response.status_code, response.json()
+
+    def get(self, path):
+        response = requests.get(self.target + path, timeout=10)
+        return response.status_code, response.json()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', nargs='+', help='JSONL files of recorded webhook bodies')
+    parser.add_argument('--target', help='base URL of a running backend (default: in-process)')
+    parser.add_argument('--session-id', help='post with ?sessionId= instead of keying on the call assistantId')
+    parser.add_argument('--secret', default=os.getenv('VAPI_WEBHOOK_SECRET'), help='webhook secret header value')
+    parser.add_argument('--mode', help='interview mode used to judge the timing rules')
+    args = parser.parse_args(argv)
+
+    if not args.target and not args.secret:
+        # The webhook only accepts signed events; sign the in-process run with a throwaway secret
+        args.secret = os.environ['VAPI_WEBHOOK_SECRET'] = secrets.token_hex(16)
+    client = RemoteClient(args.target) if args.target else LocalClient()
+    headers = {'X-Vapi-Secret': args.secret} if args.secret else {}
+    path = '/api/vapi/events' + (f"?sessionId={args.session_id}" if args.session_id else '')
+
+    session_ids = []
+    failures = 0
+    for fixture in args.fixtures:
+        for body in load_events(fixture):
+            status, result = client.post(path, body, headers)
+            if status != 200:
+                failures += 1
+                print(f"{fixture}: {body['message'].get('type')} -> {status} {result}")
+            call = body['message'].get('call') or {}
+            session_id = args.session_id or call.get('assistantId') or call.get('id')
+            if session_id and session_id not in session_ids:
+                session_ids.append(session_id)
+
+    _, stats = client.get('/api/vapi/events')
+    print(f"Events: {json.dumps(stats)}")
+    for session_id in session_ids:
+        mode_query = f"?mode={args.mode}" if args.mode else ''
+        _, timing = client.get(f"/api/vapi/sessions/{session_id}/timing{mode_query}")
+        print(json.dumps(timing, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Local follow-up question bank with TF-IDF retrieval.
+Each mode has a bank of follow-up questions, optionally extended with
+questions generated from the current job's skills and responsibilities.
+A sparse TF-IDF index is built once per bank; retrieval scores only the
+questions sharing a term with the candidate's answer and returns the best
+one the user has not been asked yet. No upstream calls are made.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+BANK_MIN_SCORE = float(os.getenv('FOLLOWUP_BANK_MIN_SCORE', '0.08'))
+BANK_MAX_USERS = int(os.getenv('FOLLOWUP_BANK_MAX_USERS', '5000'))  # users whose asked questions are remembered
+BANK_MAX_JOB_INDEXES = 32  # job-specific indexes kept (one per distinct job)
+MAX_JOB_TOPICS = 12
+
+# (question, keywords the answer may use, expected focus)
+QUESTION_BANK = {
+    'easy': [
+        ("What did a typical day look like in that role?", "job role day work routine tasks responsibilities", "day-to-day responsibilities"),
+        ("Which part of that work did you enjoy the most, and why?", "enjoy like favorite love work project", "motivation and interests"),
+        ("What skills did you develop in that role?", "experience worked skills learned develop role", "skill development and learning"),
+        ("Can you give me a specific example of when you used that strength?", "strength good at strong skill", "specific examples and STAR method"),
+        ("How did your team or manager describe your contribution?", "team manager feedback colleagues contribution", "self-awareness and feedback"),
+        ("What did you learn from that experience?", "learn learned lesson experience mistake", "reflection and learning"),
+        ("What made you decide to study or pursue that field?", "study school degree university course major field", "motivation and background"),
+        ("How do you usually prepare when you start something new?", "new start prepare learn quickly first time", "learning approach"),
+        ("Who did you work with most closely on that, and how did you communicate?", "team together colleagues communicate collaborate", "collaboration and communication"),
+        ("What would you like to get better at next?", "improve better weakness grow goal", "growth mindset"),
+        ("How do you keep yourself organized when you have several things to do?", "organized busy tasks deadlines multiple priorities", "organization and time management"),
+        ("What kind of work environment helps you do your best work?", "environment culture office remote team work best", "work preferences"),
+        ("What motivates you in your work?", "motivate motivation passion drive reason", "motivation and work preferences"),
+        ("Tell me about a customer or user you helped. What did you do?", "customer client user help service support", "customer focus"),
+        ("What achievement from that time are you most proud of?", "proud achievement accomplished success award", "achievements"),
+        ("How did you handle it when something did not go as planned?", "problem mistake wrong plan issue difficult", "adaptability"),
+        ("What tools or technologies did you use most in that role?", "tools software technology computer programs", "practical skills"),
+        ("Where do you see this kind of work taking you in a few years?", "future career goal years plan", "career goals"),
+    ],
+    'medium': [
+        ("How did you approach solving that challenge? Walk me through your process.", "challenge problem solve approach issue difficult", "analytical thinking and process"),
+        ("What was the outcome, and what would you do differently next time?", "team colleague outcome result project", "outcomes and continuous improvement"),
+        ("Can you provide more specific details about the situation and your actions?", "situation actions details task", "detailed STAR responses"),
+        ("How did you measure whether your solution worked?", "measure metrics results data success impact numbers", "measurable results"),
+        ("What was your specific role, as opposed to the team's?", "team we group together role responsibility", "individual contribution"),
+        ("How did you get the other person to see your point of view?", "disagree colleague conflict convince persuade opinion", "influence and communication"),
+        ("What trade-offs did you consider before deciding?", "decision decide options choice tradeoff alternatives", "decision-making"),
+        ("How did you prioritize when everything seemed urgent?", "priorities urgent deadline pressure time stress busy", "prioritization under pressure"),
+        ("What feedback did you receive afterwards, and what did you change?", "feedback review manager criticism improve", "receptiveness to feedback"),
+        ("How did you keep stakeholders informed along the way?", "stakeholders update communicate manager client status", "stakeholder communication"),
+        ("What resources did you use to learn it so quickly?", "learn quickly new skill technology course documentation", "learning agility"),
+        ("What risks did you see, and how did you reduce them?", "risk risks danger mitigate plan failure", "risk management"),
+        ("How did you handle the deadline slipping?", "deadline late delay schedule timeline slip", "time management"),
+        ("What would have happened if you had not stepped in?", "stepped initiative noticed proactive volunteered", "ownership and initiative"),
+        ("How did that project change the way your team works?", "project process change improve team workflow", "lasting impact"),
+        ("How did you stay calm while that was happening?", "stress pressure calm anxious overwhelmed handle", "stress management"),
+        ("Which part of that project was hardest for you personally?", "hard hardest difficult struggle project", "self-awareness"),
+        ("How did you make sure the quality was good enough before delivering?", "quality testing review check deliver mistakes", "attention to quality"),
+        ("What did you do when you realized you did not have all the information?", "information unclear ambiguous unknown requirements", "handling ambiguity"),
+        ("How did you adapt your communication for that audience?", "present presentation audience explain communicate non-technical", "communication skills"),
+    ],
+    'hard': [
+        ("What were the immediate consequences of that decision, and how did you handle any pushback?", "decision leadership decided pushback", "consequences and conflict management"),
+        ("How did you ensure the resolution was fair to all parties involved?", "conflict disagreement resolution parties", "fairness and stakeholder management"),
+        ("What was the most difficult aspect of that situation, and how did you overcome it?", "difficult situation overcome obstacle", "complex problem-solving and resilience"),
+        ("If you had to make that call again with half the time, what would you cut?", "time pressure deadline decision scope cut", "prioritization under pressure"),
+        ("How did you know your decision was right, and what data did you rely on?", "data evidence metrics decision right analysis", "evidence-based judgment"),
+        ("Who disagreed with you most strongly, and what was their best argument?", "disagree disagreed opposed argument pushback conflict", "intellectual honesty"),
+        ("What did that failure cost, and who did you have to tell?", "failed failure mistake cost lost", "accountability"),
+        ("How did you rebuild trust with the team afterwards?", "trust team relationship morale rebuild", "leadership and trust"),
+        ("What would you do if your manager overruled that decision?", "manager overruled boss authority escalate", "managing up"),
+        ("How did you balance speed against quality under that pressure?", "speed quality pressure fast rushed tradeoff", "trade-off judgment"),
+        ("What was the worst-case scenario, and how prepared were you for it?", "risk worst case incident outage crisis", "risk and crisis management"),
+        ("How did you hold the underperformer accountable without losing them?", "underperform performance accountable feedback coaching", "people management"),
+        ("What was your innovation, specifically, and why had nobody tried it before?", "innovate innovation new idea creative approach", "originality and impact"),
+        ("How did you scale that solution beyond your own team?", "scale organization teams adoption rollout", "organizational impact"),
+        ("Which assumption turned out to be wrong, and when did you notice?", "assumption wrong mistake realized noticed", "self-correction"),
+        ("How did you communicate bad news to senior leadership?", "bad news leadership executives escalate report", "executive communication"),
+        ("What would you have done if you had failed?", "fail failure backup plan contingency", "contingency planning"),
+        ("How did you decide what not to do?", "priorities focus scope roadmap strategy", "strategic focus"),
+        ("What did you sacrifice to make that work, and was it worth it?", "sacrifice cost tradeoff worth personal", "judgment under constraints"),
+        ("How did you measure the impact of your leadership on the outcome?", "leadership lead led impact outcome results", "leadership impact"),
+    ],
+}
+
+# Questions generated from the job's skills and responsibilities, per mode
+JOB_QUESTION_TEMPLATES = {
+    'easy': {
+        'skill': "How have you used {topic} in your work or studies?",
+        'responsibility': "Have you had to {topic} before? Tell me about it.",
+    },
+    'medium': {
+        'skill': "Tell me about a project where {topic} was central. What was your part?",
+        'responsibility': "Describe a time you had to {topic}. What was the result?",
+    },
+    'hard': {
+        'skill': "What is the hardest problem you have solved with {topic}, and what would you do differently?",
+        'responsibility': "Tell me about a time you had to {topic} under real pressure. What went wrong?",
+    },
+}
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+him his how i if in into is it its itself just me more most my myself no nor not now of off on once only or
+other our ours out over own same she should so some such than that the their them then there these they this
+those through to too under until up very was we were what when where which while who whom why will with would
+you your yours yourself really also like get got go went one two thing things lot lots kind sort
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+
+def _stem(token):
+    """Crude suffix stripping so "measure", "measured" and "measures" share a term"""
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    if len(token) > 4 and token.endswith('e'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lowercased, stopword-free, lightly stemmed terms"""
+    return [_stem(token) for token in _TOKEN.findall((text or '').lower()) if token not in STOPWORDS]
+
+
+class TfidfIndex:
+    """Sparse TF-IDF index with postings lists; scores only documents sharing a term with the query"""
+
+    def __init__(self, entries):
+        self.entries = list(entries)  # (question, keywords, expected_focus)
+        documents = [tokenize(f"{question} {keywords}") for question, keywords, _ in self.entries]
+        document_frequency = {}
+        for terms in documents:
+            for term in set(terms):
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        count = len(documents)
+        self.idf = {term: math.log((1 + count) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self.postings = {}
+        for doc_id, terms in enumerate(documents):
+            weights = {}
+            for term in terms:
+                weights[term] = weights.get(term, 0) + self.idf[term]
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for term, weight in weights.items():
+                self.postings.setdefault(term, []).append((doc_id, weight / norm))
+
+    def query_vector(self, text):
+        weights = {}
+        for term in tokenize(text):
+            if term in self.idf:
+                weights[term] = weights.get(term, 0) + self.idf[term]
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        return {term: weight / norm for term, weight in weights.items()}
+
+    def scores(self, query_vector):
+        """Cosine similarity of every matching document, as {doc_id: score}"""
+        scores = {}
+        for term, query_weight in query_vector.items():
+            for doc_id, weight in self.postings[term]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_weight * weight
+        return scores
+
+
+def _topic_phrase(topic):
+    """Responsibility text as a verb phrase ("Design REST APIs" -> "design REST APIs")"""
+    topic = topic.strip().rstrip('.;')
+    if len(topic) > 1 and topic[0].isupper() and topic[1].islower():
+        topic = topic[0].lower() + topic[1:]
+    return topic
+
+
+def job_questions(mode, job_topics):
+    """Bank entries generated from a job's topics; topics are 'skill:<name>' or 'responsibility:<text>'"""
+    templates = JOB_QUESTION_TEMPLATES.get(mode, JOB_QUESTION_TEMPLATES['medium'])
+    entries = []
+    for topic in job_topics[:MAX_JOB_TOPICS]:
+        kind, _, text = topic.partition(':')
+        if kind not in templates or not text.strip():
+            continue
+        phrase = _topic_phrase(text) if kind == 'responsibility' else text.strip()
+        entries.append((templates[kind].format(topic=phrase), text, f"job fit: {text.strip()}"))
+    return entries
+
+
+class QuestionRetriever:
+    """Per-mode question indexes, job-specific indexes, and the questions each user has been asked"""
+
+    def __init__(self, banks, min_score=BANK_MIN_SCORE, max_users=BANK_MAX_USERS):
+        self.indexes = {mode: TfidfIndex(entries) for mode, entries in banks.items()}
+        self.min_score = min_score
+        self.max_users = max_users
+        self._job_indexes = OrderedDict()
+        self._asked = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _job_index(self, mode, job_topics):
+        key = (mode, tuple(job_topics[:MAX_JOB_TOPICS]))
+        with self._lock:
+            index = self._job_indexes.get(key)
+            if index is not None:
+                self._job_indexes.move_to_end(key)
+                return index
+        index = TfidfIndex(job_questions(mode, job_topics))
+        with self._lock:
+            self._job_indexes[key] = index
+            while len(self._job_indexes) > BANK_MAX_JOB_INDEXES:
+                self._job_indexes.popitem(last=False)
+        return index
+
+    def asked(self, user_id):
+        with self._lock:
+            return set(self._asked.get(user_id, ()))
+
+    def mark_asked(self, user_id, question):
+        if not user_id:
+            return
+        with self._lock:
+            self._asked.setdefault(user_id, set()).add(question)
+            self._asked.move_to_end(user_id)
+            while len(self._asked) > self.max_users:
+                self._asked.popitem(last=False)
+
+    def reset(self, user_id):
+        with self._lock:
+            self._asked.pop(user_id, None)
+
+    def retrieve(self, answer, mode, user_id=None, question_context=None, job_topics=None):
+        """
+        Best unasked question related to the answer, as a follow-up dict with its score,
+        or None when nothing in the bank scores at least min_score. The returned
+        question is recorded as asked for user_id.
+        """
+        indexes = [self.indexes.get(mode) or self.indexes['medium']]
+        if job_topics:
+            indexes.append(self._job_index(mode, job_topics))
+        excluded = self.asked(user_id) if user_id else set()
+        if question_context:
+            excluded.add(question_context.strip())
+
+        best = None
+        for index in indexes:
+            for doc_id, score in index.scores(index.query_vector(answer)).items():
+                question, _, focus = index.entries[doc_id]
+                if score >= self.min_score and question not in excluded and (best is None or score > best[0]):
+                    best = (score, question, focus)
+        if best is None:
+            return None
+
+        score, question, focus = best
+        self.mark_asked(user_id, question)
+        return {
+            'question': question,
+            'reasoning': 'Best unasked bank question for the answer',
+            'expected_focus': focus,
+            'score': round(score, 3),
+        }
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded interview session against the backend.
+Drives the real Flask app (in-process, scratch databases) with the requests a
+session sent while SESSION_RECORDING was on, answering its upstream calls
+from the recording (or from the load-test stubs), at the original pace or
+accelerated. Every replayed status code is compared with the recorded one,
+so a recording is both a regression and a performance fixture.
+
+Usage:
+    python3 replay_session.py --list
+    python3 replay_session.py <sessionId>                      # original pace, recorded upstreams
+    python3 replay_session.py <sessionId> --speed 10           # 10x faster (upstream latency too)
+    python3 replay_session.py <sessionId> --speed 0 --upstreams stub --output replay_report.json
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from session_recorder import RECORDINGS_DIR, list_recordings, load_frame, read_recording  # noqa: E402
+
+
+class RecordedUpstreams:
+    """
+    Answers upstream calls in recorded order, with recorded latency scaled by the replay speed.
+    Calls are matched by their full upstream name (e.g. 'gemini:review_scoring') when the
+    backend's guarded_call names them, so concurrent calls get their own recorded responses.
+    """
+
+    def __init__(self, records, speed):
+        self.speed = speed
+        self.queues = defaultdict(deque)
+        for record in records:
+            if record['type'] == 'upstream':
+                self.queues[record['upstream']].append(record)
+        self.missing = defaultdict(int)
+        self.current = threading.local()
+        self._lock = threading.Lock()
+
+    def _pop(self, upstream):
+        name = getattr(self.current, 'name', None)
+        if name and name.split(':')[0] == upstream and self.queues[name]:
+            return self.queues[name].popleft()
+        candidates = [queue for key, queue in self.queues.items() if key.split(':')[0] == upstream and queue]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda queue: queue[0]['t']).popleft()
+
+    def take(self, upstream):
+        with self._lock:
+            record = self._pop(upstream)
+            if record is None:
+                self.missing[upstream] += 1
+        if record is None:
+            raise RuntimeError(f"Recording has no more '{upstream}' responses")
+        if self.speed:
+            time.sleep(record['durationMs'] / 1000 / self.speed)
+        if record['error']:
+            raise RuntimeError(f"Recorded upstream error: {record['error']}")
+        return record['result'] or {}
+
+    def install(self, backend):
+        upstreams = self
+
+        class Model:
+            def generate_content(self, contents, **kwargs):
+                return SimpleNamespace(text=upstreams.take('gemini')['text'])
+
+        class Assistants:
+            def create(self, **kwargs):
+                return SimpleNamespace(id=upstreams.take('vapi')['id'])
+
+        class LinkedIn:
+            def get(self, url, **kwargs):
+                result = upstreams.take('linkedin')
+                response = requests.Response()
+                response.status_code = result['statusCode']
+                response._content = result['text'].encode()
+                response.url = result.get('url', url)
+                return response
+
+            def head(self, url, **kwargs):
+                return None
+
+        def get_followup(mode, answer, question_context=None, user_id=None, timeout=10, bypass_cache=False,
+                         job_topics=None):
+            fields = upstreams.take('agent')['fields']
+            return SimpleNamespace(**{'tier': None, 'latency_ms': None, 'fallback_reason': None, **fields})
+
+        original_guarded_call = backend.guarded_call
+
+        def guarded_call(upstream, fn, *args, **kwargs):
+            def named_call(*call_args, **call_kwargs):
+                upstreams.current.name = upstream
+                return fn(*call_args, **call_kwargs)
+            return original_guarded_call(upstream, named_call, *args, **kwargs)
+
+        backend.guarded_call = guarded_call
+        backend.model = Model()
+        backend.vapi = SimpleNamespace(assistants=Assistants())
+        backend.linkedin_http = LinkedIn()
+        backend.get_followup_from_agent = get_followup
+        backend.AGENT_AVAILABLE = True
+
+
+def install_stub_upstreams(backend, speed):
+    """Canned upstreams from the load test, with a fixed latency scaled by the replay speed"""
+    from load_test import Latency, StubGeminiModel, StubVapi, make_stub_followup
+    latency = Latency(0.5 / speed if speed else 0, 0)
+    backend.model = StubGeminiModel(latency)
+    backend.vapi = StubVapi(latency)
+    backend.get_followup_from_agent = make_stub_followup(latency)
+    backend.AGENT_AVAILABLE = True
+
+
+REPLAY_WEBHOOK_SECRET = secrets.token_hex(16)
+
+
+def start_backend():
+    """Import the backend with scratch state and serve it on a free local port"""
+    state_dir = tempfile.mkdtemp(prefix='acey-replay-')
+    for name, filename in [('REVIEW_DB_PATH', 'reviews.db'), ('HISTORY_DB_PATH', 'history.db'),
+                           ('SESSION_DB_PATH', 'sessions.db')]:
+        os.environ[name] = os.path.join(state_dir, filename)
+    os.environ['AGENT_HEALTH_INTERVAL'] = '0'
+    os.environ['SESSION_RECORDING'] = 'false'  # never record the replay itself
+    # Recorded secret headers are redacted; sign replayed webhook events with a throwaway secret
+    os.environ['VAPI_WEBHOOK_SECRET'] = REPLAY_WEBHOOK_SECRET
+    import app as backend
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return backend, f"http://127.0.0.1:{server.server_port}", server
+
+
+def replay_request(base_url, record, recordings_dir):
+    body = record.get('json')
+    if isinstance(body, dict) and isinstance(body.get('frame'), dict):
+        body = {**body, 'frame': load_frame(body['frame'], recordings_dir)}
+    headers = record.get('headers')
+    if record['path'] == '/api/vapi/events':
+        headers = {**(headers or {}), 'X-Vapi-Secret': REPLAY_WEBHOOK_SECRET}
+    start = time.perf_counter()
+    try:
+        response = requests.request(record['method'], base_url + record['path'], params=record.get('args'),
+                                    json=body if record['method'] != 'GET' else None,
+                                    headers=headers, timeout=120)
+        status = response.status_code
+    except requests.exceptions.RequestException as e:
+        status = f"error: {e}"
+    return {
+        'path': record['path'],
+        'recordedStatus': record['status'],
+        'status': status,
+        'recordedMs': record['durationMs'],
+        'replayMs': round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def wait_for_review_jobs(backend, requests_to_replay, timeout=120):
+    """Let review jobs the replay queued finish, so their upstream calls are part of the run"""
+    session_ids = {(r.get('json') or {}).get('sessionId') for r in requests_to_replay
+                   if r['path'] == '/api/get-review' and r['status'] == 202}
+    deadline = time.time() + timeout
+    statuses = {}
+    for session_id in sorted(filter(None, session_ids)):
+        job = backend.review_jobs.get(session_id)
+        while job and job['status'] in ('queued', 'running') and time.time() < deadline:
+            time.sleep(0.05)
+            job = backend.review_jobs.get(session_id)
+        statuses[session_id] = job['status'] if job else None
+    return statuses
+
+
+def endpoint_name(path):
+    return '/api/review-jobs/<id>' if path.startswith('/api/review-jobs/') else path
+
+
+def build_report(session_id, args, results, upstreams, wall_seconds, recorded_span, review_jobs):
+    from load_test import percentile
+    by_endpoint = defaultdict(list)
+    for result in results:
+        by_endpoint[endpoint_name(result['path'])].append(result)
+    endpoints = {}
+    for name, entries in sorted(by_endpoint.items()):
+        recorded = sorted(e['recordedMs'] for e in entries)
+        replayed = sorted(e['replayMs'] for e in entries)
+        endpoints[name] = {
+            'requests': len(entries),
+            'recordedP50Ms': percentile(recorded, 50), 'replayP50Ms': percentile(replayed, 50),
+            'recordedP95Ms': percentile(recorded, 95), 'replayP95Ms': percentile(replayed, 95),
+        }
+    mismatches = [r for r in results if r['status'] != r['recordedStatus']]
+    return {
+        'sessionId': session_id,
+        'speed': args.speed,
+        'upstreams': args.upstreams,
+        'requests': len(results),
+        'recordedSpanSeconds': round(recorded_span, 2),
+        'wallSeconds': round(wall_seconds, 2),
+        'endpoints': endpoints,
+        'reviewJobs': review_jobs,
+        'statusMismatches': mismatches,
+        'missingUpstreamResponses': dict(upstreams.missing) if upstreams else {},
+    }
+
+
+def replay(session_id, args):
+    records = read_recording(session_id, args.recordings)
+    requests_to_replay = [r for r in records if r['type'] == 'request']
+    if not requests_to_replay:
+        print(f"Recording {session_id} has no requests")
+        return None
+
+    backend, base_url, server = start_backend()
+    upstreams = None
+    if args.upstreams == 'recorded':
+        upstreams = RecordedUpstreams(records, args.speed)
+        upstreams.install(backend)
+    else:
+        install_stub_upstreams(backend, args.speed)
+
+    t0 = requests_to_replay[0]['t']
+    results = [None] * len(requests_to_replay)
+    threads = []
+    start = time.perf_counter()
+    for index, record in enumerate(requests_to_replay):
+        def run(index=index, record=record):
+            results[index] = replay_request(base_url, record, args.recordings)
+        if args.speed:
+            # Keep the original spacing (scaled) and let overlapping requests overlap
+            delay = (record['t'] - t0) / args.speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            thread = threading.Thread(target=run)
+            thread.start()
+            threads.append(thread)
+        else:
+            run()
+    for thread in threads:
+        thread.join()
+    review_jobs = wait_for_review_jobs(backend, requests_to_replay)
+    wall_seconds = time.perf_counter() - start
+    server.shutdown()
+
+    recorded_span = requests_to_replay[-1]['t'] + requests_to_replay[-1]['durationMs'] / 1000 - t0
+    return build_report(session_id, args, results, upstreams, wall_seconds, recorded_span, review_jobs)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('session_id', nargs='?', help='recorded session to replay')
+    parser.add_argument('--list', action='store_true', help='list recorded sessions')
+    parser.add_argument('--recordings', default=RECORDINGS_DIR, help='recordings directory')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='1 = original pace, 10 = ten times faster, 0 = back to back with no upstream latency')
+    parser.add_argument('--upstreams', choices=('recorded', 'stub'), default='recorded')
+    parser.add_argument('--output', help='write the replay report JSON here')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list or not args.session_id:
+        for session_id in list_recordings(args.recordings):
+            print(session_id)
+        return 0
+
+    report = replay(args.session_id, args)
+    if report is None:
+        return 1
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['statusMismatches'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
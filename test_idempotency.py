@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for Idempotency-Key handling (backend/idempotency.py).
+Covers the begin/finish/wait_for state machine and the Flask decorator.
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from flask import Flask, jsonify, make_response
+
+from idempotency import KEY_HEADER, REPLAYED_HEADER, IdempotencyStore
+from session_state import InMemorySessionBackend
+
+
+def make_store(**kwargs):
+    return IdempotencyStore(InMemorySessionBackend(), **{'wait': 1.0, **kwargs})
+
+
+def test_first_request_executes_and_duplicates_replay():
+    store = make_store()
+    assert store.begin('/api/x', 'k1', 'fp')[0] == 'execute'
+    token = store.begin('/api/y', 'k1', 'fp')[1]  # keys are scoped per endpoint
+    assert token is not None
+    store.finish('/api/y', 'k1', token, (b'{}', 200, 'application/json'))
+
+    assert store.begin('/api/y', 'k1', 'fp') == ('wait', None)
+    assert store.wait_for('/api/y', 'k1') == ('done', (b'{}', 200, 'application/json'))
+    assert store.stats()['replayed'] == 1
+
+
+def test_reused_key_with_different_request_is_a_mismatch():
+    store = make_store()
+    store.begin('/api/x', 'k1', 'fp-a')
+    assert store.begin('/api/x', 'k1', 'fp-b') == ('mismatch', None)
+
+
+def test_in_flight_duplicate_waits_for_the_original():
+    store = make_store()
+    _, token = store.begin('/api/x', 'k1', 'fp')
+    assert store.begin('/api/x', 'k1', 'fp') == ('wait', None)
+    assert store.stats()['attached'] == 1
+
+    finisher = threading.Timer(0.1, store.finish, ('/api/x', 'k1', token, (b'ok', 201, 'text/plain')))
+    finisher.start()
+    assert store.wait_for('/api/x', 'k1') == ('done', (b'ok', 201, 'text/plain'))
+
+
+def test_wait_times_out_while_the_original_runs():
+    store = make_store(wait=0.1)
+    store.begin('/api/x', 'k1', 'fp')
+    assert store.wait_for('/api/x', 'k1') == ('timeout', None)
+
+
+def test_server_errors_and_crashes_release_the_key():
+    store = make_store()
+    _, token = store.begin('/api/x', 'k1', 'fp')
+    store.finish('/api/x', 'k1', token, (b'boom', 500, 'text/plain'))
+    assert store.wait_for('/api/x', 'k1') == ('released', None)
+    assert store.begin('/api/x', 'k1', 'fp')[0] == 'execute'
+
+    _, token = store.begin('/api/x', 'k2', 'fp')
+    store.finish('/api/x', 'k2', token, None)
+    assert store.begin('/api/x', 'k2', 'fp')[0] == 'execute'
+    assert store.stats()['inFlight'] == 2
+
+
+def test_expired_entries_are_claimed_again():
+    store = make_store(pending_ttl=0.05)  # a crashed request's marker outlives its pending window in storage
+    _, stale = store.begin('/api/x', 'k1', 'fp')
+    time.sleep(0.1)
+    outcome, token = store.begin('/api/x', 'k1', 'fp')
+    assert outcome == 'execute'
+    assert store.stats()['expirations'] == 1
+
+    store.finish('/api/x', 'k1', stale, (b'late', 200, 'text/plain'))  # the stale owner no longer holds the key
+    store.finish('/api/x', 'k1', token, (b'new', 200, 'text/plain'))
+    assert store.wait_for('/api/x', 'k1') == ('done', (b'new', 200, 'text/plain'))
+
+
+def make_app(store):
+    app = Flask(__name__)
+    calls = []
+
+    @app.route('/api/review', methods=['POST'])
+    @store.idempotent
+    def review():
+        calls.append(1)
+        return jsonify({'call': len(calls)})
+
+    @app.route('/api/partial', methods=['POST'])
+    @store.idempotent
+    def partial():
+        calls.append(1)
+        response = make_response(jsonify({'call': len(calls)}))
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    @app.route('/api/fail', methods=['POST'])
+    @store.idempotent
+    def fail():
+        calls.append(1)
+        return jsonify({'error': 'upstream'}), 503
+
+    return app.test_client(), calls
+
+
+def test_decorator_replays_the_stored_response():
+    client, calls = make_app(make_store())
+    first = client.post('/api/review', json={'a': 1}, headers={KEY_HEADER: 'k1'})
+    second = client.post('/api/review', json={'a': 1}, headers={KEY_HEADER: 'k1'})
+    assert first.json == second.json == {'call': 1}
+    assert second.headers[REPLAYED_HEADER] == 'true'
+    assert len(calls) == 1
+
+    assert client.post('/api/review', json={'a': 2}, headers={KEY_HEADER: 'k1'}).status_code == 422
+    assert client.post('/api/review', json={'a': 1}).json == {'call': 2}  # no key, no deduplication
+    assert client.post('/api/review', headers={KEY_HEADER: 'k' * 256}).status_code == 400
+
+
+def test_decorator_does_not_keep_no_store_or_failed_responses():
+    client, calls = make_app(make_store())
+    for path in ('/api/partial', '/api/fail'):
+        client.post(path, json={}, headers={KEY_HEADER: 'k1'})
+        retry = client.post(path, json={}, headers={KEY_HEADER: 'k1'})
+        assert REPLAYED_HEADER not in retry.headers
+    assert len(calls) == 4
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the local job posting analyzer (backend/job_analyzer.py).
+Non-technical postings must not pick up programming skills from everyday words.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from job_analyzer import (
+    JOB_CHUNK_CHARS, JOB_MAX_CHUNKS, MIN_LOCAL_CONFIDENCE, analyze_job_posting, job_chunk_chars, split_job_sections,
+)
+
+CUSTOMER_SUCCESS_POSTING = """Customer Success Manager at Brightwave
+
+About Brightwave:
+We help small businesses grow. Our staff go above and beyond for every customer, and you can rest assured
+you'll have support from our sales and bank partners.
+
+What you'll do:
+- Lead onboarding for new accounts and excel at building relationships
+- Partner with the sales team to grow revenue
+- Spring into action when a customer needs help
+
+What we're looking for:
+- 3+ years in customer-facing roles
+- Excellent communication and problem-solving skills
+- Experience with Salesforce
+"""
+
+NURSE_POSTING = """Registered Nurse
+Our hospital is looking for a patient, caring nurse to lead a swift and safe discharge process.
+
+Responsibilities:
+- Go through care plans with patients and families
+- Rest and recovery planning for surgical patients
+
+Requirements:
+- Active nursing license
+- Calm under pressure
+"""
+
+BACKEND_POSTING = """Senior Backend Engineer at Stripe
+
+Responsibilities:
+- Build payment services
+- Mentor engineers
+
+Requirements:
+- 5+ years with Python, Go and PostgreSQL
+- Designing REST APIs and Kafka pipelines
+"""
+
+AMBIGUOUS = {'Go', 'Excel', 'REST APIs', 'Swift', 'Spring', 'Rust', 'Spark'}
+
+
+def test_customer_success_posting_has_no_programming_skills():
+    analysis = analyze_job_posting(CUSTOMER_SUCCESS_POSTING)
+    assert not AMBIGUOUS & set(analysis['skills'])
+    assert analysis['skills'][:3] == ['Communication', 'Problem Solving', 'Salesforce']
+    assert analysis['industry'] == 'Not specified'
+    assert analysis['role'] == 'Customer Success Manager'
+    assert 'Go' not in analysis['interviewFocus'] and 'REST' not in analysis['interviewFocus']
+
+
+def test_everyday_seniority_words_only_count_in_the_title():
+    analysis = analyze_job_posting(NURSE_POSTING)
+    assert analysis['experienceLevel'] == 'Not specified'
+    assert not AMBIGUOUS & set(analysis['skills'])
+
+
+def test_prose_only_skills_lower_confidence():
+    analysis = analyze_job_posting(NURSE_POSTING)
+    assert analysis['skills'] == []
+    assert analysis['confidence'] < MIN_LOCAL_CONFIDENCE
+
+
+def test_ambiguous_skills_count_next_to_other_skills():
+    analysis = analyze_job_posting(BACKEND_POSTING)
+    assert analysis['skills'][:4] == ['Python', 'Go', 'PostgreSQL', 'REST APIs']
+    assert analysis['experienceLevel'] == 'Senior'
+    assert analysis['company'] == 'Stripe'
+    assert analysis['confidence'] >= MIN_LOCAL_CONFIDENCE
+
+
+def test_lowercase_ambiguous_word_is_not_a_skill():
+    analysis = analyze_job_posting("Data Analyst\nRequirements:\n- SQL and Tableau\n- You go the extra mile\n")
+    assert analysis['skills'] == ['SQL', 'Tableau']
+
+
+def test_long_posting_stays_within_max_chunks():
+    posting = '\n'.join(f"Section {n}:\n" + '\n'.join(f"- Requirement {n}.{i} " + 'x' * 80 for i in range(40))
+                        for n in range(30))
+    chunks = split_job_sections(posting)
+    assert job_chunk_chars(posting) > JOB_CHUNK_CHARS
+    assert len(chunks) <= JOB_MAX_CHUNKS
+    assert sum(len(chunk) for chunk in chunks) >= len(posting) - len(chunks)
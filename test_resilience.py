@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the upstream circuit breakers and deadlines (backend/resilience.py).
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, get_breaker, guarded_call
+
+
+def make_breaker(**kwargs):
+    return CircuitBreaker('test', **{'window': 4, 'min_calls': 2, 'failure_rate': 0.5, 'reset_seconds': 0.05, **kwargs})
+
+
+def test_breaker_opens_at_the_failure_rate():
+    breaker = make_breaker()
+    breaker.record_failure(ValueError('one'))
+    assert breaker.state == CircuitBreaker.CLOSED  # below min_calls
+    breaker.record_failure(ValueError('two'))
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.status()['rejected'] == 1
+    assert breaker.status()['lastError'] == 'ValueError: two'
+
+
+def test_half_open_lets_one_trial_through_and_closes_on_success():
+    breaker = make_breaker()
+    for _ in range(2):
+        breaker.record_failure(ValueError('down'))
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.status()['recentCalls'] == 0
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = make_breaker()
+    for _ in range(2):
+        breaker.record_failure(ValueError('down'))
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure(ValueError('still down'))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_guarded_call_fails_fast_while_open():
+    calls = []
+    breaker = get_breaker('test-fail-fast')
+    for _ in range(breaker.min_calls):
+        with pytest.raises(ValueError):
+            guarded_call('test-fail-fast', lambda: (calls.append(1), int('x')))
+    with pytest.raises(CircuitOpenError):
+        guarded_call('test-fail-fast', lambda: calls.append(1))
+    assert len(calls) == breaker.min_calls
+
+
+def test_timed_out_calls_count_against_the_abandoned_cap(monkeypatch):
+    monkeypatch.setattr(resilience, 'UPSTREAM_MAX_ABANDONED', 1)
+    release = threading.Event()
+    breaker = get_breaker('test-abandoned')
+
+    with pytest.raises(DeadlineExceeded):
+        guarded_call('test-abandoned', release.wait, 5, deadline=0.05)
+    assert breaker.status()['abandoned'] == 1
+    assert breaker.status()['timeouts'] == 1
+    with pytest.raises(CircuitOpenError, match='timed-out calls still running'):
+        guarded_call('test-abandoned', lambda: 'ok')
+
+    release.set()
+    deadline = time.time() + 2
+    while breaker.status()['abandoned'] and time.time() < deadline:
+        time.sleep(0.01)
+    assert guarded_call('test-abandoned', lambda: 'ok') == 'ok'
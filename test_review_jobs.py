@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite review job queue (backend/review_jobs.py).
+Several queues on one database stand in for several backend workers.
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from review_jobs import ReviewJobQueue
+
+
+def wait_for_status(queue, session_id, statuses, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(session_id)
+        if job and job['status'] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {session_id} did not reach {statuses}: {queue.get(session_id)}")
+
+
+def test_a_job_is_claimed_by_one_worker_only(tmp_path):
+    db_path = str(tmp_path / 'reviews.db')
+    calls = []
+    release = threading.Event()
+
+    def generate(transcript, mode, frame_notes, timing=None, time_limit=None, sections=None, rejected_frames=None):
+        calls.append(transcript)
+        release.wait(5)
+        return {'overallScore': 80}, 200
+
+    first = ReviewJobQueue(generate, db_path=db_path, workers=2)
+    second = ReviewJobQueue(generate, db_path=db_path, workers=2)
+    first.submit('s1', 'User: hello', 'easy', [])
+    wait_for_status(first, 's1', ('running',))
+
+    # Another worker tries to run the same job while its lease is live
+    second._run('s1')
+    assert second._claim('s1') is None
+    assert second.submit('s1', 'User: hello', 'easy', [])['status'] == 'running'
+
+    release.set()
+    assert wait_for_status(first, 's1', ('done',))['review'] == {'overallScore': 80}
+    assert calls == ['User: hello']
+
+
+def test_an_expired_lease_is_taken_over(tmp_path):
+    db_path = str(tmp_path / 'reviews.db')
+    stuck = threading.Event()
+
+    def hang(*args, **kwargs):
+        stuck.wait(5)
+        return {'overallScore': 1}, 200
+
+    def generate(transcript, mode, frame_notes, timing=None, time_limit=None, sections=None, rejected_frames=None):
+        return {'overallScore': 90}, 200
+
+    dead = ReviewJobQueue(hang, db_path=db_path, workers=1, lease_seconds=0.2)
+    alive = ReviewJobQueue(generate, db_path=db_path, workers=1)
+    dead.submit('s1', 'User: hello', 'easy', [])
+    wait_for_status(dead, 's1', ('running',))
+    assert alive._claim('s1') is None
+
+    time.sleep(0.3)  # the dead worker never renews its lease
+    alive._run('s1')
+    assert alive.get('s1')['review'] == {'overallScore': 90}
+
+    # The original worker finishing late does not overwrite the new owner's result
+    stuck.set()
+    time.sleep(0.2)
+    assert alive.get('s1')['review'] == {'overallScore': 90}